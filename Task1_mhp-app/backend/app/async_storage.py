@@ -0,0 +1,166 @@
+"""
+Async-safe access to app.storage for route handlers.
+
+Storage calls do blocking file or SQLite I/O. Running them directly in an
+``async def`` handler blocks the event loop, so one slow save would stall
+every other request. These wrappers run each call on a dedicated, bounded
+thread pool and await the result, leaving the loop free for other requests.
+
+The pool is separate from the threadpool Starlette uses for sync
+endpoints, so other blocking work cannot take every storage thread, and
+``STORAGE_THREADS`` caps how many storage calls touch the disk at once.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, List, Optional, TypeVar
+
+from app.models import User, MealParticipation, MealType, RefreshToken
+from app import storage
+
+T = TypeVar("T")
+
+STORAGE_THREADS = int(os.getenv("STORAGE_THREADS", "8"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=STORAGE_THREADS, thread_name_prefix="storage"
+                )
+    return _executor
+
+
+async def run(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking storage call on the storage pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(fn, *args, **kwargs))
+
+
+def shutdown() -> None:
+    """Wait for in-flight storage calls and stop the pool (app shutdown)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+# ===========================
+# Users
+# ===========================
+
+async def get_all_users() -> List[User]:
+    return await run(storage.get_all_users)
+
+async def get_user_by_id(user_id: str) -> Optional[User]:
+    return await run(storage.get_user_by_id, user_id)
+
+async def get_user_by_email(email: str) -> Optional[User]:
+    return await run(storage.get_user_by_email, email)
+
+async def get_users_by_team(team: str) -> List[User]:
+    return await run(storage.get_users_by_team, team)
+
+async def create_user(user: User) -> User:
+    return await run(storage.create_user, user)
+
+async def create_users(users: List[User]) -> List[User]:
+    return await run(storage.create_users, users)
+
+async def update_user(user: User) -> User:
+    return await run(storage.update_user, user)
+
+
+# ===========================
+# Participation
+# ===========================
+
+async def get_user_participation(user_id: str, target_date: date) -> List[MealParticipation]:
+    return await run(storage.get_user_participation, user_id, target_date)
+
+async def get_roster_participation(target_date: date, users: List[User]) -> Dict[str, List[MealParticipation]]:
+    return await run(storage.get_roster_participation, target_date, users)
+
+async def update_participation(
+        user_id: str,
+        target_date: date,
+        meal_type: MealType,
+        is_participating: bool,
+        updated_by: str
+) -> MealParticipation:
+    return await run(
+        storage.update_participation,
+        user_id=user_id,
+        target_date=target_date,
+        meal_type=meal_type,
+        is_participating=is_participating,
+        updated_by=updated_by,
+    )
+
+async def get_headcount_by_date(target_date: date) -> Dict[str, int]:
+    return await run(storage.get_headcount_by_date, target_date)
+
+async def get_headcount_by_date_and_team(target_date: date, team: str) -> Dict[str, int]:
+    return await run(storage.get_headcount_by_date_and_team, target_date, team)
+
+async def get_headcount_range(start: date, end: date, team: Optional[str] = None) -> Dict[date, Dict[str, int]]:
+    return await run(storage.get_headcount_range, start, end, team)
+
+async def get_team_headcount_range(start: date, end: date) -> Dict[date, Dict[str, Dict[str, int]]]:
+    return await run(storage.get_team_headcount_range, start, end)
+
+async def get_participants(target_date: date, meal_type: MealType, team: Optional[str] = None) -> List[str]:
+    return await run(storage.get_participants, target_date, meal_type, team)
+
+
+# ===========================
+# Meal Configuration
+# ===========================
+
+async def get_enabled_meals() -> Dict[str, bool]:
+    return await run(storage.get_enabled_meals)
+
+async def set_meal_enabled(meal_type: str, enabled: bool) -> Dict[str, bool]:
+    return await run(storage.set_meal_enabled, meal_type, enabled)
+
+async def get_enabled_meal_types() -> List[str]:
+    return await run(storage.get_enabled_meal_types)
+
+
+# ===========================
+# Change Version
+# ===========================
+
+async def get_users_version() -> Hashable:
+    return await run(storage.get_users_version)
+
+async def get_data_version() -> Hashable:
+    return await run(storage.get_data_version)
+
+
+# ===========================
+# Refresh Tokens
+# ===========================
+
+async def save_refresh_token(token: RefreshToken) -> None:
+    await run(storage.save_refresh_token, token)
+
+async def get_refresh_token(token_hash: str) -> Optional[RefreshToken]:
+    return await run(storage.get_refresh_token, token_hash)
+
+async def rotate_refresh_token(token_hash: str, replacement: RefreshToken) -> bool:
+    return await run(storage.rotate_refresh_token, token_hash, replacement)
+
+async def revoke_refresh_tokens(family_id: Optional[str] = None, user_id: Optional[str] = None) -> int:
+    return await run(storage.revoke_refresh_tokens, family_id, user_id)
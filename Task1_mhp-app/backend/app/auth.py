@@ -1,15 +1,20 @@
+import hashlib
 import os
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Hashable, List, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from dotenv import load_dotenv
 
-from app.models import User, UserRole
-from app import storage
-from app.storage import _load_json, _save_json
+from app.models import User, UserRole, RefreshToken
+from app import storage, async_storage
+from app.password_hashing import pwd_context, password_hasher
 
 load_dotenv()
 
@@ -19,8 +24,10 @@ if not SECRET_KEY:
 
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Verified tokens kept (least recently used evicted first)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
 
 security = HTTPBearer()
 
@@ -37,6 +44,23 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+# bcrypt is deliberately slow (hundreds of ms of CPU); handlers await these
+# so hashing runs on the password hashing process pool, not the event loop.
+# They raise HashingBusy (served as 503) when that pool's queue is full.
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
+async def hash_passwords_async(passwords: List[str]) -> List[str]:
+    """Hash a batch (e.g. a user import) in small chunks, leaving room for logins."""
+    return await password_hasher.hash_many(passwords)
+
+
 # ===========================
 # JWT Token Functions
 # ===========================
@@ -64,46 +88,164 @@ def verify_token(token: str) -> Optional[dict]:
         return None
 
 
+# ===========================
+# Refresh Token Functions
+# ===========================
+# Refresh tokens are opaque random strings and storage keeps only their
+# SHA-256. Every refresh rotates the token. Presenting a token that was
+# already rotated means someone holds a copy, so its whole family (every
+# token descended from the same login) is revoked.
+
+def _hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _new_refresh_token(user_id: str, family_id: str) -> Tuple[str, RefreshToken]:
+    token = secrets.token_urlsafe(32)
+    record = RefreshToken(
+        token_hash=_hash_refresh_token(token),
+        user_id=user_id,
+        family_id=family_id,
+        expires_at=datetime.now() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    return token, record
+
+
+async def issue_refresh_token(user: User) -> str:
+    """Start a new token family for a fresh login."""
+    token, record = _new_refresh_token(user.id, str(uuid.uuid4()))
+    await async_storage.save_refresh_token(record)
+    return token
+
+
+async def refresh_session(refresh_token: str) -> Optional[Tuple[User, str]]:
+    """Rotate a refresh token: returns its user and the next token, or None."""
+    token_hash = _hash_refresh_token(refresh_token)
+    record = await async_storage.get_refresh_token(token_hash)
+    if record is None or record.expires_at <= datetime.now():
+        return None
+
+    if record.revoked_at is not None:
+        await async_storage.revoke_refresh_tokens(family_id=record.family_id)
+        return None
+
+    user = await async_storage.get_user_by_id(record.user_id)
+    if user is None or not user.is_active:
+        await async_storage.revoke_refresh_tokens(family_id=record.family_id)
+        return None
+
+    new_token, replacement = _new_refresh_token(user.id, record.family_id)
+    if not await async_storage.rotate_refresh_token(token_hash, replacement):
+        # Lost a race with another refresh of the same token: treat as reuse
+        await async_storage.revoke_refresh_tokens(family_id=record.family_id)
+        return None
+    return user, new_token
+
+
+async def revoke_refresh_token(refresh_token: str) -> None:
+    """Log out: revoke the token's family so no descendant can be used."""
+    record = await async_storage.get_refresh_token(_hash_refresh_token(refresh_token))
+    if record is not None:
+        await async_storage.revoke_refresh_tokens(family_id=record.family_id)
+
+
 # ===========================
 # Authentication Functions
 # ===========================
 
-def authenticate_user(email: str, password: str) -> Optional[User]:
-    user = storage.get_user_by_email(email)
+async def authenticate_user_async(email: str, password: str) -> Optional[User]:
+    user = await async_storage.get_user_by_email(email)
     if not user:
         return None
     
     if not user.is_active:
         return None
     
-    if not verify_password(password, user.password_hash):
+    if not await verify_password_async(password, user.password_hash):
         return None
     
     return user
 
 
+# ===========================
+# Verified Token and User Caches
+# ===========================
+
+_cache_lock = threading.Lock()
+_token_cache: "OrderedDict[str, dict]" = OrderedDict()
+_user_cache: Dict[str, Tuple[Hashable, User]] = {}
+
+
+def verify_token_cached(token: str) -> Optional[dict]:
+    """verify_token, remembering valid tokens until they expire."""
+    now = time.time()
+    with _cache_lock:
+        payload = _token_cache.get(token)
+        if payload is not None:
+            if payload["exp"] > now:
+                _token_cache.move_to_end(token)
+                return payload
+            del _token_cache[token]
+
+    payload = verify_token(token)
+    if payload is not None and isinstance(payload.get("exp"), (int, float)):
+        with _cache_lock:
+            _token_cache[token] = payload
+            while len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return payload
+
+
+async def _get_user_cached(user_id: str) -> Optional[User]:
+    # Entries are only reused while no process has written any user since;
+    # the version is read first so a write during the lookup is seen next time
+    version = await async_storage.get_users_version()
+    with _cache_lock:
+        entry = _user_cache.get(user_id)
+    if entry is not None and entry[0] == version:
+        return entry[1].model_copy()
+
+    user = await async_storage.get_user_by_id(user_id)
+    if user is not None:
+        with _cache_lock:
+            _user_cache[user_id] = (version, user.model_copy())
+    return user
+
+
+def _forget_user(user_id: Optional[str]) -> None:
+    """Drop cached state for a changed user (everyone if user_id is None)."""
+    with _cache_lock:
+        if user_id is None:
+            _user_cache.clear()
+            _token_cache.clear()
+            return
+        _user_cache.pop(user_id, None)
+        for token in [t for t, payload in _token_cache.items() if payload.get("user_id") == user_id]:
+            del _token_cache[token]
+
+
+storage.add_user_listener(_forget_user)
+
+
 # ===========================
 # Token Dependency Functions
 # ===========================
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> User:
+async def authenticate_token(token: str) -> User:
+    """The active user an access token belongs to; raises 401/403 otherwise."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    token = credentials.credentials
 
-    payload = verify_token(token)
+    payload = verify_token_cached(token)
     if payload is None:
         raise credentials_exception 
-    email: str = payload.get("sub")
-    if email is None:
+    user_id: str = payload.get("user_id")
+    if user_id is None:
         raise credentials_exception   
-    user = storage.get_user_by_email(email)
+    user = await _get_user_cached(user_id)
     if user is None:
         raise credentials_exception
     
@@ -116,6 +258,12 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
+    return await authenticate_token(credentials.credentials)
+
+
 # ===========================
 # Role-Based Access Control Dependencies
 # Consolidated role-based dependency (replace require_* functions with require_role)
@@ -142,7 +290,7 @@ require_admin = require_role([UserRole.ADMIN])
 # Helper Functions
 # ===========================
 
-def create_token_response(user: User) -> dict:
+def create_token_response(user: User, refresh_token: Optional[str] = None) -> dict:
     access_token_data = {
         "sub": user.email,
         "user_id": user.id,
@@ -154,6 +302,7 @@ def create_token_response(user: User) -> dict:
     return {
         "access_token": access_token,
         "token_type": "bearer",
+        "refresh_token": refresh_token,
         "user": {
             "id": user.id,
             "name": user.name,
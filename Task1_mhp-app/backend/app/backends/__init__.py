@@ -0,0 +1,39 @@
+"""
+Storage backends for the Meal Headcount Planner application.
+
+``app.storage`` delegates to exactly one backend, chosen with the
+STORAGE_BACKEND environment variable:
+- json: JSON files in the data directory (default)
+- sqlite: a single SQLite database in WAL mode
+"""
+
+from pathlib import Path
+
+from app.backends.base import StorageBackend, StorageError
+from app.backends.json_backend import JSONStorageBackend
+from app.backends.sqlite_backend import SQLiteStorageBackend
+
+__all__ = [
+    "StorageBackend",
+    "StorageError",
+    "JSONStorageBackend",
+    "SQLiteStorageBackend",
+    "create_backend",
+]
+
+BACKENDS = ("json", "sqlite")
+
+
+def create_backend(name: str, data_dir: Path, **options) -> StorageBackend:
+    """Build the backend called *name* storing its files under *data_dir*."""
+    name = name.strip().lower()
+    if name == "json":
+        return JSONStorageBackend(
+            data_dir,
+            journal=options.get("journal", False),
+            journal_compact_every=options.get("journal_compact_every", 1000),
+            snapshot=options.get("snapshot", True),
+        )
+    if name == "sqlite":
+        return SQLiteStorageBackend(options.get("sqlite_path") or Path(data_dir) / "mhp.sqlite3")
+    raise ValueError(f"Unknown STORAGE_BACKEND '{name}'. Valid options: {', '.join(BACKENDS)}")
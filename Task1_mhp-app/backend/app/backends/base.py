@@ -0,0 +1,306 @@
+"""
+Storage backend interface.
+
+``app.storage`` exposes module-level functions to the rest of the app and
+delegates every read and write to one ``StorageBackend`` instance. A backend
+only has to provide the primitives below; aggregate queries such as
+headcounts have a generic implementation here that backends may override
+with something faster.
+"""
+
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from typing import Hashable, Iterable, Iterator, Optional, Dict, List, Tuple
+
+from app.models import (
+    User, MealParticipation, MealType, RefreshToken, ADMIN_CONTROLLED_MEALS, DEFAULT_OPTED_IN_MEALS,
+    gets_defaults,
+)
+
+
+class StorageError(Exception):
+    """Stored data could not be read or written safely."""
+
+
+def default_meal_config() -> Dict[str, bool]:
+    """Config used until an admin saves one: admin-controlled meals are disabled."""
+    return {mt.value: mt not in ADMIN_CONTROLLED_MEALS for mt in MealType}
+
+
+def date_range(start: date, end: date) -> Iterator[date]:
+    """Every date from ``start`` to ``end`` inclusive (nothing if end < start)."""
+    for n in range(max((end - start).days + 1, 0)):
+        yield start + timedelta(days=n)
+
+
+def headcount_with_defaults(
+    participating: Dict[MealType, int],
+    recorded_active: Dict[MealType, int],
+    active_users: int,
+) -> Dict[str, int]:
+    """Combine stored participation with the virtual defaults.
+
+    *participating* counts stored records that opt in, *recorded_active*
+    counts stored records (either way) of users who get defaults that day
+    (see ``models.default_window``), *active_users* counts those users, and
+    each of them without a record for a meal gets that meal's default.
+    """
+    headcount = {}
+    for meal_type in MealType:
+        count = participating.get(meal_type, 0)
+        if meal_type in DEFAULT_OPTED_IN_MEALS:
+            count += active_users - recorded_active.get(meal_type, 0)
+        headcount[meal_type.value] = count
+    return headcount
+
+
+def daily_default_counts(
+    windows: Iterable[Tuple[date, Optional[date], int]], start: date, end: date
+) -> Dict[date, int]:
+    """Users getting defaults on each date from ``start`` to ``end`` inclusive.
+
+    *windows* are (first day, end day or None, user count) groups as
+    returned by ``models.default_window``; the end day is exclusive.
+    """
+    current = 0
+    changes: Dict[date, int] = {}
+    for first, until, users in windows:
+        if until is not None and until <= first:
+            continue
+        if first <= start:
+            current += users
+        else:
+            changes[first] = changes.get(first, 0) + users
+        if until is not None:
+            if until <= start:
+                current -= users
+            else:
+                changes[until] = changes.get(until, 0) - users
+    counts = {}
+    for day in date_range(start, end):
+        current += changes.get(day, 0)
+        counts[day] = current
+    return counts
+
+
+class StorageBackend(ABC):
+
+    # ===========================
+    # Users
+    # ===========================
+
+    @abstractmethod
+    def get_all_users(self) -> List[User]:
+        ...
+
+    @abstractmethod
+    def get_user_by_id(self, user_id: str) -> Optional[User]:
+        ...
+
+    @abstractmethod
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        """Case-insensitive lookup."""
+
+    @abstractmethod
+    def get_users_by_team(self, team: Optional[str]) -> List[User]:
+        """Case-insensitive lookup; an empty or missing team matches nobody."""
+
+    @abstractmethod
+    def create_user(self, user: User) -> User:
+        """Raises ValueError if the email is already registered."""
+
+    def create_users(self, users: List[User]) -> List[User]:
+        """Create many users at once; raises ValueError, creating none, if any email is taken.
+
+        This generic version checks first and then creates one by one;
+        backends override it to write everything in one transaction.
+        """
+        emails = set()
+        for user in users:
+            key = user.email.casefold()
+            if key in emails or self.get_user_by_email(user.email) is not None:
+                raise ValueError(f"User with email {user.email} already exists.")
+            emails.add(key)
+        return [self.create_user(user) for user in users]
+
+    @abstractmethod
+    def update_user(self, user: User) -> User:
+        """Raises ValueError if no user has ``user.id``."""
+
+    # ===========================
+    # Meal Participation
+    # ===========================
+
+    @abstractmethod
+    def get_all_participation(self) -> List[MealParticipation]:
+        ...
+
+    @abstractmethod
+    def get_participation_by_date(self, target_date: date) -> List[MealParticipation]:
+        ...
+
+    def iter_participation_by_date(
+        self, start: date, end: date
+    ) -> Iterator[Tuple[date, List[MealParticipation]]]:
+        """Stored records one day at a time, from ``start`` to ``end`` inclusive.
+
+        For long scans such as exports: only one day is held at a time, so
+        backends that cache days should not cache the days read here.
+        """
+        for day in date_range(start, end):
+            yield day, self.get_participation_by_date(day)
+
+    @abstractmethod
+    def get_user_participation(self, user_id: str, target_date: date) -> List[MealParticipation]:
+        """Stored records only; virtual defaults are the caller's concern."""
+
+    @abstractmethod
+    def get_participation(
+        self, user_id: str, target_date: date, meal_type: MealType
+    ) -> Optional[MealParticipation]:
+        ...
+
+    @abstractmethod
+    def save_participation(self, records: List[MealParticipation]) -> None:
+        """Insert or replace records keyed by (user_id, date, meal_type) in one write."""
+
+    def get_headcount(self, target_date: date, team: Optional[str] = None) -> Dict[str, int]:
+        """Participating count per meal type, optionally limited to one team.
+
+        Counts stored opt-ins plus the virtual default of every user (in the
+        team) who gets defaults that day and has no stored record for that meal.
+        """
+        users = self.get_users_by_team(team) if team is not None else self.get_all_users()
+        members = {u.id: u for u in users}
+        participating = dict.fromkeys(MealType, 0)
+        recorded_active = dict.fromkeys(MealType, 0)
+
+        for record in self.get_participation_by_date(target_date):
+            user = members.get(record.user_id)
+            if team is not None and user is None:
+                continue
+            if record.is_participating:
+                participating[record.meal_type] += 1
+            if user is not None and gets_defaults(user, target_date):
+                recorded_active[record.meal_type] += 1
+
+        active_users = sum(1 for u in users if gets_defaults(u, target_date))
+        return headcount_with_defaults(participating, recorded_active, active_users)
+
+    def get_headcount_range(
+        self, start: date, end: date, team: Optional[str] = None
+    ) -> Dict[date, Dict[str, int]]:
+        """``get_headcount`` for every date from ``start`` to ``end`` inclusive."""
+        return {day: self.get_headcount(day, team) for day in date_range(start, end)}
+
+    def get_team_headcount_range(self, start: date, end: date) -> Dict[date, Dict[str, Dict[str, int]]]:
+        """Per date, ``get_headcount`` of every team, keyed by team name.
+
+        A team is named as spelled by its earliest member; users without a
+        team are left out.
+        """
+        names: Dict[str, str] = {}
+        for user in self.get_all_users():
+            if user.team:
+                names.setdefault(user.team.strip().casefold(), user.team.strip())
+        return {
+            day: {name: self.get_headcount(day, name) for name in names.values()}
+            for day in date_range(start, end)
+        }
+
+    def get_participants(
+        self, target_date: date, meal_type: MealType, team: Optional[str] = None
+    ) -> List[str]:
+        """Ids of the users eating ``meal_type`` on ``target_date`` (defaults included)."""
+        users = self.get_users_by_team(team) if team is not None else self.get_all_users()
+        stored = {
+            r.user_id: r.is_participating
+            for r in self.get_participation_by_date(target_date) if r.meal_type == meal_type
+        }
+        eating = [
+            u.id for u in users
+            if stored.get(u.id, meal_type in DEFAULT_OPTED_IN_MEALS and gets_defaults(u, target_date))
+        ]
+        if team is None:
+            known = {u.id for u in users}
+            eating += [user_id for user_id, on in stored.items() if on and user_id not in known]
+        return eating
+
+    # ===========================
+    # Meal Configuration
+    # ===========================
+
+    @abstractmethod
+    def load_meal_config(self) -> Optional[Dict[str, bool]]:
+        """Stored meal_type -> enabled map, or None if nothing has been saved yet."""
+
+    @abstractmethod
+    def save_meal_config(self, config: Dict[str, bool]) -> None:
+        ...
+
+    def meal_config_version(self) -> Hashable:
+        """Cheap token that changes whenever the stored meal config changes.
+
+        Read before ``load_meal_config`` so a change in between is noticed on
+        the next check. The default never compares equal, disabling caching.
+        """
+        return object()
+
+    def users_version(self) -> Hashable:
+        """Cheap token that changes whenever any user is created or updated.
+
+        Covers writes from other processes too. The default never compares
+        equal, so nothing keyed on it is ever reused.
+        """
+        return object()
+
+    def data_version(self) -> Hashable:
+        """Cheap token that changes whenever users, participation or meal config change.
+
+        Used for HTTP ETags; read it before reading the data it covers. The
+        default never compares equal, so every request gets a full response.
+        """
+        return object()
+
+    def set_meal_enabled(self, meal_type: str, enabled: bool) -> Dict[str, bool]:
+        """Read-modify-write of one entry; backends make this atomic. Returns the new config."""
+        config = self.load_meal_config()
+        if config is None:
+            config = default_meal_config()
+        config[meal_type] = enabled
+        self.save_meal_config(config)
+        return config
+
+    # ===========================
+    # Refresh Tokens
+    # ===========================
+
+    @abstractmethod
+    def save_refresh_token(self, token: RefreshToken) -> None:
+        """Store a newly issued token; expired tokens may be purged at the same time."""
+
+    @abstractmethod
+    def get_refresh_token(self, token_hash: str) -> Optional[RefreshToken]:
+        ...
+
+    @abstractmethod
+    def rotate_refresh_token(self, token_hash: str, replacement: RefreshToken) -> bool:
+        """Atomically revoke ``token_hash`` and store ``replacement``.
+
+        Returns False and stores nothing if the token is unknown or already
+        revoked, e.g. when two refreshes race with the same token.
+        """
+
+    @abstractmethod
+    def revoke_refresh_tokens(self, family_id: Optional[str] = None, user_id: Optional[str] = None) -> int:
+        """Revoke every active token of a family, or of a user; returns how many."""
+
+    # ===========================
+    # Maintenance
+    # ===========================
+
+    def compact(self) -> None:
+        """Fold any write-optimized state into its read-optimized form."""
+
+    def close(self) -> None:
+        """Release files, connections and threads held by the backend."""
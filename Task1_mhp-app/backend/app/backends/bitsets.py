@@ -0,0 +1,201 @@
+"""
+Columnar bitsets for per-day participation.
+
+Headcounts only need one bit per (user, meal, day), so instead of walking
+``MealParticipation`` objects the JSON backend keeps, for each cached day,
+two Python ints per meal type used as bit arrays over user ordinals:
+
+- ``UserColumns``: append-only user id -> ordinal table, plus lazily built
+  masks of the users getting meal defaults on a given day and of each
+  team's members.
+- ``DayBits``: per meal type, the users with a stored record and the users
+  whose stored record opts in.
+
+Counts are popcounts (``int.bit_count``) of masked bit arrays; a year of
+history for 10k users takes a few MB.
+"""
+
+import threading
+from bisect import bisect_right
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.models import MealType, DEFAULT_OPTED_IN_MEALS
+
+# (user_id, team key, default window) for every known user; the window is
+# models.default_window: (first day, end day or None), or None for no defaults
+Member = Tuple[str, Optional[str], Optional[Tuple[date, Optional[date]]]]
+
+
+def _cumulative(masks: Dict[date, int]) -> Tuple[List[date], List[int]]:
+    """Sorted days, and for each the union of the masks of it and every earlier day."""
+    days = sorted(masks)
+    union, unions = 0, []
+    for day in days:
+        union |= masks[day]
+        unions.append(union)
+    return days, unions
+
+
+def _as_of(days: List[date], unions: List[int], day: date) -> int:
+    position = bisect_right(days, day)
+    return unions[position - 1] if position else 0
+
+
+class UserColumns:
+    """Bit position of every user, and masks over those positions.
+
+    Ordinals are never reused or reassigned, so bit arrays built earlier stay
+    valid when users are added or change team; only the masks are rebuilt.
+    """
+
+    def __init__(self, load_members: Callable[[], Iterable[Member]]) -> None:
+        self._load_members = load_members
+        self._lock = threading.RLock()
+        self._ordinals: Dict[str, int] = {}
+        self._user_ids: List[str] = []
+        # Masks are valid while _masks_epoch == _epoch; invalidate_masks only
+        # bumps _epoch, without the lock, so it is safe to call from anywhere
+        self._epoch = 0
+        self._masks_epoch = -1
+        # Users whose defaults started / ended on or before each day
+        self._starts: Tuple[List[date], List[int]] = ([], [])
+        self._ends: Tuple[List[date], List[int]] = ([], [])
+        self._by_team: Dict[str, int] = {}
+
+    def ordinal(self, user_id: str) -> int:
+        with self._lock:
+            ordinal = self._ordinals.get(user_id)
+            if ordinal is None:
+                ordinal = self._ordinals[user_id] = len(self._user_ids)
+                self._user_ids.append(user_id)
+            return ordinal
+
+    def adopt(self, user_ids: List[str]) -> Optional[List[int]]:
+        """Ordinals for bits numbered by ``user_ids`` (e.g. a snapshot's user table).
+
+        Returns None when bit ``n`` already is ``user_ids[n]`` here, taking
+        ``user_ids`` as the numbering if no ordinal was assigned yet.
+        Otherwise the unknown ids get ordinals and the list maps bit ``n``
+        to ``ordinals[n]`` (see ``DayBits.remapped``).
+        """
+        with self._lock:
+            if not self._user_ids:
+                for user_id in user_ids:
+                    self.ordinal(user_id)
+            if all(self._ordinals.get(user_id) == n for n, user_id in enumerate(user_ids)):
+                return None
+            return [self.ordinal(user_id) for user_id in user_ids]
+
+    def invalidate_masks(self) -> None:
+        """Users changed (added, moved team, (de)activated): rebuild masks on next use."""
+        self._epoch += 1
+
+    def _ensure_masks(self) -> None:
+        epoch = self._epoch
+        if self._masks_epoch == epoch:
+            return
+        starts: Dict[date, int] = {}
+        ends: Dict[date, int] = {}
+        by_team: Dict[str, int] = {}
+        for user_id, team_key, window in self._load_members():
+            bit = 1 << self.ordinal(user_id)
+            if window is not None:
+                first, until = window
+                starts[first] = starts.get(first, 0) | bit
+                if until is not None:
+                    ends[until] = ends.get(until, 0) | bit
+            if team_key is not None:
+                by_team[team_key] = by_team.get(team_key, 0) | bit
+        self._starts, self._ends = _cumulative(starts), _cumulative(ends)
+        self._by_team = by_team
+        self._masks_epoch = epoch
+
+    def defaults_mask(self, day: date) -> int:
+        """Mask of the users whose missing records take the meal defaults on ``day``."""
+        with self._lock:
+            self._ensure_masks()
+            return _as_of(*self._starts, day) & ~_as_of(*self._ends, day)
+
+    def team_mask(self, team_key: str) -> int:
+        with self._lock:
+            self._ensure_masks()
+            return self._by_team.get(team_key, 0)
+
+    def all_user_ids(self) -> List[str]:
+        """Every user id with an ordinal, in ordinal order."""
+        with self._lock:
+            return list(self._user_ids)
+
+    def user_ids(self, mask: int) -> List[str]:
+        """User ids of the bits set in ``mask``, in ordinal order."""
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self._user_ids[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+
+def _remap(mask: int, ordinals: List[int]) -> int:
+    remapped = 0
+    while mask:
+        low = mask & -mask
+        remapped |= 1 << ordinals[low.bit_length() - 1]
+        mask ^= low
+    return remapped
+
+
+class DayBits:
+    """Stored participation of one day as two bit arrays per meal type."""
+
+    __slots__ = ("recorded", "participating")
+
+    def __init__(self) -> None:
+        self.recorded: Dict[MealType, int] = dict.fromkeys(MealType, 0)
+        self.participating: Dict[MealType, int] = dict.fromkeys(MealType, 0)
+
+    def set(self, ordinal: int, meal_type: MealType, is_participating: Optional[bool]) -> None:
+        """Record a user's stored value for a meal; None means no stored record."""
+        bit = 1 << ordinal
+        if is_participating is None:
+            self.recorded[meal_type] &= ~bit
+        else:
+            self.recorded[meal_type] |= bit
+        if is_participating:
+            self.participating[meal_type] |= bit
+        else:
+            self.participating[meal_type] &= ~bit
+
+    def remapped(self, ordinals: List[int]) -> "DayBits":
+        """A copy with bit ``n`` moved to bit ``ordinals[n]``."""
+        copy = DayBits()
+        for meal_type in MealType:
+            copy.recorded[meal_type] = _remap(self.recorded[meal_type], ordinals)
+            copy.participating[meal_type] = _remap(self.participating[meal_type], ordinals)
+        return copy
+
+    def eating(self, meal_type: MealType, defaults: int) -> int:
+        """Mask of users eating: stored opt-ins plus users in ``defaults`` on a default opt-in."""
+        mask = self.participating[meal_type]
+        if meal_type in DEFAULT_OPTED_IN_MEALS:
+            mask |= defaults & ~self.recorded[meal_type]
+        return mask
+
+    def headcount(self, defaults: int, scope: Optional[int] = None) -> Dict[str, int]:
+        """Participating count per meal type, limited to ``scope`` if given."""
+        counts = {}
+        for meal_type in MealType:
+            mask = self.eating(meal_type, defaults)
+            if scope is not None:
+                mask &= scope
+            counts[meal_type.value] = mask.bit_count()
+        return counts
+
+    def headcounts(self, defaults: int, scopes: Dict[str, int]) -> Dict[str, Dict[str, int]]:
+        """``headcount`` for several scopes at once, keyed like ``scopes``."""
+        eating = {meal_type: self.eating(meal_type, defaults) for meal_type in MealType}
+        return {
+            name: {meal_type.value: (mask & scope).bit_count() for meal_type, mask in eating.items()}
+            for name, scope in scopes.items()
+        }
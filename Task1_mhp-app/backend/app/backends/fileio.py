@@ -0,0 +1,144 @@
+"""
+File helpers for backends that keep their data in plain files.
+
+- ``FileLock``: cross-process advisory lock (flock on POSIX, msvcrt on Windows)
+  for read-modify-write cycles shared by several worker processes.
+- ``atomic_write_text`` / ``atomic_write_bytes``: temp file + fsync + rename,
+  so readers only ever see the old or the new content, never a truncated file.
+- ``append_lines``: fsynced append of whole lines that first cuts off a
+  torn last line left by a crash, so new lines never join a partial one.
+- ``file_stamp``: cheap (inode, size, mtime) signature used to notice that
+  another process has replaced a file since it was last read.
+"""
+
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+FileStamp = Tuple[int, int, int]
+
+
+class FileLock:
+    """Exclusive lock held on ``path`` across processes and threads.
+
+    The lock file is created on first use and never deleted. Re-entrant
+    within a thread so nested read-modify-write helpers can share it.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> "FileLock":
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Replace ``path`` with ``text`` so that a crash never leaves a partial file."""
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Binary counterpart of ``atomic_write_text``."""
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+    _fsync_directory(path.parent)
+
+
+def _fsync_directory(directory: Path) -> None:
+    # Makes the rename itself durable; not supported (or needed) on Windows
+    if fcntl is None:
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def append_lines(path: Path, text: str) -> None:
+    """Append ``text`` (whole lines) to ``path`` and fsync before returning.
+
+    A last line without its newline can only be a torn append; it is cut
+    off first, or the new lines would be glued to it and unreadable too.
+    Call with the file's lock held.
+    """
+    with open(path, "a+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end:
+            f.seek(end - 1)
+            if f.read(1) != b"\n":
+                f.truncate(_after_last_newline(f, end))
+        f.write(text.encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _after_last_newline(f, end: int, block: int = 64 * 1024) -> int:
+    """Offset just past the last ``\n`` before ``end`` (0 if none)."""
+    position = end
+    while position > 0:
+        start = max(position - block, 0)
+        f.seek(start)
+        found = f.read(position - start).rfind(b"\n")
+        if found != -1:
+            return start + found + 1
+        position = start
+    return 0
+
+
+def file_stamp(path: Path) -> Optional[FileStamp]:
+    """(inode, size, mtime_ns) of ``path``, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
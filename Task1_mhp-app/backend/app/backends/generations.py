@@ -0,0 +1,82 @@
+"""
+Shared generation counters for cache coherence between worker processes.
+
+A small file holding a fixed array of 64-bit counters is mapped into every
+process that opens the same data directory. Whoever writes a partition
+(all users, or one bucket of participation dates) bumps its counter while
+holding that partition's file lock. Readers compare the counter with the
+value they last saw, which costs one read from shared memory, and reload
+only the partitions that another process changed.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from datetime import date
+from pathlib import Path
+from typing import List, Tuple
+
+_COUNTER = struct.Struct("<Q")
+
+USERS_SLOT = 0
+DATE_BUCKETS = 64
+
+
+def date_slot(target_date: date) -> int:
+    """Counter slot covering ``target_date``; dates share slots round-robin."""
+    return 1 + target_date.toordinal() % DATE_BUCKETS
+
+
+class SharedGenerations:
+    """Per-process view of the shared counters.
+
+    ``changed`` reports (once) that another process bumped a slot since this
+    process last looked; ``bump`` is for the process doing a write and must
+    be called under the lock that serializes writes to that slot.
+    """
+
+    SLOTS = 1 + DATE_BUCKETS
+
+    def __init__(self, path: Path) -> None:
+        size = self.SLOTS * _COUNTER.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < size:
+                # Growing only ever appends zeros, so concurrent creators agree
+                os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._lock = threading.Lock()
+        self._seen: List[int] = [self._read(slot) for slot in range(self.SLOTS)]
+
+    def _read(self, slot: int) -> int:
+        return _COUNTER.unpack_from(self._mm, slot * _COUNTER.size)[0]
+
+    def changed(self, slot: int) -> bool:
+        """True if another process wrote ``slot`` since the last call."""
+        current = self._read(slot)
+        with self._lock:
+            if current == self._seen[slot]:
+                return False
+            self._seen[slot] = current
+            return True
+
+    def bump(self, slot: int) -> None:
+        """Mark ``slot`` as written by this process."""
+        with self._lock:
+            value = self._read(slot) + 1
+            _COUNTER.pack_into(self._mm, slot * _COUNTER.size, value)
+            self._seen[slot] = value
+
+    def value(self, slot: int) -> int:
+        """Current value of ``slot``, whoever wrote it."""
+        return self._read(slot)
+
+    def values(self) -> Tuple[int, ...]:
+        """Current value of every slot; changes whenever any process writes anything."""
+        return tuple(self._read(slot) for slot in range(self.SLOTS))
+
+    def close(self) -> None:
+        self._mm.close()
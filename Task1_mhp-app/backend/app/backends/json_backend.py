@@ -0,0 +1,896 @@
+"""
+JSON file storage backend.
+
+Users, participation, meal configuration and refresh tokens live in JSON
+files under one data directory; participation is split into one shard per
+day. Users and
+participation are held in process-resident indexes that are loaded once
+(participation one day at a time) and kept in sync with writes.
+
+Several worker processes may share the directory: every read-modify-write
+cycle runs under a cross-process file lock, rereads anything another
+process replaced since it was cached, and writes files atomically. Reads
+stay coherent too: each write bumps a shared generation counter (see
+``generations``), and other processes drop just the affected users or
+participation dates the next time they look at them.
+"""
+
+import json
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Dict, List, Tuple
+
+from app.backends.base import StorageBackend, StorageError, date_range, headcount_with_defaults
+from app.backends.bitsets import DayBits, Member, UserColumns
+from app.backends.generations import USERS_SLOT, SharedGenerations, date_slot
+from app.backends.fileio import FileLock, FileStamp, append_lines, atomic_write_text, file_stamp
+from app.backends.snapshot import Snapshot, write_snapshot
+from app.models import User, MealParticipation, MealType, RefreshToken, default_window, user_from_storage
+
+
+def _serialize_datetime(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+def _load_json(filepath: Path) -> dict:
+    if not filepath.exists():
+        return {"users": []} if "users" in str(filepath) else {"participation": []}
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        # Writes are atomic, so this is real damage: refuse to treat it as empty
+        # (the next write would otherwise replace the file with an empty dataset)
+        raise StorageError(f"{filepath} is not valid JSON: {e}") from e
+
+def _save_json(filepath: Path, data: dict) -> None:
+    atomic_write_text(filepath, json.dumps(data, indent=2, default=_serialize_datetime, ensure_ascii=False))
+
+# ===========================
+# In-memory User Repository
+# ===========================
+
+def _email_key(email: str) -> str:
+    return email.casefold()
+
+def _team_key(team: str) -> str:
+    return team.strip().casefold()
+
+class _UserRepository:
+    """Process-resident copy of users.json with hash indexes.
+
+    users.json is parsed once on first access. Lookups by id, email and team
+    are dictionary hits; writes update the indexes and then persist the whole
+    user list. Callers always get copies, so mutating a returned ``User``
+    never touches the cache until it is passed back to ``update_user``.
+    """
+
+    def __init__(
+        self,
+        users_file: Path,
+        generations: Optional[SharedGenerations] = None,
+        on_foreign_change: Callable[[], None] = lambda: None,
+    ) -> None:
+        self._users_file = users_file
+        self._generations = generations
+        self._on_foreign_change = on_foreign_change
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(users_file.with_name(".users.lock"))
+        self._loaded = False
+        self._stamp: Optional[FileStamp] = None
+        self._by_id: Dict[str, User] = {}
+        self._by_email: Dict[str, str] = {}
+        self._by_team: Dict[str, Dict[str, None]] = {}
+
+    def invalidate(self) -> None:
+        """Drop the cache; the next access reloads users.json."""
+        with self._lock:
+            self._loaded = False
+            self._by_id = {}
+            self._by_email = {}
+            self._by_team = {}
+
+    def _ensure_loaded(self) -> None:
+        # Checked even before the first load so that load is the baseline
+        foreign = self._generations is not None and self._generations.changed(USERS_SLOT)
+        if foreign and self._loaded:
+            self.invalidate()
+            self._on_foreign_change()
+        if self._loaded:
+            return
+        # Stamp before reading: a replace in between shows up as a stale stamp
+        self._stamp = file_stamp(self._users_file)
+        data = _load_json(self._users_file)
+        for row in data.get("users", []):
+            self._index(user_from_storage(row))
+        self._loaded = True
+
+    def _refresh_for_write(self) -> None:
+        """Called under the file lock: reload if another process rewrote the file."""
+        if self._loaded and file_stamp(self._users_file) != self._stamp:
+            self.invalidate()
+        self._ensure_loaded()
+
+    def _index(self, user: User) -> None:
+        self._by_id[user.id] = user
+        self._by_email[_email_key(user.email)] = user.id
+        if user.team:
+            self._by_team.setdefault(_team_key(user.team), {})[user.id] = None
+
+    def _unindex(self, user: User) -> None:
+        self._by_email.pop(_email_key(user.email), None)
+        if user.team:
+            members = self._by_team.get(_team_key(user.team))
+            if members is not None:
+                members.pop(user.id, None)
+                if not members:
+                    del self._by_team[_team_key(user.team)]
+
+    def refresh(self) -> None:
+        """Pick up users changed by another process since the last access."""
+        with self._lock:
+            self._ensure_loaded()
+
+    def members(self) -> List[Member]:
+        """(id, team key, default window) of every user, for headcount masks."""
+        with self._lock:
+            self._ensure_loaded()
+            return [
+                (user.id, _team_key(user.team) if user.team else None, default_window(user))
+                for user in self._by_id.values()
+            ]
+
+    def team_names(self) -> Dict[str, str]:
+        """Team key -> team name as spelled by its earliest member."""
+        with self._lock:
+            self._ensure_loaded()
+            return {
+                key: self._by_id[next(iter(members))].team.strip()
+                for key, members in self._by_team.items()
+            }
+
+    def _persist(self) -> None:
+        _save_json(self._users_file, {"users": [u.model_dump(mode="json") for u in self._by_id.values()]})
+        self._stamp = file_stamp(self._users_file)
+        if self._generations is not None:
+            self._generations.bump(USERS_SLOT)
+
+    def all(self) -> List[User]:
+        with self._lock:
+            self._ensure_loaded()
+            return [u.model_copy() for u in self._by_id.values()]
+
+    def by_id(self, user_id: str) -> Optional[User]:
+        with self._lock:
+            self._ensure_loaded()
+            user = self._by_id.get(user_id)
+            return user.model_copy() if user else None
+
+    def by_email(self, email: str) -> Optional[User]:
+        with self._lock:
+            self._ensure_loaded()
+            user_id = self._by_email.get(_email_key(email))
+            return self._by_id[user_id].model_copy() if user_id else None
+
+    def by_team(self, team: Optional[str]) -> List[User]:
+        if not team:
+            return []
+        with self._lock:
+            self._ensure_loaded()
+            members = self._by_team.get(_team_key(team), {})
+            return [self._by_id[user_id].model_copy() for user_id in members]
+
+    def add(self, user: User) -> User:
+        return self.add_many([user])[0]
+
+    def add_many(self, users: List[User]) -> List[User]:
+        """Insert users with one write; nothing is written if any email is taken."""
+        with self._lock, self._file_lock:
+            self._refresh_for_write()
+            keys = set()
+            for user in users:
+                key = _email_key(user.email)
+                if key in self._by_email or key in keys:
+                    raise ValueError(f"User with email {user.email} already exists.")
+                keys.add(key)
+            stored = [user.model_copy() for user in users]
+            for user in stored:
+                self._index(user)
+            try:
+                self._persist()
+            except Exception:
+                for user in stored:
+                    self._unindex(user)
+                    del self._by_id[user.id]
+                raise
+            return users
+
+    def replace(self, user: User) -> User:
+        with self._lock, self._file_lock:
+            self._refresh_for_write()
+            previous = self._by_id.get(user.id)
+            if previous is None:
+                raise ValueError(f"User with id {user.id} not found.")
+            if self._by_email.get(_email_key(user.email), user.id) != user.id:
+                raise ValueError(f"User with email {user.email} already exists.")
+            self._unindex(previous)
+            self._index(user.model_copy())
+            try:
+                self._persist()
+            except Exception:
+                self._unindex(self._by_id[user.id])
+                self._index(previous)
+                raise
+            return user
+
+# ===========================
+# In-memory Participation Index
+# ===========================
+
+# date -> user_id -> meal_type -> record
+_ParticipationIndex = Dict[date, Dict[str, Dict[MealType, MealParticipation]]]
+_DayRecords = Dict[str, Dict[MealType, MealParticipation]]
+
+def _read_journal(filepath: Path) -> List[MealParticipation]:
+    """Read journal lines, ignoring a torn last line left by a crash mid-append."""
+    if not filepath.exists():
+        return []
+    records = []
+    with open(filepath, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(MealParticipation(**json.loads(line)))
+            except (json.JSONDecodeError, ValueError):
+                continue
+    return records
+
+class _ParticipationRepository:
+    """Participation stored as one JSON shard per day, cached in memory.
+
+    Shards live in ``participation_dir`` as ``YYYY-MM-DD.json``. A date's
+    shard is read the first time that date is touched and then indexed by
+    user and meal type; writes rewrite only the shards of the dates they
+    change. Days nobody writes to again are never reparsed or rewritten.
+    As with users, callers always receive copies of the stored records.
+
+    Only changed participation is stored; users without a record for a meal
+    count with that meal's default. Each cached day also keeps its records
+    as bitsets over user ordinals (see ``bitsets``), which every write
+    adjusts, so headcounts and "who is eating" are popcounts and masks
+    rather than walks over the records.
+
+    In journal mode each write appends compact lines to the journal file
+    instead of rewriting shards; ``compact`` folds the journal back into the
+    shards of the dates it touched, working from the files on disk so that
+    entries appended by other processes are never lost.
+
+    ``compact`` also refreshes a binary snapshot of every day's bitsets (see
+    ``snapshot``). Headcounts for a day that is not cached come from the
+    mapped snapshot as long as the day's shard is unchanged since, so cold
+    reads cost the same however much history there is.
+    """
+
+    def __init__(
+        self,
+        participation_dir: Path,
+        journal_file: Path,
+        legacy_file: Optional[Path] = None,
+        journal: bool = False,
+        compact_every: int = 1000,
+        load_members: Callable[[], Iterable[Member]] = list,
+        refresh_members: Callable[[], None] = lambda: None,
+        snapshot_file: Optional[Path] = None,
+        generations: Optional[SharedGenerations] = None,
+    ) -> None:
+        self._participation_dir = participation_dir
+        self._journal_file = journal_file
+        self._rotated_journal_file = journal_file.with_name(journal_file.name + ".1")
+        self._legacy_file = legacy_file
+        self.journal = journal
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(participation_dir / ".lock")
+        self._compaction_lock = FileLock(participation_dir / ".compaction.lock")
+        self._initialized = False
+        self._by_date: _ParticipationIndex = {}
+        self._bits: Dict[date, DayBits] = {}
+        self._columns = UserColumns(load_members)
+        # Lets another process's user changes invalidate the masks before use
+        self._refresh_members = refresh_members
+        self._snapshot_file = snapshot_file
+        self._generations = generations
+        self._snapshot_lock = threading.RLock()
+        self._snapshot: Optional[Snapshot] = None
+        # Snapshot bit -> ordinal here, when the two numberings differ
+        self._snapshot_ordinals: Optional[List[int]] = None
+        # Stamp of the snapshot file last looked at, usable or not
+        self._snapshot_stamp: Optional[FileStamp] = None
+        self._shard_stamps: Dict[date, Optional[FileStamp]] = {}
+        # Journal entries for dates whose shard has not been read yet
+        self._pending: Dict[date, List[MealParticipation]] = {}
+        self._journaled_since_compaction = 0
+
+    def invalidate(self) -> None:
+        """Drop the cache; the next access rereads shards and the journal."""
+        with self._lock:
+            self._initialized = False
+            self._by_date = {}
+            self._bits = {}
+            self._columns.invalidate_masks()
+            self._close_snapshot()
+            self._shard_stamps = {}
+            self._pending = {}
+            self._journaled_since_compaction = 0
+
+    def shard_path(self, target_date: date) -> Path:
+        return self._participation_dir / f"{target_date.isoformat()}.json"
+
+    def _shard_dates(self) -> List[date]:
+        dates = []
+        for path in self._participation_dir.glob("*.json"):
+            try:
+                dates.append(date.fromisoformat(path.stem))
+            except ValueError:
+                continue
+        return sorted(dates)
+
+    def _ensure_initialized(self) -> None:
+        if self._initialized:
+            return
+        self._participation_dir.mkdir(parents=True, exist_ok=True)
+        if self._legacy_file is not None and self._legacy_file.exists():
+            self._migrate_legacy_file()
+        for record in _read_journal(self._rotated_journal_file) + _read_journal(self._journal_file):
+            self._pending.setdefault(record.date, []).append(record)
+        self._initialized = True
+        if not self.journal and self._pending:
+            # Left over from running in journal mode: fold it in now, since
+            # writes in this mode go straight to the shards
+            self.compact()
+
+    def _migrate_legacy_file(self) -> None:
+        """Split a single meal_participation.json into per-day shards."""
+        with self._file_lock:
+            if not self._legacy_file.exists():
+                return  # another process got there first
+            by_date: _ParticipationIndex = {}
+            for row in _load_json(self._legacy_file).get("participation", []):
+                record = MealParticipation(**row)
+                # Older files may hold duplicates; the first one has always won
+                meals = by_date.setdefault(record.date, {}).setdefault(record.user_id, {})
+                meals.setdefault(record.meal_type, record)
+            for target_date, users in by_date.items():
+                for record in self._read_shard(target_date):
+                    users.setdefault(record.user_id, {})[record.meal_type] = record
+                self._write_shard(target_date, users)
+            self._legacy_file.rename(self._legacy_file.with_name(self._legacy_file.name + ".migrated"))
+
+    def _read_shard(self, target_date: date) -> List[MealParticipation]:
+        data = _load_json(self.shard_path(target_date))
+        return [MealParticipation(**row) for row in data.get("participation", [])]
+
+    def _write_shard(self, target_date: date, users: _DayRecords) -> None:
+        rows = [record.model_dump(mode="json") for meals in users.values() for record in meals.values()]
+        _save_json(self.shard_path(target_date), {"participation": rows})
+
+    def _sync_date(self, target_date: date) -> None:
+        """Drop the cached days sharing ``target_date``'s slot if another process wrote one."""
+        if self._generations is None:
+            return
+        slot = date_slot(target_date)
+        if not self._generations.changed(slot):
+            return
+        for cached in [d for d in set(self._by_date) | set(self._bits) if date_slot(d) == slot]:
+            self._by_date.pop(cached, None)
+            self._bits.pop(cached, None)
+            self._shard_stamps.pop(cached, None)
+        if self.journal:
+            # Their changes may only be in the journal; compaction rotates it under the lock
+            for pending in [d for d in self._pending if date_slot(d) == slot]:
+                del self._pending[pending]
+            with self._file_lock:
+                records = _read_journal(self._rotated_journal_file) + _read_journal(self._journal_file)
+            for record in records:
+                if date_slot(record.date) == slot:
+                    self._pending.setdefault(record.date, []).append(record)
+
+    def _day(self, target_date: date) -> _DayRecords:
+        """The indexed records for one date, reading its shard on first use."""
+        self._ensure_initialized()
+        self._sync_date(target_date)
+        users = self._by_date.get(target_date)
+        if users is None:
+            users = {}
+            self._shard_stamps[target_date] = file_stamp(self.shard_path(target_date))
+            for record in self._read_shard(target_date):
+                users.setdefault(record.user_id, {}).setdefault(record.meal_type, record)
+            # Journal entries are newer than the shard and replace what it holds
+            for record in self._pending.pop(target_date, []):
+                users.setdefault(record.user_id, {})[record.meal_type] = record
+            self._by_date[target_date] = users
+            self._bits[target_date] = bits = DayBits()
+            for user_id, meals in users.items():
+                ordinal = self._columns.ordinal(user_id)
+                for record in meals.values():
+                    bits.set(ordinal, record.meal_type, record.is_participating)
+        return users
+
+    def _mark(self, target_date: date, user_id: str, meal_type: MealType,
+              record: Optional[MealParticipation]) -> None:
+        """Mirror the stored record (or its absence) for one slot into the day's bits."""
+        self._bits[target_date].set(
+            self._columns.ordinal(user_id), meal_type, record.is_participating if record else None
+        )
+
+    def _scope(self, team_key: Optional[str]) -> Optional[int]:
+        return None if team_key is None else self._columns.team_mask(team_key)
+
+    def _day_bits(self, target_date: date) -> DayBits:
+        """The bitsets of one date, from the snapshot if its shard was not read yet."""
+        self._ensure_initialized()
+        self._sync_date(target_date)
+        bits = self._bits.get(target_date)
+        if bits is None:
+            bits = self._snapshot_bits(target_date)
+            if bits is not None:
+                self._bits[target_date] = bits
+            else:
+                self._day(target_date)
+                bits = self._bits[target_date]
+        return bits
+
+    def headcount(self, target_date: date, team_key: Optional[str] = None) -> Dict[str, int]:
+        with self._lock:
+            self._refresh_members()
+            bits = self._day_bits(target_date)
+            return bits.headcount(self._columns.defaults_mask(target_date), self._scope(team_key))
+
+    def headcount_range(self, dates: Iterable[date], team_key: Optional[str] = None) -> Dict[date, Dict[str, int]]:
+        """``headcount`` of many dates, with the team mask looked up once."""
+        with self._lock:
+            self._refresh_members()
+            scope = self._scope(team_key)
+            return {d: self._day_bits(d).headcount(self._columns.defaults_mask(d), scope) for d in dates}
+
+    def team_headcount_range(
+        self, dates: Iterable[date], team_names: Dict[str, str]
+    ) -> Dict[date, Dict[str, Dict[str, int]]]:
+        """Per date, the headcount of every team in ``team_names`` (key -> name)."""
+        with self._lock:
+            self._refresh_members()
+            scopes = {name: self._columns.team_mask(key) for key, name in team_names.items()}
+            return {d: self._day_bits(d).headcounts(self._columns.defaults_mask(d), scopes) for d in dates}
+
+    def participants(self, target_date: date, meal_type: MealType, team_key: Optional[str] = None) -> List[str]:
+        """Ids of the users eating ``meal_type`` on ``target_date``."""
+        with self._lock:
+            self._refresh_members()
+            mask = self._day_bits(target_date).eating(meal_type, self._columns.defaults_mask(target_date))
+            scope = self._scope(team_key)
+            return self._columns.user_ids(mask if scope is None else mask & scope)
+
+    def invalidate_members(self) -> None:
+        """A user was added or changed team or active state: rebuild masks on next use."""
+        self._columns.invalidate_masks()
+
+    def _refresh_for_write(self, dates: set) -> None:
+        """Called under the file lock: drop cached days another process rewrote."""
+        for target_date in dates:
+            if target_date in self._by_date and \
+                    file_stamp(self.shard_path(target_date)) != self._shard_stamps.get(target_date):
+                del self._by_date[target_date]
+                del self._bits[target_date]
+            elif target_date not in self._by_date:
+                # Bits taken from the snapshot are rebuilt from the shard by _day
+                self._bits.pop(target_date, None)
+
+    def _persist(self, changed: List[MealParticipation]) -> None:
+        if self.journal:
+            lines = "".join(
+                json.dumps(record.model_dump(mode="json"), separators=(",", ":"), ensure_ascii=False) + "\n"
+                for record in changed
+            )
+            append_lines(self._journal_file, lines)
+            self._journaled_since_compaction += len(changed)
+            if self._journaled_since_compaction >= self.compact_every:
+                self._journaled_since_compaction = 0
+                threading.Thread(target=self.compact, name="participation-compaction", daemon=True).start()
+            return
+        for target_date in {record.date for record in changed}:
+            self._write_shard(target_date, self._by_date[target_date])
+            self._shard_stamps[target_date] = file_stamp(self.shard_path(target_date))
+
+    def compact(self) -> None:
+        """Fold the journal into the shards of the dates it touched, then
+        refresh the snapshot.
+
+        The live journal is rotated aside under the lock so writers keep
+        appending while shards are rewritten from disk; the rotated file is
+        only removed once every shard it covers is safely in place.
+        """
+        with self._compaction_lock:
+            self._fold_journal()
+            if self._snapshot_file is not None:
+                self._write_snapshot()
+
+    def _fold_journal(self) -> None:
+        with self._file_lock:
+            rotated = self._rotated_journal_file
+            if self._journal_file.exists():
+                if rotated.exists():
+                    # Left over from an interrupted compaction: keep both on disk
+                    with open(self._journal_file, "r", encoding="utf-8") as src, \
+                            open(rotated, "a", encoding="utf-8") as dst:
+                        dst.write(src.read())
+                    self._journal_file.unlink()
+                else:
+                    self._journal_file.rename(rotated)
+            if not rotated.exists():
+                return
+
+        changes: Dict[date, List[MealParticipation]] = {}
+        for record in _read_journal(rotated):
+            changes.setdefault(record.date, []).append(record)
+        for target_date, records in changes.items():
+            users: _DayRecords = {}
+            for record in self._read_shard(target_date):
+                users.setdefault(record.user_id, {}).setdefault(record.meal_type, record)
+            for record in records:
+                users.setdefault(record.user_id, {})[record.meal_type] = record
+            self._write_shard(target_date, users)
+        rotated.unlink()
+
+    def _write_snapshot(self) -> None:
+        """Rewrite the snapshot from the shards, reusing entries whose shard is unchanged."""
+        previous = self._open_snapshot()
+        days = {}
+        for target_date in self._shard_dates():
+            # Stamp before reading: a rewrite in between just leaves a stale entry
+            stamp = file_stamp(self.shard_path(target_date))
+            if stamp is None:
+                continue
+            with self._snapshot_lock:
+                # Another thread may have replaced (and closed) it meanwhile
+                usable = previous is not None and previous is self._snapshot
+                entry = self._snapshot_day(previous, target_date) if usable else None
+            if entry is not None and entry[0] == stamp:
+                bits = entry[1]
+            else:
+                bits = DayBits()
+                for record in self._read_shard(target_date):
+                    bits.set(self._columns.ordinal(record.user_id), record.meal_type, record.is_participating)
+            days[target_date] = (stamp, bits)
+        write_snapshot(self._snapshot_file, self._columns.all_user_ids(), days)
+
+    def _open_snapshot(self) -> Optional[Snapshot]:
+        """The current snapshot file, mapped, if there is a readable one."""
+        if self._snapshot_file is None:
+            return None
+        with self._snapshot_lock:
+            stamp = file_stamp(self._snapshot_file)
+            if stamp != self._snapshot_stamp:
+                self._close_snapshot()
+                self._snapshot_stamp = stamp
+                if stamp is not None:
+                    try:
+                        snapshot = Snapshot(self._snapshot_file)
+                    except (OSError, ValueError):
+                        snapshot = None
+                    if snapshot is not None:
+                        self._snapshot = snapshot
+                        self._snapshot_ordinals = self._columns.adopt(snapshot.user_ids)
+            return self._snapshot
+
+    def _close_snapshot(self) -> None:
+        with self._snapshot_lock:
+            if self._snapshot is not None:
+                self._snapshot.close()
+            self._snapshot = None
+            self._snapshot_ordinals = None
+            self._snapshot_stamp = None
+
+    def _snapshot_day(self, snapshot: Snapshot, target_date: date) -> Optional[Tuple[FileStamp, DayBits]]:
+        """A snapshot entry with its bits renumbered to this process's ordinals."""
+        entry = snapshot.day(target_date)
+        if entry is None or self._snapshot_ordinals is None:
+            return entry
+        return entry[0], entry[1].remapped(self._snapshot_ordinals)
+
+    def _snapshot_bits(self, target_date: date) -> Optional[DayBits]:
+        if target_date in self._pending:
+            return None  # the journal holds newer changes than the shard
+        with self._snapshot_lock:
+            snapshot = self._open_snapshot()
+            entry = self._snapshot_day(snapshot, target_date) if snapshot is not None else None
+        stamp = file_stamp(self.shard_path(target_date))
+        if entry is None:
+            return DayBits() if stamp is None else None
+        return entry[1] if entry[0] == stamp else None
+
+    def all(self) -> List[MealParticipation]:
+        with self._lock:
+            self._ensure_initialized()
+            dates = sorted(set(self._shard_dates()) | set(self._by_date) | set(self._pending))
+            return [
+                record.model_copy()
+                for target_date in dates
+                for meals in self._day(target_date).values()
+                for record in meals.values()
+            ]
+
+    def for_date(self, target_date: date) -> List[MealParticipation]:
+        with self._lock:
+            users = self._day(target_date)
+            return [record.model_copy() for meals in users.values() for record in meals.values()]
+
+    def scan(self, target_date: date) -> List[MealParticipation]:
+        """``for_date`` without adding the day to the cache (for long scans)."""
+        with self._lock:
+            self._ensure_initialized()
+            self._sync_date(target_date)
+            users = self._by_date.get(target_date)
+            if users is not None:
+                return [record.model_copy() for meals in users.values() for record in meals.values()]
+            records: Dict[tuple, MealParticipation] = {}
+            for record in self._read_shard(target_date):
+                records.setdefault((record.user_id, record.meal_type), record)
+            for record in self._pending.get(target_date, []):
+                records[(record.user_id, record.meal_type)] = record
+            return list(records.values())
+
+    def for_user(self, user_id: str, target_date: date) -> List[MealParticipation]:
+        with self._lock:
+            meals = self._day(target_date).get(user_id, {})
+            return [record.model_copy() for record in meals.values()]
+
+    def get(self, user_id: str, target_date: date, meal_type: MealType) -> Optional[MealParticipation]:
+        with self._lock:
+            record = self._day(target_date).get(user_id, {}).get(meal_type)
+            return record.model_copy() if record else None
+
+    def put(self, records: List[MealParticipation]) -> None:
+        """Insert or replace records (keyed by date, user and meal) and persist once."""
+        with self._lock:
+            self._ensure_initialized()
+            with self._file_lock:
+                if not self.journal:
+                    self._refresh_for_write({record.date for record in records})
+                previous = []
+                for record in records:
+                    meals = self._day(record.date).setdefault(record.user_id, {})
+                    old = meals.get(record.meal_type)
+                    new = meals[record.meal_type] = record.model_copy()
+                    previous.append((meals, old, new))
+                    self._mark(new.date, new.user_id, new.meal_type, new)
+                try:
+                    self._persist(records)
+                except Exception:
+                    for meals, old, new in reversed(previous):
+                        self._mark(new.date, new.user_id, new.meal_type, old)
+                        if old is None:
+                            meals.pop(new.meal_type, None)
+                        else:
+                            meals[new.meal_type] = old
+                    raise
+                if self._generations is not None:
+                    for slot in {date_slot(record.date) for record in records}:
+                        self._generations.bump(slot)
+
+# ===========================
+# JSON Backend
+# ===========================
+
+class JSONStorageBackend(StorageBackend):
+    """Stores everything as JSON files in ``data_dir``."""
+
+    def __init__(
+        self,
+        data_dir: Path,
+        journal: bool = False,
+        journal_compact_every: int = 1000,
+        snapshot: bool = True,
+    ) -> None:
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.users_file = self.data_dir / "users.json"
+        self.participation_dir = self.data_dir / "participation"
+        self.participation_journal_file = self.data_dir / "meal_participation.journal"
+        self.participation_snapshot_file = self.participation_dir / "snapshot.bin"
+        # Single-file layout used before per-day shards; migrated on first access
+        self.legacy_participation_file = self.data_dir / "meal_participation.json"
+        self.meal_config_file = self.data_dir / "meal_config.json"
+        self.refresh_tokens_file = self.data_dir / "refresh_tokens.json"
+
+        self._generations = SharedGenerations(self.data_dir / ".generations")
+        self._users = _UserRepository(
+            self.users_file,
+            generations=self._generations,
+            on_foreign_change=lambda: self._participation.invalidate_members(),
+        )
+        self._participation = _ParticipationRepository(
+            self.participation_dir,
+            self.participation_journal_file,
+            legacy_file=self.legacy_participation_file,
+            journal=journal,
+            compact_every=journal_compact_every,
+            load_members=self._users.members,
+            refresh_members=self._users.refresh,
+            snapshot_file=self.participation_snapshot_file if snapshot else None,
+            generations=self._generations,
+        )
+        self._meal_config_lock = FileLock(self.data_dir / ".meal_config.lock")
+        self._refresh_tokens_lock = FileLock(self.data_dir / ".refresh_tokens.lock")
+
+    def invalidate(self) -> None:
+        """Drop every in-memory cache so the next access rereads the files."""
+        self._users.invalidate()
+        self._participation.invalidate()
+
+    # Users
+
+    def get_all_users(self) -> List[User]:
+        return self._users.all()
+
+    def get_user_by_id(self, user_id: str) -> Optional[User]:
+        return self._users.by_id(user_id)
+
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        return self._users.by_email(email)
+
+    def get_users_by_team(self, team: Optional[str]) -> List[User]:
+        return self._users.by_team(team)
+
+    def create_user(self, user: User) -> User:
+        created = self._users.add(user)
+        self._participation.invalidate_members()
+        return created
+
+    def create_users(self, users: List[User]) -> List[User]:
+        created = self._users.add_many(users)
+        self._participation.invalidate_members()
+        return created
+
+    def update_user(self, user: User) -> User:
+        updated = self._users.replace(user)
+        self._participation.invalidate_members()
+        return updated
+
+    # Meal Participation
+
+    def get_all_participation(self) -> List[MealParticipation]:
+        return self._participation.all()
+
+    def get_participation_by_date(self, target_date: date) -> List[MealParticipation]:
+        return self._participation.for_date(target_date)
+
+    def get_user_participation(self, user_id: str, target_date: date) -> List[MealParticipation]:
+        return self._participation.for_user(user_id, target_date)
+
+    def iter_participation_by_date(
+        self, start: date, end: date
+    ) -> Iterator[Tuple[date, List[MealParticipation]]]:
+        for day in date_range(start, end):
+            yield day, self._participation.scan(day)
+
+    def get_participation(
+        self, user_id: str, target_date: date, meal_type: MealType
+    ) -> Optional[MealParticipation]:
+        return self._participation.get(user_id, target_date, meal_type)
+
+    def save_participation(self, records: List[MealParticipation]) -> None:
+        self._participation.put(records)
+
+    def get_headcount(self, target_date: date, team: Optional[str] = None) -> Dict[str, int]:
+        if team is None:
+            return self._participation.headcount(target_date)
+        if not team:
+            return headcount_with_defaults({}, {}, 0)
+        return self._participation.headcount(target_date, team_key=_team_key(team))
+
+    def get_headcount_range(
+        self, start: date, end: date, team: Optional[str] = None
+    ) -> Dict[date, Dict[str, int]]:
+        if team is not None and not team:
+            return {day: headcount_with_defaults({}, {}, 0) for day in date_range(start, end)}
+        team_key = _team_key(team) if team else None
+        return self._participation.headcount_range(date_range(start, end), team_key=team_key)
+
+    def get_team_headcount_range(self, start: date, end: date) -> Dict[date, Dict[str, Dict[str, int]]]:
+        return self._participation.team_headcount_range(date_range(start, end), self._users.team_names())
+
+    def get_participants(
+        self, target_date: date, meal_type: MealType, team: Optional[str] = None
+    ) -> List[str]:
+        if team is None:
+            return self._participation.participants(target_date, meal_type)
+        if not team:
+            return []
+        return self._participation.participants(target_date, meal_type, team_key=_team_key(team))
+
+    # Meal Configuration
+
+    def load_meal_config(self) -> Optional[Dict[str, bool]]:
+        if not self.meal_config_file.exists():
+            return None
+        return _load_json(self.meal_config_file).get("enabled_meals", {})
+
+    def save_meal_config(self, config: Dict[str, bool]) -> None:
+        _save_json(self.meal_config_file, {"enabled_meals": config})
+
+    def meal_config_version(self) -> Optional[FileStamp]:
+        return file_stamp(self.meal_config_file)
+
+    def users_version(self) -> int:
+        return self._generations.value(USERS_SLOT)
+
+    def data_version(self) -> tuple:
+        # Every user and participation write, from any process, bumps a generation
+        return self._generations.values(), file_stamp(self.meal_config_file)
+
+    def set_meal_enabled(self, meal_type: str, enabled: bool) -> Dict[str, bool]:
+        with self._meal_config_lock:
+            return super().set_meal_enabled(meal_type, enabled)
+
+    # Refresh Tokens
+    # Read on every refresh and not cached: refreshes are rare next to
+    # other requests, and revocation must be seen by every process at once
+
+    def _load_refresh_tokens(self) -> Dict[str, RefreshToken]:
+        if not self.refresh_tokens_file.exists():
+            return {}
+        rows = _load_json(self.refresh_tokens_file).get("refresh_tokens", [])
+        return {row["token_hash"]: RefreshToken(**row) for row in rows}
+
+    def _save_refresh_tokens(self, tokens: Dict[str, RefreshToken]) -> None:
+        # Expired tokens are useless whether revoked or not: drop them
+        now = datetime.now()
+        _save_json(self.refresh_tokens_file, {
+            "refresh_tokens": [t.model_dump() for t in tokens.values() if t.expires_at > now]
+        })
+
+    def save_refresh_token(self, token: RefreshToken) -> None:
+        with self._refresh_tokens_lock:
+            tokens = self._load_refresh_tokens()
+            tokens[token.token_hash] = token
+            self._save_refresh_tokens(tokens)
+
+    def get_refresh_token(self, token_hash: str) -> Optional[RefreshToken]:
+        return self._load_refresh_tokens().get(token_hash)
+
+    def rotate_refresh_token(self, token_hash: str, replacement: RefreshToken) -> bool:
+        with self._refresh_tokens_lock:
+            tokens = self._load_refresh_tokens()
+            current = tokens.get(token_hash)
+            if current is None or current.revoked_at is not None:
+                return False
+            current.revoked_at = datetime.now()
+            tokens[replacement.token_hash] = replacement
+            self._save_refresh_tokens(tokens)
+            return True
+
+    def revoke_refresh_tokens(self, family_id: Optional[str] = None, user_id: Optional[str] = None) -> int:
+        with self._refresh_tokens_lock:
+            tokens = self._load_refresh_tokens()
+            now = datetime.now()
+            revoked = 0
+            for token in tokens.values():
+                if token.revoked_at is None and (
+                    (family_id is not None and token.family_id == family_id)
+                    or (user_id is not None and token.user_id == user_id)
+                ):
+                    token.revoked_at = now
+                    revoked += 1
+            if revoked:
+                self._save_refresh_tokens(tokens)
+            return revoked
+
+    # Maintenance
+
+    def compact(self) -> None:
+        self._participation.compact()
+
+    def close(self) -> None:
+        # Unmaps the snapshot; anything used afterwards is reloaded
+        self.invalidate()
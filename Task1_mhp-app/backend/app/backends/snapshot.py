@@ -0,0 +1,120 @@
+"""
+Fixed-width binary snapshot of per-day participation bitsets.
+
+Written at compaction time and opened with ``mmap``, so a headcount for a
+day that is not cached yet is read straight from the mapped file instead
+of parsing that day's JSON shard into ``MealParticipation`` objects.
+Opening it reads only the header and the user table; nothing scales with
+the number of days or records.
+
+Layout (little endian, every section fixed width):
+
+    header  magic, meal type count, id width, user count, date count, row bytes
+    users   user count x id width: user id, NUL padded; position = ordinal
+    index   date count x (date ordinal i32, shard stamp 3 x u64), sorted by date
+    data    date count x meal type count x 2 rows of ``row bytes``:
+            the "recorded" then the "participating" bitset (see ``bitsets``)
+
+A date is found by binary search over the index. Each entry keeps the
+stamp of the shard it was built from; when the shard changes after that,
+the entry is stale and the shard itself must be read instead.
+"""
+
+import mmap
+import os
+import struct
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.backends.bitsets import DayBits
+from app.backends.fileio import FileStamp, atomic_write_bytes
+from app.models import MealType
+
+MAGIC = b"MHPSNAP1"
+_HEADER = struct.Struct("<8sIIIII")
+_INDEX_ENTRY = struct.Struct("<iQQQ")
+_DATE = struct.Struct("<i")
+
+
+def write_snapshot(path: Path, user_ids: List[str], days: Dict[date, Tuple[FileStamp, DayBits]]) -> None:
+    """Write a snapshot of ``days``; bit ``n`` of every bitset is ``user_ids[n]``."""
+    encoded = [user_id.encode("utf-8") for user_id in user_ids]
+    id_width = max((len(e) for e in encoded), default=0)
+    row_bytes = (len(user_ids) + 7) // 8
+    dates = sorted(days)
+
+    parts = [_HEADER.pack(MAGIC, len(MealType), id_width, len(user_ids), len(dates), row_bytes)]
+    parts += [e.ljust(id_width, b"\0") for e in encoded]
+    parts += [_INDEX_ENTRY.pack(d.toordinal(), *days[d][0]) for d in dates]
+    for d in dates:
+        bits = days[d][1]
+        for meal_type in MealType:
+            parts.append(bits.recorded[meal_type].to_bytes(row_bytes, "little"))
+            parts.append(bits.participating[meal_type].to_bytes(row_bytes, "little"))
+    atomic_write_bytes(path, b"".join(parts))
+
+
+class Snapshot:
+    """A snapshot file mapped read-only into memory.
+
+    Raises ValueError if the file is not a snapshot this version can read.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.stamp: FileStamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, meal_types, id_width, user_count, date_count, row_bytes = _HEADER.unpack_from(self._mm)
+            if magic != MAGIC or meal_types != len(MealType):
+                raise ValueError(f"{path} is not a participation snapshot")
+            users_end = _HEADER.size + user_count * id_width
+            self.user_ids: List[str] = [
+                self._mm[offset:offset + id_width].rstrip(b"\0").decode("utf-8")
+                for offset in range(_HEADER.size, users_end, id_width)
+            ] if id_width else [""] * user_count
+            self._index_offset = users_end
+            self._data_offset = users_end + date_count * _INDEX_ENTRY.size
+            self._date_count = date_count
+            self._row_bytes = row_bytes
+            if len(self._mm) != self._data_offset + date_count * meal_types * 2 * row_bytes:
+                raise ValueError(f"{path} is truncated")
+        except (ValueError, struct.error):
+            self._mm.close()
+            raise
+        self._view = memoryview(self._mm)
+
+    def close(self) -> None:
+        self._view.release()
+        self._mm.close()
+
+    def _find(self, target_date: date) -> Optional[int]:
+        key = target_date.toordinal()
+        lo, hi = 0, self._date_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found = _DATE.unpack_from(self._mm, self._index_offset + mid * _INDEX_ENTRY.size)[0]
+            if found < key:
+                lo = mid + 1
+            elif found > key:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def day(self, target_date: date) -> Optional[Tuple[FileStamp, DayBits]]:
+        """Shard stamp and bitsets stored for ``target_date``, or None if absent."""
+        position = self._find(target_date)
+        if position is None:
+            return None
+        _, ino, size, mtime_ns = _INDEX_ENTRY.unpack_from(self._mm, self._index_offset + position * _INDEX_ENTRY.size)
+        row = self._row_bytes
+        offset = self._data_offset + position * len(MealType) * 2 * row
+        bits = DayBits()
+        for meal_type in MealType:
+            bits.recorded[meal_type] = int.from_bytes(self._view[offset:offset + row], "little")
+            bits.participating[meal_type] = int.from_bytes(self._view[offset + row:offset + 2 * row], "little")
+            offset += 2 * row
+        return (ino, size, mtime_ns), bits
@@ -0,0 +1,538 @@
+"""
+SQLite storage backend.
+
+A single database file in WAL mode: readers never block the writer, every
+write is one transaction, and lookups go through indexes instead of scans.
+Each thread gets its own connection because sqlite3 connections must not be
+shared across threads.
+"""
+
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple
+
+from app.backends.base import (
+    StorageBackend, daily_default_counts, date_range, default_meal_config, headcount_with_defaults,
+)
+from app.models import User, MealParticipation, MealType, RefreshToken, DEFAULT_OPTED_IN_MEALS, user_from_storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id            TEXT PRIMARY KEY,
+    name          TEXT NOT NULL,
+    email         TEXT NOT NULL,
+    email_key     TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    role          TEXT NOT NULL,
+    team          TEXT,
+    team_key      TEXT,
+    is_active     INTEGER NOT NULL,
+    created_at    TEXT NOT NULL,
+    position      INTEGER NOT NULL,
+    deactivated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_team_key ON users (team_key);
+
+CREATE TABLE IF NOT EXISTS meal_participation (
+    id               TEXT PRIMARY KEY,
+    user_id          TEXT NOT NULL,
+    date             TEXT NOT NULL,
+    meal_type        TEXT NOT NULL,
+    is_participating INTEGER NOT NULL,
+    updated_by       TEXT,
+    updated_at       TEXT NOT NULL,
+    UNIQUE (user_id, date, meal_type)
+);
+CREATE INDEX IF NOT EXISTS idx_participation_date
+    ON meal_participation (date, meal_type, is_participating);
+
+CREATE TABLE IF NOT EXISTS meal_config (
+    meal_type TEXT PRIMARY KEY,
+    enabled   INTEGER NOT NULL
+);
+
+-- Single row, bumped by every meal_config write (see meal_config_version)
+CREATE TABLE IF NOT EXISTS meal_config_version (
+    id      INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meal_config_version (id, version) VALUES (1, 0);
+
+-- Single row, bumped by every write to users (see users_version)
+CREATE TABLE IF NOT EXISTS users_version (
+    id      INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO users_version (id, version) VALUES (1, 0);
+
+-- Single row, bumped by every write to users, participation or meal config
+-- (see data_version)
+CREATE TABLE IF NOT EXISTS data_version (
+    id      INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0);
+
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    token_hash TEXT PRIMARY KEY,
+    user_id    TEXT NOT NULL,
+    family_id  TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    revoked_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family ON refresh_tokens (family_id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user ON refresh_tokens (user_id);
+"""
+
+_BUMP_MEAL_CONFIG_VERSION = "UPDATE meal_config_version SET version = version + 1"
+_BUMP_USERS_VERSION = "UPDATE users_version SET version = version + 1"
+_BUMP_DATA_VERSION = "UPDATE data_version SET version = version + 1"
+
+USER_COLUMNS = "id, name, email, password_hash, role, team, is_active, created_at, deactivated_at"
+PARTICIPATION_COLUMNS = "id, user_id, date, meal_type, is_participating, updated_by, updated_at"
+REFRESH_TOKEN_COLUMNS = "token_hash, user_id, family_id, expires_at, created_at, revoked_at"
+
+# SQL twin of models.default_window / gets_defaults for users ``u`` on ``{day}``;
+# ISO timestamps start with the date, so the first 10 characters compare as dates
+_GETS_DEFAULTS = (
+    "substr(u.created_at, 1, 10) <= {day}"
+    " AND (u.is_active = 1 OR substr(u.deactivated_at, 1, 10) > {day})"
+)
+# Users with a default window, grouped by it; add WHERE / GROUP BY extras
+_DEFAULT_WINDOWS = """
+    SELECT {extra}substr(created_at, 1, 10) AS first_day,
+           CASE WHEN is_active = 1 THEN NULL ELSE substr(deactivated_at, 1, 10) END AS until,
+           COUNT(*) AS users
+    FROM users WHERE (is_active = 1 OR deactivated_at IS NOT NULL){where}
+    GROUP BY {extra}first_day, until
+"""
+
+
+def _team_key(team: Optional[str]) -> Optional[str]:
+    return team.strip().casefold() if team else None
+
+def _window(row: sqlite3.Row) -> Tuple[date, Optional[date], int]:
+    """(first day, end day or None, user count) of a ``_DEFAULT_WINDOWS`` row."""
+    until = date.fromisoformat(row["until"]) if row["until"] else None
+    return date.fromisoformat(row["first_day"]), until, row["users"]
+
+def _row_to_participation(row: sqlite3.Row) -> MealParticipation:
+    return MealParticipation(
+        id=row["id"],
+        user_id=row["user_id"],
+        date=date.fromisoformat(row["date"]),
+        meal_type=MealType(row["meal_type"]),
+        is_participating=bool(row["is_participating"]),
+        updated_by=row["updated_by"],
+        updated_at=datetime.fromisoformat(row["updated_at"]),
+    )
+
+def _row_to_refresh_token(row: sqlite3.Row) -> RefreshToken:
+    return RefreshToken(
+        token_hash=row["token_hash"],
+        user_id=row["user_id"],
+        family_id=row["family_id"],
+        expires_at=datetime.fromisoformat(row["expires_at"]),
+        created_at=datetime.fromisoformat(row["created_at"]),
+        revoked_at=datetime.fromisoformat(row["revoked_at"]) if row["revoked_at"] else None,
+    )
+
+def _insert_refresh_token(conn: sqlite3.Connection, token: RefreshToken) -> None:
+    # Expired tokens are useless whether revoked or not: drop them on the way
+    conn.execute("DELETE FROM refresh_tokens WHERE expires_at <= ?", (datetime.now().isoformat(),))
+    conn.execute(
+        f"INSERT INTO refresh_tokens ({REFRESH_TOKEN_COLUMNS}) VALUES (?, ?, ?, ?, ?, NULL)",
+        (
+            token.token_hash, token.user_id, token.family_id,
+            token.expires_at.isoformat(), token.created_at.isoformat(),
+        ),
+    )
+
+
+class SQLiteStorageBackend(StorageBackend):
+    """Stores everything in one SQLite database file."""
+
+    def __init__(self, database_path: Path) -> None:
+        self.database_path = Path(database_path)
+        self.database_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.executescript(SCHEMA)
+            # Databases created before deactivation dates were recorded
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(users)")}
+            if "deactivated_at" not in columns:
+                conn.execute("ALTER TABLE users ADD COLUMN deactivated_at TEXT")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.database_path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    # Users
+
+    def get_all_users(self) -> List[User]:
+        rows = self._connection().execute(f"SELECT {USER_COLUMNS} FROM users ORDER BY position")
+        return [user_from_storage(row) for row in rows]
+
+    def get_user_by_id(self, user_id: str) -> Optional[User]:
+        row = self._connection().execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE id = ?", (user_id,)
+        ).fetchone()
+        return user_from_storage(row) if row else None
+
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        row = self._connection().execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE email_key = ?", (email.casefold(),)
+        ).fetchone()
+        return user_from_storage(row) if row else None
+
+    def get_users_by_team(self, team: Optional[str]) -> List[User]:
+        if not team:
+            return []
+        rows = self._connection().execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE team_key = ? ORDER BY position",
+            (_team_key(team),),
+        )
+        return [user_from_storage(row) for row in rows]
+
+    def create_user(self, user: User) -> User:
+        return self.create_users([user])[0]
+
+    def create_users(self, users: List[User]) -> List[User]:
+        conn = self._connection()
+        try:
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO users (id, name, email, email_key, password_hash, role, team,
+                                       team_key, is_active, created_at, deactivated_at, position)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                            (SELECT COALESCE(MAX(position), 0) + 1 FROM users))
+                    """,
+                    [
+                        (
+                            user.id, user.name, user.email, user.email.casefold(), user.password_hash,
+                            user.role.value, user.team, _team_key(user.team), int(user.is_active),
+                            user.created_at.isoformat(),
+                            user.deactivated_at.isoformat() if user.deactivated_at else None,
+                        )
+                        for user in users
+                    ],
+                )
+                conn.execute(_BUMP_USERS_VERSION)
+                conn.execute(_BUMP_DATA_VERSION)
+        except sqlite3.IntegrityError:
+            taken = self._taken_email(users)
+            raise ValueError(f"User with email {taken} already exists.")
+        return users
+
+    def _taken_email(self, users: List[User]) -> str:
+        """Best-effort name of the email that made a (rolled back) insert fail."""
+        keys = set()
+        for user in users:
+            key = user.email.casefold()
+            if key in keys or self.get_user_by_email(user.email) is not None:
+                return user.email
+            keys.add(key)
+        return users[0].email if users else ""
+
+    def update_user(self, user: User) -> User:
+        conn = self._connection()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    """
+                    UPDATE users
+                    SET name = ?, email = ?, email_key = ?, password_hash = ?, role = ?,
+                        team = ?, team_key = ?, is_active = ?, deactivated_at = ?
+                    WHERE id = ?
+                    """,
+                    (
+                        user.name, user.email, user.email.casefold(), user.password_hash, user.role.value,
+                        user.team, _team_key(user.team), int(user.is_active),
+                        user.deactivated_at.isoformat() if user.deactivated_at else None, user.id,
+                    ),
+                )
+                conn.execute(_BUMP_USERS_VERSION)
+                conn.execute(_BUMP_DATA_VERSION)
+        except sqlite3.IntegrityError:
+            raise ValueError(f"User with email {user.email} already exists.")
+        if cursor.rowcount == 0:
+            raise ValueError(f"User with id {user.id} not found.")
+        return user
+
+    # Meal Participation
+
+    def get_all_participation(self) -> List[MealParticipation]:
+        rows = self._connection().execute(
+            f"SELECT {PARTICIPATION_COLUMNS} FROM meal_participation ORDER BY date, rowid"
+        )
+        return [_row_to_participation(row) for row in rows]
+
+    def get_participation_by_date(self, target_date: date) -> List[MealParticipation]:
+        rows = self._connection().execute(
+            f"SELECT {PARTICIPATION_COLUMNS} FROM meal_participation WHERE date = ? ORDER BY rowid",
+            (target_date.isoformat(),),
+        )
+        return [_row_to_participation(row) for row in rows]
+
+    def get_user_participation(self, user_id: str, target_date: date) -> List[MealParticipation]:
+        rows = self._connection().execute(
+            f"SELECT {PARTICIPATION_COLUMNS} FROM meal_participation WHERE user_id = ? AND date = ? ORDER BY rowid",
+            (user_id, target_date.isoformat()),
+        )
+        return [_row_to_participation(row) for row in rows]
+
+    def get_participation(
+        self, user_id: str, target_date: date, meal_type: MealType
+    ) -> Optional[MealParticipation]:
+        row = self._connection().execute(
+            f"""
+            SELECT {PARTICIPATION_COLUMNS} FROM meal_participation
+            WHERE user_id = ? AND date = ? AND meal_type = ?
+            """,
+            (user_id, target_date.isoformat(), meal_type.value),
+        ).fetchone()
+        return _row_to_participation(row) if row else None
+
+    def save_participation(self, records: List[MealParticipation]) -> None:
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO meal_participation (id, user_id, date, meal_type, is_participating,
+                                                updated_by, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, date, meal_type) DO UPDATE SET
+                    is_participating = excluded.is_participating,
+                    updated_by = excluded.updated_by,
+                    updated_at = excluded.updated_at
+                """,
+                [
+                    (
+                        r.id, r.user_id, r.date.isoformat(), r.meal_type.value,
+                        int(r.is_participating), r.updated_by, r.updated_at.isoformat(),
+                    )
+                    for r in records
+                ],
+            )
+            conn.execute(_BUMP_DATA_VERSION)
+
+    def get_headcount(self, target_date: date, team: Optional[str] = None) -> Dict[str, int]:
+        return self.get_headcount_range(target_date, target_date, team)[target_date]
+
+    def get_headcount_range(
+        self, start: date, end: date, team: Optional[str] = None
+    ) -> Dict[date, Dict[str, int]]:
+        if team is not None and not team:
+            return {day: headcount_with_defaults({}, {}, 0) for day in date_range(start, end)}
+
+        query = f"""
+            SELECT p.date, p.meal_type,
+                   SUM(p.is_participating) AS participating,
+                   SUM(CASE WHEN {_GETS_DEFAULTS.format(day="p.date")} THEN 1 ELSE 0 END) AS recorded_active
+            FROM meal_participation p LEFT JOIN users u ON u.id = p.user_id
+            WHERE p.date BETWEEN ? AND ?
+        """
+        params: list = [start.isoformat(), end.isoformat()]
+        windows_query = _DEFAULT_WINDOWS.format(extra="", where=" AND team_key = ?" if team is not None else "")
+        windows_params: list = []
+        if team is not None:
+            query += " AND u.team_key = ?"
+            params.append(_team_key(team))
+            windows_params.append(_team_key(team))
+        query += " GROUP BY p.date, p.meal_type"
+
+        conn = self._connection()
+        participating: Dict[str, Dict[MealType, int]] = {}
+        recorded_active: Dict[str, Dict[MealType, int]] = {}
+        for row in conn.execute(query, params):
+            meal_type = MealType(row["meal_type"])
+            participating.setdefault(row["date"], {})[meal_type] = row["participating"]
+            recorded_active.setdefault(row["date"], {})[meal_type] = row["recorded_active"]
+        active_users = daily_default_counts(
+            (_window(row) for row in conn.execute(windows_query, windows_params)), start, end
+        )
+        return {
+            day: headcount_with_defaults(
+                participating.get(day.isoformat(), {}), recorded_active.get(day.isoformat(), {}),
+                active_users[day],
+            )
+            for day in date_range(start, end)
+        }
+
+    def get_team_headcount_range(self, start: date, end: date) -> Dict[date, Dict[str, Dict[str, int]]]:
+        conn = self._connection()
+        names: Dict[str, str] = {}
+        for row in conn.execute(
+            "SELECT team_key, team FROM users WHERE team_key IS NOT NULL ORDER BY position"
+        ):
+            names.setdefault(row["team_key"], row["team"].strip())
+        windows: Dict[str, list] = {}
+        for row in conn.execute(
+            _DEFAULT_WINDOWS.format(extra="team_key, ", where=" AND team_key IS NOT NULL")
+        ):
+            windows.setdefault(row["team_key"], []).append(_window(row))
+        active = {team_key: daily_default_counts(rows, start, end) for team_key, rows in windows.items()}
+
+        # (date, team key) -> meal type -> count
+        participating: Dict[tuple, Dict[MealType, int]] = {}
+        recorded_active: Dict[tuple, Dict[MealType, int]] = {}
+        for row in conn.execute(
+            f"""
+            SELECT p.date, u.team_key, p.meal_type,
+                   SUM(p.is_participating) AS participating,
+                   SUM(CASE WHEN {_GETS_DEFAULTS.format(day="p.date")} THEN 1 ELSE 0 END) AS recorded_active
+            FROM meal_participation p JOIN users u ON u.id = p.user_id
+            WHERE p.date BETWEEN ? AND ? AND u.team_key IS NOT NULL
+            GROUP BY p.date, u.team_key, p.meal_type
+            """,
+            (start.isoformat(), end.isoformat()),
+        ):
+            key = (row["date"], row["team_key"])
+            meal_type = MealType(row["meal_type"])
+            participating.setdefault(key, {})[meal_type] = row["participating"]
+            recorded_active.setdefault(key, {})[meal_type] = row["recorded_active"]
+
+        return {
+            day: {
+                name: headcount_with_defaults(
+                    participating.get((day.isoformat(), team_key), {}),
+                    recorded_active.get((day.isoformat(), team_key), {}),
+                    active[team_key][day] if team_key in active else 0,
+                )
+                for team_key, name in names.items()
+            }
+            for day in date_range(start, end)
+        }
+
+    def get_participants(
+        self, target_date: date, meal_type: MealType, team: Optional[str] = None
+    ) -> List[str]:
+        if team is not None and not team:
+            return []
+        team_filter = " AND u.team_key = ?" if team is not None else ""
+        team_params = [_team_key(team)] if team is not None else []
+        query = f"""
+            SELECT p.user_id FROM meal_participation p LEFT JOIN users u ON u.id = p.user_id
+            WHERE p.date = ? AND p.meal_type = ? AND p.is_participating = 1{team_filter}
+        """
+        params = [target_date.isoformat(), meal_type.value, *team_params]
+        if meal_type in DEFAULT_OPTED_IN_MEALS:
+            query += f"""
+                UNION ALL
+                SELECT u.id FROM users u
+                WHERE {_GETS_DEFAULTS.format(day="?")}{team_filter} AND NOT EXISTS (
+                    SELECT 1 FROM meal_participation p
+                    WHERE p.user_id = u.id AND p.date = ? AND p.meal_type = ?
+                )
+            """
+            day = target_date.isoformat()
+            params += [day, day, *team_params, day, meal_type.value]
+        return [row[0] for row in self._connection().execute(query, params)]
+
+    # Meal Configuration
+
+    def load_meal_config(self) -> Optional[Dict[str, bool]]:
+        rows = self._connection().execute("SELECT meal_type, enabled FROM meal_config").fetchall()
+        if not rows:
+            return None
+        return {row["meal_type"]: bool(row["enabled"]) for row in rows}
+
+    def save_meal_config(self, config: Dict[str, bool]) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM meal_config")
+            conn.executemany(
+                "INSERT INTO meal_config (meal_type, enabled) VALUES (?, ?)",
+                [(meal_type, int(enabled)) for meal_type, enabled in config.items()],
+            )
+            conn.execute(_BUMP_MEAL_CONFIG_VERSION)
+            conn.execute(_BUMP_DATA_VERSION)
+
+    def meal_config_version(self) -> int:
+        return self._connection().execute("SELECT version FROM meal_config_version").fetchone()[0]
+
+    def users_version(self) -> int:
+        return self._connection().execute("SELECT version FROM users_version").fetchone()[0]
+
+    def data_version(self) -> int:
+        return self._connection().execute("SELECT version FROM data_version").fetchone()[0]
+
+    def set_meal_enabled(self, meal_type: str, enabled: bool) -> Dict[str, bool]:
+        conn = self._connection()
+        with conn:
+            # Take the write lock up front so the read below cannot go stale
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT COUNT(*) FROM meal_config").fetchone()[0] == 0:
+                conn.executemany(
+                    "INSERT INTO meal_config (meal_type, enabled) VALUES (?, ?)",
+                    [(mt, int(on)) for mt, on in default_meal_config().items()],
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO meal_config (meal_type, enabled) VALUES (?, ?)",
+                (meal_type, int(enabled)),
+            )
+            conn.execute(_BUMP_MEAL_CONFIG_VERSION)
+            conn.execute(_BUMP_DATA_VERSION)
+            rows = conn.execute("SELECT meal_type, enabled FROM meal_config").fetchall()
+        return {row["meal_type"]: bool(row["enabled"]) for row in rows}
+
+    # Refresh Tokens
+
+    def save_refresh_token(self, token: RefreshToken) -> None:
+        conn = self._connection()
+        with conn:
+            _insert_refresh_token(conn, token)
+
+    def get_refresh_token(self, token_hash: str) -> Optional[RefreshToken]:
+        row = self._connection().execute(
+            f"SELECT {REFRESH_TOKEN_COLUMNS} FROM refresh_tokens WHERE token_hash = ?", (token_hash,)
+        ).fetchone()
+        return _row_to_refresh_token(row) if row else None
+
+    def rotate_refresh_token(self, token_hash: str, replacement: RefreshToken) -> bool:
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE refresh_tokens SET revoked_at = ? WHERE token_hash = ? AND revoked_at IS NULL",
+                (datetime.now().isoformat(), token_hash),
+            )
+            if cursor.rowcount == 0:
+                return False
+            _insert_refresh_token(conn, replacement)
+        return True
+
+    def revoke_refresh_tokens(self, family_id: Optional[str] = None, user_id: Optional[str] = None) -> int:
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                """
+                UPDATE refresh_tokens SET revoked_at = ?
+                WHERE revoked_at IS NULL AND (family_id = ? OR user_id = ?)
+                """,
+                (datetime.now().isoformat(), family_id, user_id),
+            )
+        return cursor.rowcount
@@ -0,0 +1,60 @@
+"""
+Conditional GET (ETag / If-None-Match) for read endpoints.
+
+The ETag is a digest of the storage data version plus everything else a
+response can depend on: the URL, the requesting user and the current day
+and cutoff state. If the client already holds that ETag, the request is
+answered with 304 before the endpoint computes anything. Re-polling
+unchanged data then costs one version read.
+"""
+
+import hashlib
+from datetime import date, datetime
+from typing import Hashable
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from app.models import User, CUTOFF_HOUR
+from app.auth import get_current_user
+from app import async_storage
+
+
+def compute_etag(version: Hashable, request: Request, user: User) -> str:
+    key = repr((
+        version,
+        request.url.path,
+        sorted(request.query_params.multi_items()),
+        user.id, user.role.value, user.team,
+        date.today().isoformat(),
+        datetime.now().hour >= CUTOFF_HOUR,
+    ))
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+) -> None:
+    """Dependency: 304 if the client's copy is current, else tag the response.
+
+    Put it after the endpoint's role check so an unauthorized caller still gets 403.
+    """
+    # Read the version before the endpoint reads the data: a change in between
+    # leaves this ETag stale, which only costs one extra full response later
+    version = await async_storage.get_data_version()
+    etag = compute_etag(version, request, current_user)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
@@ -0,0 +1,278 @@
+"""
+Live headcount push over Server-Sent Events (GET /api/meals/headcount/stream).
+
+A dashboard opens a stream instead of polling. Each stream subscribes to a
+channel, either the whole company or one team, for one day. After every
+participation or meal config write, storage notifies the broker. The broker
+waits ``HEADCOUNT_STREAM_COALESCE_SECONDS`` so a burst of toggles becomes
+one recount per channel and day, then sends the new counts to every
+subscriber they changed for. Each event after the first also carries
+``changes``: per meal, the difference from the counts that client was sent
+last, so a dashboard can show what moved without diffing. A slow client is
+only ever holding the latest counts, never a backlog of them.
+
+Writes made by another worker process never reach this process's
+listeners, so the broker also checks the storage data version every
+``HEADCOUNT_STREAM_POLL_SECONDS`` and recounts when it moved.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.models import User, MealType, MealParticipation
+from app import storage, async_storage
+
+HEADCOUNT_STREAM_COALESCE_SECONDS = float(os.getenv("HEADCOUNT_STREAM_COALESCE_SECONDS", "0.5"))
+HEADCOUNT_STREAM_POLL_SECONDS = float(os.getenv("HEADCOUNT_STREAM_POLL_SECONDS", "5"))
+
+# Idle streams get a comment line this often so proxies keep them open
+KEEPALIVE_SECONDS = 15
+# Reconnect delay the browser is told to use (EventSource "retry" field)
+RETRY_MILLISECONDS = 3000
+
+logger = logging.getLogger(__name__)
+
+
+def _channel(team: Optional[str]) -> Optional[str]:
+    """Channel key: the casefolded team name, or None for the whole company."""
+    return team.strip().casefold() if team is not None else None
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscription:
+    """One open stream: its team and day, and counts not yet sent to it."""
+
+    def __init__(self, team: Optional[str], target_date: Optional[date]) -> None:
+        self.team = team
+        self.channel = _channel(team)
+        # None follows today across midnight
+        self.target_date = target_date
+        self.closed = False
+        self._offered: Optional[Dict[str, Any]] = None
+        self._pending: Optional[Dict[str, Any]] = None
+        self._sent: Optional[Dict[str, Any]] = None
+        self._ready = asyncio.Event()
+
+    def day(self) -> date:
+        return self.target_date or date.today()
+
+    def offer(self, counts: Dict[str, Any]) -> None:
+        """Queue counts for sending, replacing any unsent ones; repeats are dropped."""
+        if counts == self._offered:
+            return
+        self._offered = self._pending = counts
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def next(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """The next counts to send, or None if there were none within ``timeout``."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        counts, self._pending = self._pending, None
+        return self._with_changes(counts) if counts is not None else None
+
+    def _with_changes(self, counts: Dict[str, Any]) -> Dict[str, Any]:
+        """``counts`` plus ``changes`` since the last counts sent for the same day."""
+        previous, self._sent = self._sent, counts
+        if previous is None or previous["date"] != counts["date"]:
+            return counts
+        before = previous["headcount"]
+        changes = {
+            meal: count - before.get(meal, 0)
+            for meal, count in counts["headcount"].items() if count != before.get(meal, 0)
+        }
+        return {**counts, "changes": changes}
+
+
+class HeadcountBroker:
+    """Fans committed changes out to subscriptions, recounting once per burst.
+
+    Lives on the event loop of the first subscriber. Storage listeners run
+    on storage threads, so they only record what changed and wake the loop.
+    """
+
+    def __init__(
+        self,
+        coalesce_seconds: float = HEADCOUNT_STREAM_COALESCE_SECONDS,
+        poll_seconds: float = HEADCOUNT_STREAM_POLL_SECONDS,
+    ) -> None:
+        self.coalesce_seconds = coalesce_seconds
+        self.poll_seconds = poll_seconds
+        self._subscriptions: Dict[Optional[str], Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        # Changed user ids per day since the last recount; _everything after
+        # a meal config change or a change seen only through the data version
+        self._changes: Dict[date, Set[str]] = {}
+        self._everything = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ===========================
+    # Subscriptions
+    # ===========================
+
+    async def subscribe(self, team: Optional[str], target_date: Optional[date] = None) -> Subscription:
+        """Open a subscription, primed with the current counts."""
+        self._ensure_running()
+        subscription = Subscription(team, target_date)
+        self._subscriptions.setdefault(subscription.channel, set()).add(subscription)
+        try:
+            users = await async_storage.get_all_users()
+            enabled = await async_storage.get_enabled_meal_types()
+            subscription.offer(await self._count(team, subscription.day(), users, enabled))
+        except BaseException:
+            # Failed or cancelled while priming: the caller never gets it to unsubscribe
+            self.unsubscribe(subscription)
+            raise
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.channel)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.channel]
+        if not self._subscriptions:
+            self._stop()
+
+    def close(self) -> None:
+        """End every open stream (app shutdown)."""
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in list(subscriptions):
+                subscription.close()
+        self._subscriptions.clear()
+        self._stop()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "clients": sum(len(subscriptions) for subscriptions in self._subscriptions.values()),
+            "channels": len(self._subscriptions),
+        }
+
+    # ===========================
+    # Change Notifications
+    # ===========================
+
+    def notify(self, records: Optional[List[MealParticipation]]) -> None:
+        """Storage headcount listener; runs on whichever thread did the write."""
+        loop = self._loop
+        if loop is None:
+            return
+        with self._lock:
+            if records is None:
+                self._everything = True
+            else:
+                for record in records:
+                    self._changes.setdefault(record.date, set()).add(record.user_id)
+        try:
+            loop.call_soon_threadsafe(self._set_wake)
+        except RuntimeError:
+            # Loop already closed; nobody is listening any more
+            pass
+
+    def _set_wake(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    def _stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        self._task = self._loop = self._wake = None
+        with self._lock:
+            self._changes = {}
+            self._everything = False
+
+    # ===========================
+    # Recounting
+    # ===========================
+
+    async def _run(self) -> None:
+        version = await async_storage.get_data_version()
+        today = date.today()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+                # Let the rest of the burst land before recounting
+                await asyncio.sleep(self.coalesce_seconds)
+            except asyncio.TimeoutError:
+                # Quiet here; look for writes by other processes and for midnight
+                if await async_storage.get_data_version() == version and date.today() == today:
+                    continue
+                with self._lock:
+                    self._everything = True
+
+            self._wake.clear()
+            with self._lock:
+                changes, self._changes = self._changes, {}
+                everything, self._everything = self._everything, False
+            # Read before recounting, so a write landing mid-recount is caught next time
+            version = await async_storage.get_data_version()
+            today = date.today()
+            try:
+                await self._publish(changes, everything)
+            except Exception:
+                logger.exception("Headcount stream recount failed")
+
+    async def _publish(self, changes: Dict[date, Set[str]], everything: bool) -> None:
+        users = await async_storage.get_all_users()
+        enabled = await async_storage.get_enabled_meal_types()
+        team_of = {user.id: _channel(user.team) for user in users}
+        counted: Dict[Tuple[Optional[str], date], Dict[str, Any]] = {}
+
+        for channel, subscriptions in list(self._subscriptions.items()):
+            for subscription in list(subscriptions):
+                day = subscription.day()
+                if not everything:
+                    changed = changes.get(day)
+                    if not changed:
+                        continue
+                    if channel is not None and all(team_of.get(user_id) != channel for user_id in changed):
+                        continue
+                if (channel, day) not in counted:
+                    counted[(channel, day)] = await self._count(subscription.team, day, users, enabled)
+                subscription.offer(counted[(channel, day)])
+
+    @staticmethod
+    async def _count(
+        team: Optional[str], day: date, users: List[User], enabled: List[MealType]
+    ) -> Dict[str, Any]:
+        """Same figures as the /headcount endpoints for that team or the company."""
+        if team is None:
+            headcount = await async_storage.get_headcount_by_date(day)
+            members = users
+        else:
+            headcount = await async_storage.get_headcount_by_date_and_team(day, team)
+            members = [user for user in users if _channel(user.team) == _channel(team)]
+        return {
+            "date": day.isoformat(),
+            "team": team,
+            "headcount": {k: v for k, v in headcount.items() if MealType(k) in enabled},
+            "total_employees": len([user for user in members if user.is_active]),
+        }
+
+
+broker = HeadcountBroker()
+storage.add_headcount_listener(broker.notify)
@@ -5,7 +5,9 @@ import os
 from dotenv import load_dotenv
 
 from app.routers import auth, users, meals
-from app import storage
+from app import storage, async_storage
+from app.headcount_stream import broker as headcount_broker
+from app.password_hashing import password_hasher, HashingBusy
 
 load_dotenv()
 
@@ -52,10 +54,10 @@ app.include_router(meals.router, prefix="/api/meals", tags=["Meals"])
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Health check endpoint to verify API is running"""
-    from app import storage
+    from app import async_storage
 
     try:
-        users = storage.get_all_users()
+        users = await async_storage.get_all_users()
         user_count = len(users)
         storage_status = "ok"
 
@@ -69,7 +71,9 @@ async def health_check():
         "checks": {
             "api": "ok",
             "storage": storage_status,
-            "user_count": user_count
+            "user_count": user_count,
+            "password_hashing": password_hasher.stats(),
+            "headcount_stream": headcount_broker.stats()
         }
     }
 
@@ -126,6 +130,10 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     print("👋 Shutting down Meal Headcount Planner API...")
+    headcount_broker.close()
+    async_storage.shutdown()
+    storage.compact_participation()
+    password_hasher.shutdown()
 
 # ===========================
 # API Info Endpoint
@@ -144,6 +152,7 @@ async def api_info():
             "users": {
                 "me": "GET /api/users/me",
                 "create": "POST /api/users/create (Admin)",
+                "import": "POST /api/users/import (Admin, CSV or NDJSON upload)",
                 "list": "GET /api/users (Admin)",
                 "get": "GET /api/users/{user_id} (TeamLead/Admin)",
                 "update": "PUT /api/users/{user_id} (Admin)",
@@ -153,7 +162,12 @@ async def api_info():
                 "today": "GET /api/meals/today",
                 "update": "PUT /api/meals/participation",
                 "admin_update": "POST /api/meals/participation/admin (TeamLead/Admin)",
-                "headcount": "GET /api/meals/headcount/today (Admin)"
+                "team_meals": "GET /api/meals/team/{date} (TeamLead/Admin)",
+                "all_user_meals": "GET /api/meals/users/{date}?offset=&limit= (Admin)",
+                "headcount": "GET /api/meals/headcount/today (Admin)",
+                "headcount_range": "GET /api/meals/headcount/range?start=&end= (TeamLead/Admin)",
+                "headcount_stream": "GET /api/meals/headcount/stream?token= (TeamLead/Admin, Server-Sent Events)",
+                "export": "GET /api/meals/export?start=&end=&format=ndjson|csv (Admin, streamed)"
             }
         }
     }
@@ -188,6 +202,17 @@ async def value_error_exception_handler(request: Request, exc: ValueError):
         }
     )
 
+@app.exception_handler(HashingBusy)
+async def hashing_busy_exception_handler(request: Request, exc: HashingBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"},
+        content={
+            "detail": str(exc),
+            "error_code": "HASHING_BUSY"
+        }
+    )
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     import traceback
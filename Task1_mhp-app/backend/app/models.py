@@ -5,7 +5,7 @@ Core data structures using Pydantic models.
 
 from datetime import datetime, date
 from enum import Enum
-from typing import Optional
+from typing import Any, Mapping, Optional, Tuple
 from pydantic import BaseModel, Field, EmailStr
 import uuid
 
@@ -30,6 +30,8 @@ class User(BaseModel):
     team: Optional[str] = Field(None, max_length=100)
     is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.now)
+    # When the user was last deactivated; meal defaults stop from that day on
+    deactivated_at: Optional[datetime] = None
 
     class Config:
         json_schema_extra = {
@@ -68,6 +70,49 @@ class MealParticipation(BaseModel):
             }
         }
 
+
+class RefreshToken(BaseModel):
+    """Stored state of one refresh token; the token itself is never stored.
+
+    Tokens issued from one login share a ``family_id``. Each refresh revokes
+    the presented token and issues the next one in the family.
+    """
+    token_hash: str
+    user_id: str
+    family_id: str
+    expires_at: datetime
+    created_at: datetime = Field(default_factory=datetime.now)
+    revoked_at: Optional[datetime] = None
+
+# ===========================
+# Trusted construction from storage
+# ===========================
+# Rows the app wrote itself were validated on the way in, so loading them
+# only needs type conversion, not another full validation. This pays off for
+# User, whose EmailStr check dominates its load time; MealParticipation has
+# only cheap fields, and pydantic validates those faster than model_construct
+# builds them. API input never goes through these.
+
+def user_from_storage(row: Mapping[str, Any]) -> User:
+    """Build a User from a stored row without revalidating it."""
+    created_at = row["created_at"]
+    # Rows written before deactivation dates were recorded have none
+    deactivated_at = row["deactivated_at"] if "deactivated_at" in row.keys() else None
+    return User.model_construct(
+        id=row["id"],
+        name=row["name"],
+        email=row["email"],
+        password_hash=row["password_hash"],
+        role=UserRole(row["role"]),
+        team=row["team"],
+        is_active=bool(row["is_active"]),
+        created_at=created_at if isinstance(created_at, datetime) else datetime.fromisoformat(created_at),
+        deactivated_at=(
+            deactivated_at if deactivated_at is None or isinstance(deactivated_at, datetime)
+            else datetime.fromisoformat(deactivated_at)
+        ),
+    )
+
 # Meals that employees are opted-in for by default.
 # Iftar and Event Dinner are NOT default meals — they require admin configuration to enable.
 DEFAULT_OPTED_IN_MEALS = {
@@ -85,15 +130,61 @@ ADMIN_CONTROLLED_MEALS = {
 # Cutoff hour (24h format). Employees cannot change participation after this hour.
 CUTOFF_HOUR = 21  # 9:00 PM
 
-def create_default_participation(user_id: str, target_date: date) -> list[MealParticipation]:
+# Namespace for participation_id(); any fixed UUID works, it must just never change.
+PARTICIPATION_ID_NAMESPACE = uuid.UUID("6f1c1a52-3a4e-4d8e-9a65-0c1f4b7d2e90")
+
+def participation_id(user_id: str, target_date: date, meal_type: MealType) -> str:
+    """Stable id for one (user, date, meal) slot.
+
+    A virtual default and the record stored when that slot is first changed
+    share this id, so clients see the same id before and after the write.
+    """
+    return str(uuid.uuid5(PARTICIPATION_ID_NAMESPACE, f"{user_id}/{target_date.isoformat()}/{meal_type.value}"))
+
+def create_default_participation(
+    user_id: str, target_date: date, opted_in: bool = True
+) -> list[MealParticipation]:
+    """Virtual records of a day without stored changes; all opted out unless *opted_in*."""
     return [
         MealParticipation(
+            id=participation_id(user_id, target_date, meal_type),
             user_id=user_id,
             meal_type=meal_type,
             date=target_date,
-            is_participating=(meal_type in DEFAULT_OPTED_IN_MEALS),
+            is_participating=opted_in and meal_type in DEFAULT_OPTED_IN_MEALS,
             updated_by=None,
             updated_at=datetime.now()
         )
         for meal_type in MealType
-    ]
\ No newline at end of file
+    ]
+
+def set_active(user: User, is_active: bool) -> None:
+    """Activate or deactivate ``user``, recording when a deactivation happened.
+
+    Reactivating clears that date, which gives the days in between their
+    defaults again; only the latest deactivation is kept.
+    """
+    if user.is_active and not is_active:
+        user.deactivated_at = datetime.now()
+    elif is_active:
+        user.deactivated_at = None
+    user.is_active = is_active
+
+def default_window(user: User) -> Optional[Tuple[date, Optional[date]]]:
+    """First day and end day (exclusive, None if open) of ``user``'s meal defaults.
+
+    Defaults start on the day the user was created and stop on the day they
+    were deactivated, so adding or deactivating a user never changes the
+    participation of past days. A user deactivated before deactivation dates
+    were recorded has no window (None).
+    """
+    if user.is_active:
+        return user.created_at.date(), None
+    if user.deactivated_at is None:
+        return None
+    return user.created_at.date(), user.deactivated_at.date()
+
+def gets_defaults(user: User, target_date: date) -> bool:
+    """Whether missing records of ``user`` on ``target_date`` take the meal defaults."""
+    window = default_window(user)
+    return window is not None and window[0] <= target_date and (window[1] is None or target_date < window[1])
@@ -0,0 +1,139 @@
+"""
+Streaming export of participation history (GET /api/meals/export and CLI).
+
+Rows are generated one day at a time from
+``storage.iter_participation_by_date``, and output is emitted in chunks of
+about ``EXPORT_CHUNK_BYTES``. Memory therefore stays bounded by the user
+list plus one day's records, however long the range is. Every user in scope
+gets a row per meal per day. Days without a stored record get that meal's
+default, as headcounts do, so the export adds up to the headcount figures.
+
+CLI:
+    python -m app.participation_export --start 2026-09-01 --end 2026-09-30 \\
+        [--format csv|ndjson] [--team Engineering] [--meal-type lunch ...] [-o file]
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from app.models import User, MealType, DEFAULT_OPTED_IN_MEALS, gets_defaults
+from app import storage
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_FIELDS = [
+    "date", "user_id", "name", "email", "team",
+    "meal_type", "is_participating", "updated_by", "updated_at",
+]
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def iter_rows(
+    start: date,
+    end: date,
+    team: Optional[str] = None,
+    meal_types: Optional[Iterable[MealType]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """One row per user, meal and day in order of date, user, then meal type.
+
+    A meal without a stored record has its default (opted in if the meal is
+    opted in by default and the date is within the user's default window,
+    see ``models.default_window``), with no updated_by or updated_at.
+    Arguments are checked and users loaded before this returns.
+    """
+    if end < start:
+        raise ValueError("end must not be before start")
+    users = storage.get_users_by_team(team) if team is not None else storage.get_all_users()
+    wanted = set(meal_types) if meal_types else set(MealType)
+    return _rows(start, end, users, [mt for mt in MealType if mt in wanted])
+
+
+def _rows(start: date, end: date, users: List[User], meal_types: List[MealType]) -> Iterator[Dict[str, Any]]:
+    for day, records in storage.iter_participation_by_date(start, end):
+        stored = {(r.user_id, r.meal_type): r for r in records}
+        for user in users:
+            defaults = gets_defaults(user, day)
+            for meal_type in meal_types:
+                record = stored.get((user.id, meal_type))
+                yield {
+                    "date": day.isoformat(),
+                    "user_id": user.id,
+                    "name": user.name,
+                    "email": user.email,
+                    "team": user.team,
+                    "meal_type": meal_type.value,
+                    "is_participating": (
+                        record.is_participating if record is not None
+                        else defaults and meal_type in DEFAULT_OPTED_IN_MEALS
+                    ),
+                    "updated_by": record.updated_by if record is not None else None,
+                    "updated_at": record.updated_at.isoformat() if record is not None else None,
+                }
+
+
+def _chunked(lines: Iterable[str], size: int = EXPORT_CHUNK_BYTES) -> Iterator[str]:
+    buffer: List[str] = []
+    buffered = 0
+    for line in lines:
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= size:
+            yield "".join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _ndjson_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+def _csv_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    line = io.StringIO()
+    writer = csv.DictWriter(line, fieldnames=EXPORT_FIELDS, lineterminator="\n")
+    yield ",".join(EXPORT_FIELDS) + "\n"
+    for row in rows:
+        writer.writerow(row)
+        yield line.getvalue()
+        line.seek(0)
+        line.truncate()
+
+
+def export_chunks(rows: Iterable[Dict[str, Any]], fmt: str) -> Iterator[str]:
+    """Render rows as ``ndjson`` or ``csv`` text, a chunk at a time."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Valid options: {', '.join(EXPORT_FORMATS)}")
+    return _chunked(_ndjson_lines(rows) if fmt == "ndjson" else _csv_lines(rows))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.participation_export",
+        description="Export participation history as NDJSON or CSV.",
+    )
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="first date, YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, required=True, help="last date (inclusive)")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--team", help="only this team")
+    parser.add_argument("--meal-type", action="append", type=MealType, dest="meal_types",
+                        help="only this meal type (repeatable)")
+    parser.add_argument("-o", "--output", help="write here instead of stdout")
+    args = parser.parse_args(argv)
+
+    rows = iter_rows(args.start, args.end, args.team, args.meal_types)
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        for chunk in export_chunks(rows, args.format):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+bcrypt hashing on a dedicated process pool.
+
+A bcrypt hash or verify costs a few hundred ms of CPU. On a thread it still
+holds the GIL for most of that time, so a burst of logins slows every other
+request in the process. ``PasswordHasher`` sends the work to worker
+processes instead, and it bounds the backlog: once every worker is busy and
+the queue is full, new requests fail fast with ``HashingBusy`` (served as
+503) instead of piling up behind each other.
+
+Batches (user imports) go through in small chunks on at most
+``PASSWORD_HASH_IMPORT_WORKERS`` workers at a time. The pool runs tasks in
+submission order, so a login never waits behind more than one chunk, and
+one worker stays free for logins while an import runs.
+
+Call ``stats()`` for queue depth and hash latency; /health reports them.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from passlib.context import CryptContext
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+PASSWORD_HASH_IMPORT_WORKERS = int(os.getenv("PASSWORD_HASH_IMPORT_WORKERS", str(max(PASSWORD_HASH_WORKERS - 1, 1))))
+
+# Passwords per pool task in hash_many: about a second of bcrypt
+HASH_MANY_CHUNK = 4
+
+# Latency percentiles are taken over this many most recent calls
+LATENCY_WINDOW = 256
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class HashingBusy(Exception):
+    """Every hashing worker is busy and the queue is full."""
+
+
+# ===========================
+# Worker Functions (run in the pool processes)
+# ===========================
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash_many(passwords: List[str]) -> List[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+
+# ===========================
+# Pool
+# ===========================
+
+class PasswordHasher:
+    """Bounded async front end to a process pool running bcrypt.
+
+    At most ``workers`` hashes run at once and at most ``queue_limit`` more
+    wait for a worker. The pool processes are started on first use.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        queue_limit: int = PASSWORD_HASH_QUEUE,
+        import_workers: int = PASSWORD_HASH_IMPORT_WORKERS,
+    ) -> None:
+        self.workers = max(workers, 1)
+        self.queue_limit = max(queue_limit, 0)
+        self.import_workers = min(max(import_workers, 1), self.workers)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latencies_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that already runs threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _reserve(self, slots: int) -> None:
+        with self._lock:
+            if self._pending + slots > self.workers + self.queue_limit:
+                self._rejected += 1
+                raise HashingBusy("Too many password operations in progress, please retry shortly")
+            self._pending += slots
+
+    def _release(self, slots: int) -> None:
+        with self._lock:
+            self._pending -= slots
+
+    async def _run(self, fn: Callable[..., Any], *args: Any, count: int = 1) -> Any:
+        """Run a task on the pool; ``count`` hashes it performs. Slots are the caller's."""
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            per_hash_ms = (time.perf_counter() - started) * 1000 / count
+            with self._lock:
+                self._completed += count
+                self._latencies_ms.append(per_hash_ms)
+
+    async def _submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        self._reserve(1)
+        try:
+            return await self._run(fn, *args)
+        finally:
+            self._release(1)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hash a batch in input order, ``HASH_MANY_CHUNK`` passwords per task.
+
+        Runs on ``import_workers`` lanes, each submitting its next chunk only
+        when the last one is done, so single hashes and verifies submitted
+        meanwhile run between chunks. Takes one slot per lane for the whole
+        batch, all or none: a bulk import is refused with HashingBusy up front.
+        """
+        if not passwords:
+            return []
+        chunks = [passwords[i:i + HASH_MANY_CHUNK] for i in range(0, len(passwords), HASH_MANY_CHUNK)]
+        lanes = min(self.import_workers, len(chunks))
+        self._reserve(lanes)
+        results: List[List[str]] = [[] for _ in chunks]
+        todo = iter(range(len(chunks)))
+
+        async def lane() -> None:
+            for n in todo:
+                results[n] = await self._run(_hash_many, chunks[n], count=len(chunks[n]))
+
+        try:
+            await asyncio.gather(*(lane() for _ in range(lanes)))
+        finally:
+            self._release(lanes)
+        return [hashed for chunk in results for hashed in chunk]
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, current load and recent per-hash latency (queue wait included)."""
+        with self._lock:
+            pending = self._pending
+            latencies = sorted(self._latencies_ms)
+            completed, rejected = self._completed, self._rejected
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 1)
+
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_progress": min(pending, self.workers),
+            "queue_depth": max(pending - self.workers, 0),
+            "completed": completed,
+            "rejected": rejected,
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": round(latencies[-1], 1) if latencies else None,
+            },
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher()
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from app.schemas import LoginRequest, LoginResponse, UserRegister, UserResponse
+from typing import Optional
+from app.schemas import LoginRequest, LoginResponse, RefreshRequest, UserRegister, UserResponse
 from app.models import User, UserRole
 from app import auth as auth_service
-from app import storage
+from app import async_storage
 
 router = APIRouter()
 
@@ -14,9 +15,9 @@ router = APIRouter()
 async def login(request: LoginRequest):
     """
     Login endpoint - authenticate user with email and password
-    Returns: Access token and user information
+    Returns: Access token, refresh token and user information
     """
-    user = auth_service.authenticate_user(request.email, request.password)
+    user = await auth_service.authenticate_user_async(request.email, request.password)
     
     if not user:
         raise HTTPException(
@@ -31,7 +32,8 @@ async def login(request: LoginRequest):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return auth_service.create_token_response(user)
+    refresh_token = await auth_service.issue_refresh_token(user)
+    return auth_service.create_token_response(user, refresh_token)
 
 # ===========================
 # Register Endpoint
@@ -41,10 +43,10 @@ async def login(request: LoginRequest):
 async def register(request: UserRegister):
     """
     Register endpoint - create a new employee account
-    Returns: Access token and user information
+    Returns: Access token, refresh token and user information
     """
     # Check if user already exists
-    existing_user = storage.get_user_by_email(request.email)
+    existing_user = await async_storage.get_user_by_email(request.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -60,7 +62,7 @@ async def register(request: UserRegister):
         )
     
     # Hash password and create user
-    password_hash = auth_service.hash_password(request.password)
+    password_hash = await auth_service.hash_password_async(request.password)
     
     new_user = User(
         name=request.name,
@@ -73,7 +75,7 @@ async def register(request: UserRegister):
     
     # Save user to storage
     try:
-        created_user = storage.create_user(new_user)
+        created_user = await async_storage.create_user(new_user)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -83,14 +85,41 @@ async def register(request: UserRegister):
     # Log authentication attempt
     auth_service.log_authentication_attempt(request.email, True)
     
-    return auth_service.create_token_response(created_user)
+    refresh_token = await auth_service.issue_refresh_token(created_user)
+    return auth_service.create_token_response(created_user, refresh_token)
+
+# ===========================
+# Refresh Endpoint
+# ===========================
+
+@router.post("/refresh", response_model=LoginResponse)
+async def refresh(request: RefreshRequest):
+    """
+    Exchange a refresh token for a new access token, without a password check
+    The presented refresh token is revoked and replaced by the returned one
+    """
+    session = await auth_service.refresh_session(request.refresh_token)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user, refresh_token = session
+    return auth_service.create_token_response(user, refresh_token)
 
 # ===========================
 # Logout Endpoint
 # ===========================
 
 @router.post("/logout", status_code=status.HTTP_200_OK)
-async def logout():
+async def logout(request: Optional[RefreshRequest] = None):
+    """
+    Revokes the refresh token, if given, along with every token rotated from it
+    """
+    if request is not None:
+        await auth_service.revoke_refresh_token(request.refresh_token)
     return {
         "message": "Logout successful. Please remove the token from client storage."
     }
\ No newline at end of file
@@ -1,11 +1,17 @@
 from fastapi import APIRouter, HTTPException, status, Query, Depends
+from fastapi.responses import StreamingResponse
 from datetime import date, datetime
+import time
+from typing import Dict, List, Optional
 from app.models import User, MealType, MealParticipation, UserRole, CUTOFF_HOUR, ADMIN_CONTROLLED_MEALS
 from app.auth import require_role
 from app.schemas import (
     MealParticipationResponse,
     UserMealsResponse,
+    RosterMealsResponse,
+    UserResponse,
     HeadcountResponse,
+    HeadcountRangeResponse,
     UpdateParticipationRequest,
     AdminParticipationOverrideRequest,
     MealConfigResponse,
@@ -14,7 +20,10 @@ from app.schemas import (
     BatchParticipationResponse,
 )
 from app import auth as auth_service
-from app import storage
+from app import storage, async_storage
+from app.etags import conditional_get
+from app import headcount_stream
+from app import participation_export
 
 router = APIRouter()
 
@@ -26,19 +35,76 @@ def _is_cutoff_passed() -> bool:
     """Check if the current time is past the cutoff hour (9 PM)."""
     return datetime.now().hour >= CUTOFF_HOUR
 
+def _enabled_only(headcount: Dict[str, int], enabled_types: List[MealType]) -> Dict[str, int]:
+    """Drop meal types that are currently disabled from a headcount."""
+    return {k: v for k, v in headcount.items() if MealType(k) in enabled_types}
+
+def _roster_response(
+    target_date: date,
+    members: List[User],
+    enabled_types: List[MealType],
+    team: Optional[str],
+    total: int,
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> RosterMealsResponse:
+    """Build a roster from one storage call for all members (blocking: run it on the storage pool)."""
+    participation = storage.get_roster_participation(target_date, members)
+    return RosterMealsResponse(
+        date=target_date.isoformat(),
+        team=team,
+        members=[
+            {
+                "user": UserResponse(
+                    id=member.id,
+                    name=member.name,
+                    email=member.email,
+                    role=member.role,
+                    team=member.team,
+                    is_active=member.is_active
+                ),
+                "meals": [
+                    MealParticipationResponse(
+                        id=record.id,
+                        user_id=record.user_id,
+                        meal_type=record.meal_type.value,
+                        date=record.date.isoformat(),
+                        is_participating=record.is_participating,
+                        updated_by=record.updated_by,
+                        updated_at=record.updated_at.isoformat()
+                    )
+                    for record in participation[member.id]
+                    if record.meal_type in enabled_types
+                ],
+            }
+            for member in members
+        ],
+        total=total,
+        offset=offset,
+        limit=limit,
+        cutoff_passed=_is_cutoff_passed()
+    )
+
+# Longest span /headcount/range answers in one request
+MAX_HEADCOUNT_RANGE_DAYS = 366
+
+# Largest page /users/{date} returns
+MAX_ROSTER_PAGE_SIZE = 500
+
 # ===========================
 # Meal Configuration (Admin only)
 # ===========================
 
 @router.get("/config", response_model=MealConfigResponse)
 async def get_meal_config(
-    current_user: User = Depends(auth_service.get_current_user)
+    current_user: User = Depends(auth_service.get_current_user),
+    _etag: None = Depends(conditional_get)
 ):
     """
     Get which meal types are currently enabled.
     All authenticated users can view this.
     """
-    config = storage.get_enabled_meals()
+    config = await async_storage.get_enabled_meals()
     return MealConfigResponse(enabled_meals=config)
 
 @router.put("/config", response_model=MealConfigResponse)
@@ -66,7 +132,7 @@ async def update_meal_config(
             detail=f"{request.meal_type} is always enabled and cannot be toggled"
         )
     
-    config = storage.set_meal_enabled(request.meal_type, request.enabled)
+    config = await async_storage.set_meal_enabled(request.meal_type, request.enabled)
     return MealConfigResponse(enabled_meals=config)
 
 # ===========================
@@ -74,13 +140,16 @@ async def update_meal_config(
 # ===========================
 
 @router.get("/today", response_model=UserMealsResponse)
-async def get_today_meals(current_user: User = Depends(auth_service.get_current_user)):
+async def get_today_meals(
+    current_user: User = Depends(auth_service.get_current_user),
+    _etag: None = Depends(conditional_get)
+):
     """
     Get current user's meal participation for today
     """
     today = date.today()
-    participation = storage.get_user_participation(current_user.id, today)
-    enabled = storage.get_enabled_meal_types()
+    participation = await async_storage.get_user_participation(current_user.id, today)
+    enabled = await async_storage.get_enabled_meal_types()
     
     meals = [
         MealParticipationResponse(
@@ -124,17 +193,17 @@ async def get_user_meals(
         )
     
     # Verify user exists
-    user = storage.get_user_by_id(user_id)
+    user = await async_storage.get_user_by_id(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    participation = storage.get_user_participation(user_id, target_date)
+    participation = await async_storage.get_user_participation(user_id, target_date)
     
     # Filter to only enabled meals
-    enabled_types = storage.get_enabled_meal_types()
+    enabled_types = await async_storage.get_enabled_meal_types()
     
     meals = [
         MealParticipationResponse(
@@ -156,6 +225,60 @@ async def get_user_meals(
         cutoff_passed=_is_cutoff_passed()
     )
 
+# ===========================
+# Get a Team's Meals for a Date
+# ===========================
+
+@router.get("/team/{target_date}", response_model=RosterMealsResponse)
+async def get_team_meals(
+    target_date: date,
+    team: Optional[str] = Query(None, description="Admin only: another team than your own"),
+    current_user: User = Depends(require_role([UserRole.TEAM_LEAD, UserRole.ADMIN])),
+    _etag: None = Depends(conditional_get)
+):
+    """
+    Get every team member's meal participation for a date in one request
+    Replaces calling GET /user/{user_id} once per member
+    Team Leads see their own team; Admin may pass ?team=
+    """
+    if team is not None and current_user.role != UserRole.ADMIN \
+            and team.strip().casefold() != (current_user.team or "").strip().casefold():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Can only view your own team"
+        )
+    team = team if team is not None else current_user.team
+    
+    members = await async_storage.get_users_by_team(team)
+    enabled_types = await async_storage.get_enabled_meal_types()
+    return await async_storage.run(
+        _roster_response, target_date, members, enabled_types, team, len(members)
+    )
+
+# ===========================
+# Get All Users' Meals for a Date (Admin only)
+# ===========================
+
+@router.get("/users/{target_date}", response_model=RosterMealsResponse)
+async def get_all_user_meals(
+    target_date: date,
+    offset: int = Query(0, ge=0, description="Users to skip"),
+    limit: int = Query(100, ge=1, le=MAX_ROSTER_PAGE_SIZE, description="Users per page"),
+    current_user: User = Depends(require_role([UserRole.ADMIN])),
+    _etag: None = Depends(conditional_get)
+):
+    """
+    Get one page of every user's meal participation for a date
+    Users come in the same order as GET /api/users; total counts all of them
+    Admin only
+    """
+    users = await async_storage.get_all_users()
+    enabled_types = await async_storage.get_enabled_meal_types()
+    return await async_storage.run(
+        _roster_response, target_date, users[offset:offset + limit], enabled_types,
+        None, len(users), offset, limit
+    )
+
 # ===========================
 # Update Meal Participation
 # ===========================
@@ -188,7 +311,7 @@ async def update_meal_participation(
         )
     
     # Verify user exists
-    user = storage.get_user_by_id(user_id)
+    user = await async_storage.get_user_by_id(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -206,7 +329,7 @@ async def update_meal_participation(
         )
     
     # Verify the meal type is currently enabled
-    enabled_types = storage.get_enabled_meal_types()
+    enabled_types = await async_storage.get_enabled_meal_types()
     if meal_enum not in enabled_types:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -214,7 +337,7 @@ async def update_meal_participation(
         )
     
     # Update participation
-    updated = storage.update_participation(
+    updated = await async_storage.update_participation(
         user_id=user_id,
         target_date=target_date,
         meal_type=meal_enum,
@@ -247,7 +370,7 @@ async def admin_update_participation(
     Records who made the update for audit trail.
     """
     # Get target user
-    target_user = storage.get_user_by_id(request.user_id)
+    target_user = await async_storage.get_user_by_id(request.user_id)
     if not target_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -272,7 +395,7 @@ async def admin_update_participation(
         )
     
     # Verify the meal type is currently enabled
-    enabled_types = storage.get_enabled_meal_types()
+    enabled_types = await async_storage.get_enabled_meal_types()
     if meal_enum not in enabled_types:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -282,7 +405,7 @@ async def admin_update_participation(
     today = date.today()
     
     # Update participation with audit trail (updated_by = admin/TL id)
-    updated = storage.update_participation(
+    updated = await async_storage.update_participation(
         user_id=request.user_id,
         target_date=today,
         meal_type=meal_enum,
@@ -313,16 +436,19 @@ async def batch_admin_update_participation(
     Accept multiple participation updates in a single request.
     Replaces the pattern of calling POST /participation/admin once per meal type.
     Team Leads can only update users in their own team.
+    Valid updates are saved together in one storage write; with atomic=true
+    nothing is saved unless every update is valid.
     """
     results = []
     succeeded = 0
     failed = 0
     today = date.today()
-    enabled_types = storage.get_enabled_meal_types()
+    enabled_types = await async_storage.get_enabled_meal_types()
+    batch = storage.ParticipationBatch()
 
     for item in payload.updates:
         try:
-            target_user = storage.get_user_by_id(item.user_id)
+            target_user = await async_storage.get_user_by_id(item.user_id)
             if not target_user:
                 raise ValueError("User not found")
 
@@ -338,7 +464,8 @@ async def batch_admin_update_participation(
             if meal_enum not in enabled_types:
                 raise ValueError(f"The meal type '{item.meal_type}' is not currently enabled")
 
-            storage.update_participation(
+            await async_storage.run(
+                batch.update,
                 user_id=item.user_id,
                 target_date=today,
                 meal_type=meal_enum,
@@ -363,6 +490,24 @@ async def batch_admin_update_participation(
             })
             failed += 1
 
+    if payload.atomic and failed:
+        batch.discard()
+        not_applied = "Not applied: another update in this atomic batch failed"
+    else:
+        try:
+            await async_storage.run(batch.commit)
+            not_applied = None
+        except Exception as exc:
+            not_applied = f"Not applied: {exc}"
+
+    if not_applied:
+        for result in results:
+            if result["success"]:
+                result["success"] = False
+                result["message"] = not_applied
+        failed += succeeded
+        succeeded = 0
+
     return BatchParticipationResponse(
         total=len(payload.updates),
         succeeded=succeeded,
@@ -370,22 +515,200 @@ async def batch_admin_update_participation(
         results=results,
     )
 
+# ===========================
+# Live Headcount Stream
+# ===========================
+
+@router.get("/headcount/stream")
+async def stream_headcount(
+    token: str = Query(..., description="Access token (EventSource cannot send an Authorization header)"),
+    target_date: Optional[date] = Query(None, alias="date", description="Day to follow (YYYY-MM-DD); default today"),
+    team: Optional[str] = Query(None, description="Admin only: follow one team instead of the company"),
+):
+    """
+    Server-Sent Events stream of headcount for one day
+    Sends a "headcount" event with the current counts at once, then again
+    whenever they change, with "changes" holding each meal's difference from
+    the previous event; bursts of changes are coalesced into one event
+    Team Leads get their own team's counts; Admin gets the company or ?team=
+    The stream ends when the access token expires; reconnect with a fresh one
+    """
+    current_user = await auth_service.authenticate_token(token)
+    if current_user.role not in [UserRole.TEAM_LEAD, UserRole.ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Access denied. Required role(s): team_lead, admin. Your role: {current_user.role.value}"
+        )
+    if current_user.role == UserRole.TEAM_LEAD:
+        if team is not None and team.strip().casefold() != (current_user.team or "").strip().casefold():
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Can only follow your own team"
+            )
+        # A lead without a team follows an empty team, not the company
+        team = current_user.team or ""
+    expires_at = auth_service.verify_token_cached(token)["exp"]
+    
+    async def events():
+        subscription = None
+        try:
+            subscription = await headcount_stream.broker.subscribe(team, target_date)
+            yield f"retry: {headcount_stream.RETRY_MILLISECONDS}\n\n"
+            while not subscription.closed:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    break
+                counts = await subscription.next(min(headcount_stream.KEEPALIVE_SECONDS, remaining))
+                if counts is not None:
+                    yield headcount_stream.format_event("headcount", counts)
+                elif not subscription.closed:
+                    yield ": keepalive\n\n"
+        finally:
+            if subscription is not None:
+                headcount_stream.broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ===========================
+# Get Headcount for a Date Range
+# ===========================
+
+@router.get("/headcount/range", response_model=HeadcountRangeResponse)
+async def get_headcount_range(
+    start: date = Query(..., description="First date (YYYY-MM-DD)"),
+    end: date = Query(..., description="Last date, inclusive (YYYY-MM-DD)"),
+    team: Optional[str] = Query(None, description="Only count this team"),
+    group_by_team: bool = Query(False, description="Also break each day down by team"),
+    current_user: User = Depends(require_role([UserRole.TEAM_LEAD, UserRole.ADMIN])),
+    _etag: None = Depends(conditional_get)
+):
+    """
+    Get headcount totals for each meal type on every date from start to end
+    Computed in one storage call instead of one request per day
+    Team Leads get their own team's counts; Admin gets the company or ?team=
+    group_by_team is Admin only
+    """
+    if current_user.role != UserRole.ADMIN:
+        if group_by_team:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only admins can break headcounts down by team"
+            )
+        if team is not None and team.strip().casefold() != (current_user.team or "").strip().casefold():
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Can only view your own team"
+            )
+        team = current_user.team or ""
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must not be before start"
+        )
+    if (end - start).days + 1 > MAX_HEADCOUNT_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range is limited to {MAX_HEADCOUNT_RANGE_DAYS} days"
+        )
+    
+    enabled_types = await async_storage.get_enabled_meal_types()
+    counts = await async_storage.get_headcount_range(start, end, team)
+    by_team = await async_storage.get_team_headcount_range(start, end) if group_by_team else {}
+    users = await async_storage.get_users_by_team(team) if team is not None else await async_storage.get_all_users()
+    
+    days = []
+    for day, headcount in counts.items():
+        teams = None
+        if group_by_team:
+            teams = {
+                name: _enabled_only(team_counts, enabled_types)
+                for name, team_counts in by_team[day].items()
+                if team is None or name.casefold() == team.strip().casefold()
+            }
+        days.append({
+            "date": day.isoformat(),
+            "headcount": _enabled_only(headcount, enabled_types),
+            "teams": teams,
+        })
+    
+    return HeadcountRangeResponse(
+        start=start.isoformat(),
+        end=end.isoformat(),
+        team=team,
+        days=days,
+        total_employees=len([u for u in users if u.is_active])
+    )
+
+# ===========================
+# Participation History Export (Admin only)
+# ===========================
+
+@router.get("/export")
+async def export_participation(
+    start: date = Query(..., description="First date (YYYY-MM-DD)"),
+    end: date = Query(..., description="Last date, inclusive (YYYY-MM-DD)"),
+    format: str = Query("ndjson", description="ndjson or csv"),
+    team: Optional[str] = Query(None, description="Only this team"),
+    meal_type: Optional[List[MealType]] = Query(None, description="Only these meal types (repeatable)"),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Download every user's participation for each meal and day in a range
+    Streamed a day at a time, so memory stays bounded however long the range
+    Days without a stored choice show the default, matching the headcounts
+    Admin only
+    """
+    if format not in participation_export.EXPORT_FORMATS:
+        valid_formats = ", ".join(participation_export.EXPORT_FORMATS)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format. Valid options: {valid_formats}"
+        )
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must not be before start"
+        )
+    
+    rows = await async_storage.run(participation_export.iter_rows, start, end, team, meal_type)
+    chunks = participation_export.export_chunks(rows, format)
+    
+    async def body():
+        # Producing a chunk reads storage, so do it on the storage pool
+        while True:
+            chunk = await async_storage.run(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    
+    filename = f"participation_{start.isoformat()}_{end.isoformat()}.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=participation_export.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 # ===========================
 # Get Team Headcount for Today
 # ===========================
 
 @router.get("/headcount/team/today", response_model=HeadcountResponse)
 async def get_team_headcount_today(
-    current_user: User = Depends(require_role([UserRole.TEAM_LEAD, UserRole.ADMIN]))
+    current_user: User = Depends(require_role([UserRole.TEAM_LEAD, UserRole.ADMIN])),
+    _etag: None = Depends(conditional_get)
 ):
     """
     Get headcount for the team lead's team for today
     """
     today = date.today()
-    headcount = storage.get_headcount_by_date_and_team(today, current_user.team)
-    enabled_types = storage.get_enabled_meal_types()
+    headcount = await async_storage.get_headcount_by_date_and_team(today, current_user.team)
+    enabled_types = await async_storage.get_enabled_meal_types()
     headcount = {k: v for k, v in headcount.items() if MealType(k) in enabled_types}
-    team_users = storage.get_users_by_team(current_user.team)
+    team_users = await async_storage.get_users_by_team(current_user.team)
     total_active = len([u for u in team_users if u.is_active])
     
     return HeadcountResponse(
@@ -401,15 +724,16 @@ async def get_team_headcount_today(
 @router.get("/headcount/team/{target_date}", response_model=HeadcountResponse)
 async def get_team_headcount(
     target_date: date,
-    current_user: User = Depends(require_role([UserRole.TEAM_LEAD, UserRole.ADMIN]))
+    current_user: User = Depends(require_role([UserRole.TEAM_LEAD, UserRole.ADMIN])),
+    _etag: None = Depends(conditional_get)
 ):
     """
     Get headcount for the team lead's team for a specific date
     """
-    headcount = storage.get_headcount_by_date_and_team(target_date, current_user.team)
-    enabled_types = storage.get_enabled_meal_types()
+    headcount = await async_storage.get_headcount_by_date_and_team(target_date, current_user.team)
+    enabled_types = await async_storage.get_enabled_meal_types()
     headcount = {k: v for k, v in headcount.items() if MealType(k) in enabled_types}
-    team_users = storage.get_users_by_team(current_user.team)
+    team_users = await async_storage.get_users_by_team(current_user.team)
     total_active = len([u for u in team_users if u.is_active])
     
     return HeadcountResponse(
@@ -424,17 +748,18 @@ async def get_team_headcount(
 
 @router.get("/headcount/today", response_model=HeadcountResponse)
 async def get_today_headcount(
-    current_user: User = Depends(require_role([UserRole.TEAM_LEAD, UserRole.ADMIN]))
+    current_user: User = Depends(require_role([UserRole.TEAM_LEAD, UserRole.ADMIN])),
+    _etag: None = Depends(conditional_get)
 ):
     """
     Get headcount totals for each meal type for today
     Team Leads and Admin only
     """
     today = date.today()
-    headcount = storage.get_headcount_by_date(today)
-    enabled_types = storage.get_enabled_meal_types()
+    headcount = await async_storage.get_headcount_by_date(today)
+    enabled_types = await async_storage.get_enabled_meal_types()
     headcount = {k: v for k, v in headcount.items() if MealType(k) in enabled_types}
-    all_users = storage.get_all_users()
+    all_users = await async_storage.get_all_users()
     total_active = len([u for u in all_users if u.is_active])
     
     return HeadcountResponse(
@@ -450,16 +775,17 @@ async def get_today_headcount(
 @router.get("/headcount/{target_date}", response_model=HeadcountResponse)
 async def get_headcount(
     target_date: date,
-    current_user: User = Depends(require_role([UserRole.TEAM_LEAD, UserRole.ADMIN]))
+    current_user: User = Depends(require_role([UserRole.TEAM_LEAD, UserRole.ADMIN])),
+    _etag: None = Depends(conditional_get)
 ):
     """
     Get headcount totals for each meal type on a specific date
     Team Leads and Admin only
     """
-    headcount = storage.get_headcount_by_date(target_date)
-    enabled_types = storage.get_enabled_meal_types()
+    headcount = await async_storage.get_headcount_by_date(target_date)
+    enabled_types = await async_storage.get_enabled_meal_types()
     headcount = {k: v for k, v in headcount.items() if MealType(k) in enabled_types}
-    all_users = storage.get_all_users()
+    all_users = await async_storage.get_all_users()
     total_active = len([u for u in all_users if u.is_active])
     
     return HeadcountResponse(
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from app.schemas import UserResponse, UserListResponse, UserUpdate, UserCreate
-from app.models import User, UserRole
+from fastapi import APIRouter, HTTPException, status, Depends, File, Query, UploadFile
+from app.schemas import UserResponse, UserListResponse, UserUpdate, UserCreate, UserImportResponse
+from app.models import User, UserRole, set_active
 from app import auth as auth_service
 from app.auth import require_role
-from app import storage
+from app import async_storage, user_import
+from app.etags import conditional_get
 
 router = APIRouter()
 
@@ -12,11 +13,14 @@ router = APIRouter()
 # ===========================
 
 @router.get("", response_model=UserListResponse)
-async def get_all_users(current_user: User = Depends(require_role([UserRole.TEAM_LEAD, UserRole.ADMIN]))):
+async def get_all_users(
+    current_user: User = Depends(require_role([UserRole.TEAM_LEAD, UserRole.ADMIN])),
+    _etag: None = Depends(conditional_get)
+):
     """
     Get list of all users - Team Lead and Admin
     """
-    all_users = storage.get_all_users()
+    all_users = await async_storage.get_all_users()
     user_responses = [
         UserResponse(
             id=user.id,
@@ -61,14 +65,14 @@ async def admin_create_user(
     """
     Create a new user with any role - Admin only
     """
-    existing = storage.get_user_by_email(user_data.email)
+    existing = await async_storage.get_user_by_email(user_data.email)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Email already registered"
         )
     
-    password_hash = auth_service.hash_password(user_data.password)
+    password_hash = await auth_service.hash_password_async(user_data.password)
     
     new_user = User(
         name=user_data.name,
@@ -80,7 +84,7 @@ async def admin_create_user(
     )
     
     try:
-        created_user = storage.create_user(new_user)
+        created_user = await async_storage.create_user(new_user)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -96,6 +100,80 @@ async def admin_create_user(
         is_active=created_user.is_active
     )
 
+# ===========================
+# Admin Bulk Import Users
+# ===========================
+
+@router.post("/import", response_model=UserImportResponse)
+async def import_users(
+    file: UploadFile = File(..., description="CSV with a header row, or NDJSON (.ndjson/.jsonl)"),
+    atomic: bool = Query(False, description="Create nobody unless every row is valid"),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Create many users from an uploaded file - Admin only
+    Rows need name, email and password; role and team are optional.
+    Every row is validated before any password is hashed; valid rows are
+    hashed in parallel and saved together in one storage write.
+    """
+    try:
+        fmt = user_import.detect_format(file.filename, file.content_type)
+        rows = user_import.parse_import(await file.read(), fmt)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    valid = [r for r in rows if r.user is not None]
+    taken = await async_storage.run(user_import.registered_emails, [r.user.email for r in valid])
+    errors = {r.row: r.error for r in rows if r.error}
+    for r in valid:
+        if r.user.email.casefold() in taken:
+            errors[r.row] = "Email already registered"
+    to_create = [r for r in valid if r.row not in errors]
+    
+    created = {}
+    if to_create and not (atomic and errors):
+        password_hashes = await auth_service.hash_passwords_async([r.user.password for r in to_create])
+        new_users = [
+            User(
+                name=r.user.name,
+                email=r.user.email,
+                password_hash=password_hash,
+                role=r.user.role,
+                team=r.user.team,
+                is_active=True
+            )
+            for r, password_hash in zip(to_create, password_hashes)
+        ]
+        try:
+            await async_storage.create_users(new_users)
+            created = {r.row: user.id for r, user in zip(to_create, new_users)}
+        except ValueError as e:
+            # Someone registered one of the emails while we were hashing
+            for r in to_create:
+                errors[r.row] = f"Not created: {e}"
+    
+    not_applied = "Not created: another row in this atomic import failed"
+    results = [
+        {
+            "row": r.row,
+            "email": r.email,
+            "success": r.row in created,
+            "message": "Created" if r.row in created else errors.get(r.row, not_applied),
+            "user_id": created.get(r.row),
+        }
+        for r in rows
+    ]
+    
+    return UserImportResponse(
+        total=len(rows),
+        created=len(created),
+        failed=len(rows) - len(created),
+        results=results
+    )
+
 # ===========================
 # Get Users in My Team
 # ===========================
@@ -105,7 +183,7 @@ async def get_team_users(current_user: User = Depends(require_role([UserRole.TEA
     """
     Get list of users in the current user's team - Team Lead and Admin
     """
-    team_users = storage.get_users_by_team(current_user.team)
+    team_users = await async_storage.get_users_by_team(current_user.team)
     user_responses = [
         UserResponse(
             id=user.id,
@@ -136,7 +214,7 @@ async def get_user(user_id: str, current_user: User = Depends(auth_service.get_c
             detail="You don't have permission to view this user"
         )
     
-    user = storage.get_user_by_id(user_id)
+    user = await async_storage.get_user_by_id(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -165,7 +243,7 @@ async def update_user(
     """
     Update user information - Admin only
     """
-    user = storage.get_user_by_id(user_id)
+    user = await async_storage.get_user_by_id(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -180,10 +258,10 @@ async def update_user(
     if update_data.team is not None:
         user.team = update_data.team
     if update_data.is_active is not None:
-        user.is_active = update_data.is_active
+        set_active(user, update_data.is_active)
     
     # Save updated user
-    updated_user = storage.update_user(user)
+    updated_user = await async_storage.update_user(user)
     
     return UserResponse(
         id=updated_user.id,
@@ -206,7 +284,7 @@ async def deactivate_user(
     """
     Soft delete - deactivate a user. Admin only.
     """
-    user = storage.get_user_by_id(user_id)
+    user = await async_storage.get_user_by_id(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -219,7 +297,7 @@ async def deactivate_user(
             detail="Cannot deactivate your own account"
         )
     
-    user.is_active = False
-    storage.update_user(user)
+    set_active(user, False)
+    await async_storage.update_user(user)
     
     return {"message": f"User {user.name} has been deactivated"}
@@ -18,6 +18,7 @@ class LoginRequest(BaseModel):
 class LoginResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
     user: 'UserResponse'
 
     class Config:
@@ -25,6 +26,7 @@ class LoginResponse(BaseModel):
             "example": {
                 "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
                 "token_type": "bearer",
+                "refresh_token": "q3Zf0nJ6kS...",
                 "user": {
                     "id": "123456",
                     "name": "John Doe",
@@ -36,6 +38,10 @@ class LoginResponse(BaseModel):
         }
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str = Field(..., min_length=1)
+
+
 class UserResponse(BaseModel):
     id: str
     name: str
@@ -150,6 +156,20 @@ class UserCreateResponse(BaseModel):
             }
         }
 
+class UserImportResultItem(BaseModel):
+    row: int
+    email: Optional[str] = None
+    success: bool
+    message: str
+    user_id: Optional[str] = None
+
+
+class UserImportResponse(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: List[UserImportResultItem]
+
 class MealInfo(BaseModel):
     meal_type: MealType
     is_participating: bool
@@ -214,6 +234,56 @@ class UserMealsResponse(BaseModel):
             }
         }
 
+class RosterMemberMeals(BaseModel):
+    """One member of a roster with their meals for the day."""
+    user: UserResponse
+    meals: List[MealParticipationResponse]
+
+class RosterMealsResponse(BaseModel):
+    """Every member's meals for a date; ``total`` counts members before paging."""
+    date: str
+    team: Optional[str] = None
+    members: List[RosterMemberMeals]
+    total: int
+    offset: int = 0
+    limit: Optional[int] = None
+    cutoff_passed: bool = False
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "date": "2026-02-17",
+                "team": "Engineering",
+                "members": [
+                    {
+                        "user": {
+                            "id": "user-1",
+                            "name": "John Doe",
+                            "email": "john@company.com",
+                            "role": "employee",
+                            "team": "Engineering",
+                            "is_active": True
+                        },
+                        "meals": [
+                            {
+                                "id": "part-001",
+                                "user_id": "user-1",
+                                "meal_type": "lunch",
+                                "date": "2026-02-17",
+                                "is_participating": True,
+                                "updated_by": "user-1",
+                                "updated_at": "2026-02-17T10:30:00"
+                            }
+                        ]
+                    }
+                ],
+                "total": 1,
+                "offset": 0,
+                "limit": None,
+                "cutoff_passed": False
+            }
+        }
+
 class TodayMealsResponse(BaseModel):
     """Simplified today meals response using MealInfo."""
     date: date
@@ -327,8 +397,12 @@ class BatchParticipationItem(BaseModel):
 
 
 class BatchParticipationRequest(BaseModel):
-    """Wraps a list of updates so the frontend can send one request."""
+    """Wraps a list of updates so the frontend can send one request.
+
+    With ``atomic`` set, nothing is saved unless every update is valid.
+    """
     updates: List[BatchParticipationItem]
+    atomic: bool = False
 
     class Config:
         json_schema_extra = {
@@ -336,7 +410,8 @@ class BatchParticipationRequest(BaseModel):
                 "updates": [
                     {"user_id": "user-1", "meal_type": "lunch", "is_participating": False},
                     {"user_id": "user-1", "meal_type": "snacks", "is_participating": False}
-                ]
+                ],
+                "atomic": False
             }
         }
 
@@ -442,6 +517,34 @@ class HeadcountResponse(BaseModel):
         }
 
 
+
+class HeadcountRangeDay(BaseModel):
+    date: str
+    headcount: Dict[str, int]
+    teams: Optional[Dict[str, Dict[str, int]]] = None
+
+
+class HeadcountRangeResponse(BaseModel):
+    start: str
+    end: str
+    team: Optional[str] = None
+    days: List[HeadcountRangeDay]
+    total_employees: int = 0
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "start": "2026-02-09",
+                "end": "2026-02-10",
+                "team": None,
+                "days": [
+                    {"date": "2026-02-09", "headcount": {"lunch": 87, "snacks": 92}, "teams": None},
+                    {"date": "2026-02-10", "headcount": {"lunch": 85, "snacks": 90}, "teams": None}
+                ],
+                "total_employees": 95
+            }
+        }
+
 class MessageResponse(BaseModel):
     message: str
 
@@ -1,273 +1,396 @@
-import json
 import os
+import sys
+import time
 from datetime import date, datetime
-from typing import Optional, Dict, List
+from types import MappingProxyType
+from typing import Callable, Hashable, Iterator, Mapping, Optional, Dict, List, NamedTuple, Tuple
 from pathlib import Path
-from app.models import User, MealParticipation, MealType, create_default_participation, ADMIN_CONTROLLED_MEALS
+from dotenv import load_dotenv
+from app.models import (
+    User, MealParticipation, MealType, RefreshToken, create_default_participation, gets_defaults, participation_id,
+)
+from app.backends import StorageBackend, create_backend
+from app.backends.base import default_meal_config
 
 DATA_DIR = Path(__file__).parent.parent / "data"
-USERS_FILE = DATA_DIR / "users.json"
-PARTICIPATION_FILE = DATA_DIR / "meal_participation.json"
-MEAL_CONFIG_FILE = DATA_DIR / "meal_config.json"
 
 DATA_DIR.mkdir(exist_ok=True)
 
-def _serialize_datetime(obj):
-    if isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    raise TypeError(f"Type {type(obj)} not serializable")
-
-def _load_json(filepath: Path) -> dict:
-    if not filepath.exists():
-        return {"users": []} if "users" in str(filepath) else {"participation": []}
-    try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return {"users": []} if "users" in str(filepath) else {"participation": []}
-    
-def _save_json(filepath: Path, data: dict) -> None:
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, default=_serialize_datetime, ensure_ascii=False)
+load_dotenv()
+
+# "json" (default) or "sqlite"; see app.backends
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+SQLITE_PATH = os.getenv("SQLITE_PATH")
+
+# JSON backend only: journal mode appends each participation change to
+# meal_participation.journal instead of rewriting that day's shard
+# (participation/YYYY-MM-DD.json); a background compaction folds the journal
+# back into the shards every PARTICIPATION_JOURNAL_COMPACT_EVERY changes.
+PARTICIPATION_JOURNAL = os.getenv("PARTICIPATION_JOURNAL", "false").lower() in ("1", "true", "yes")
+PARTICIPATION_JOURNAL_COMPACT_EVERY = int(os.getenv("PARTICIPATION_JOURNAL_COMPACT_EVERY", "1000"))
+
+# JSON backend only: compaction (on shutdown, or `python -m app.storage compact`)
+# also writes participation/snapshot.bin, a memory-mapped binary snapshot that
+# serves headcounts for days not yet loaded without parsing their shards.
+PARTICIPATION_SNAPSHOT = os.getenv("PARTICIPATION_SNAPSHOT", "true").lower() in ("1", "true", "yes")
+
+_backend: Optional[StorageBackend] = None
+
+def get_backend() -> StorageBackend:
+    """The active backend, created from the environment on first use."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend(
+            STORAGE_BACKEND,
+            DATA_DIR,
+            journal=PARTICIPATION_JOURNAL,
+            journal_compact_every=PARTICIPATION_JOURNAL_COMPACT_EVERY,
+            snapshot=PARTICIPATION_SNAPSHOT,
+            sqlite_path=SQLITE_PATH,
+        )
+    return _backend
+
+def use_backend(backend: Optional[StorageBackend]) -> None:
+    """Swap the active backend (used by tests and maintenance scripts)."""
+    global _backend, _meal_config
+    if _backend is not None and _backend is not backend:
+        _backend.close()
+    _backend = backend
+    _meal_config = None
+    _notify_user_changed(None)
+    _notify_headcount_changed(None)
+
+# ===========================
+# Change Listeners
+# ===========================
+
+# Called with the id of a user that changed, or None when any user may have
+# changed (backend swapped); used by in-process caches of users
+_user_listeners: List[Callable[[Optional[str]], None]] = []
+
+def add_user_listener(listener: Callable[[Optional[str]], None]) -> None:
+    _user_listeners.append(listener)
+
+def _notify_user_changed(user_id: Optional[str]) -> None:
+    for listener in _user_listeners:
+        listener(user_id)
+
+# Called after participation records are saved, with those records, or with
+# None when meal config changed (any headcount may have changed); used by
+# the live headcount stream
+_headcount_listeners: List[Callable[[Optional[List[MealParticipation]]], None]] = []
+
+def add_headcount_listener(listener: Callable[[Optional[List[MealParticipation]]], None]) -> None:
+    _headcount_listeners.append(listener)
+
+def _notify_headcount_changed(records: Optional[List[MealParticipation]]) -> None:
+    for listener in _headcount_listeners:
+        listener(records)
 
 # ===========================
 # User Operations
 # ===========================
 
 def get_all_users() -> List[User]:
-    data = _load_json(USERS_FILE)
-    return [User(**user) for user in data.get("users", [])]
+    return get_backend().get_all_users()
 
 def get_user_by_id(user_id: str) -> Optional[User]:
-    users = get_all_users()
-    for user in users:
-        if user.id == user_id:
-            return user
-    return None
+    return get_backend().get_user_by_id(user_id)
 
 def get_user_by_email(email: str) -> Optional[User]:
-    users = get_all_users()
-    for user in users:
-        if user.email.lower() == email.lower():
-            return user
-    return None
+    return get_backend().get_user_by_email(email)
 
 def create_user(user: User) -> User:
-    if get_user_by_email(user.email):
-        raise ValueError(f"User with email {user.email} already exists.")
-    data = _load_json(USERS_FILE)
-    users = data.get("users", [])
+    return get_backend().create_user(user)
 
-    user_dict = user.model_dump(mode="json")
-    users.append(user_dict)
-    data["users"] = users
-    _save_json(USERS_FILE, data)
-
-    return user
+def create_users(users: List[User]) -> List[User]:
+    """Create all users in one write, or none if any email is already registered."""
+    return get_backend().create_users(users)
 
 def update_user(user: User) -> User:
-    data = _load_json(USERS_FILE)
-    users = data.get("users", [])
-
-    found = False
-    for i, u in enumerate(users):
-        if u["id"] == user.id:
-            users[i] = user.model_dump(mode="json")
-            found = True
-            break
-    if not found:
-        raise ValueError(f"User with id {user.id} not found.")
-    
-    data["users"] = users
-    _save_json(USERS_FILE, data)
-
-    return user
+    updated = get_backend().update_user(user)
+    _notify_user_changed(user.id)
+    return updated
 
 # ===========================
 # Meal Participation Operations
 # ===========================
 
 def get_all_participation() -> List[MealParticipation]:
-    data = _load_json(PARTICIPATION_FILE)
-    participation_list = []
-
-    for record in data.get("participation", []):
-        if isinstance(record.get("date"), str):
-            record["date"] = datetime.fromisoformat(record["date"]).date()
-        if isinstance(record.get("updated_at"), str):
-            record["updated_at"] = datetime.fromisoformat(record["updated_at"])
+    return get_backend().get_all_participation()
 
-        participation_list.append(MealParticipation(**record))
-
-    return participation_list
+def compact_participation() -> None:
+    """Fold the participation journal into the shards and refresh the snapshot
+    (no-op for backends that have neither)."""
+    get_backend().compact()
 
 def get_user_participation(user_id: str, target_date: date) -> List[MealParticipation]:
-    all_participation = get_all_participation()
-    user_records = [
-        p for p in all_participation
-        if p.user_id == user_id and p.date == target_date
+    """One record per meal type: the stored one, or the default if none was ever saved.
+
+    Defaults are resolved here and never written; only explicit changes are stored.
+    Outside the user's default window (see ``models.default_window``) the
+    default is not participating.
+    """
+    backend = get_backend()
+    user = backend.get_user_by_id(user_id)
+    opted_in = user is not None and gets_defaults(user, target_date)
+    stored = {r.meal_type: r for r in backend.get_user_participation(user_id, target_date)}
+    return [
+        stored.get(default.meal_type, default)
+        for default in create_default_participation(user_id, target_date, opted_in)
     ]
 
-    if not user_records:
-        user_records = create_default_participation(user_id, target_date)
-        for record in user_records:
-            create_participation(record)
+def get_roster_participation(target_date: date, users: List[User]) -> Dict[str, List[MealParticipation]]:
+    """``get_user_participation`` for many users at once, keyed by user id.
 
-    return user_records
+    Reads the date's stored records once instead of once per user.
+    """
+    stored = {
+        (r.user_id, r.meal_type): r
+        for r in get_backend().get_participation_by_date(target_date)
+    }
+    return {
+        user.id: [
+            stored.get((user.id, default.meal_type), default)
+            for default in create_default_participation(user.id, target_date, gets_defaults(user, target_date))
+        ]
+        for user in users
+    }
 
 def get_participation_by_date(target_date:date) -> List[MealParticipation]:
-    all_participation = get_all_participation()
-    return [p for p in all_participation if p.date == target_date]
+    return get_backend().get_participation_by_date(target_date)
 
-def create_participation(participation: MealParticipation) -> MealParticipation:
-    data = _load_json(PARTICIPATION_FILE)
-    records = data.get("participation", [])
-    record_dict = participation.model_dump(mode="json")
-    records.append(record_dict)
-
-    data["participation"] = records
-    _save_json(PARTICIPATION_FILE, data)
+def iter_participation_by_date(start: date, end: date) -> Iterator[Tuple[date, List[MealParticipation]]]:
+    """Stored participation one day at a time, without filling any cache (for exports)."""
+    return get_backend().iter_participation_by_date(start, end)
 
+def create_participation(participation: MealParticipation) -> MealParticipation:
+    get_backend().save_participation([participation])
+    _notify_headcount_changed([participation])
     return participation
 
-def update_participation(
+def _apply_participation_change(
+        record: Optional[MealParticipation],
         user_id: str,
         target_date: date,
         meal_type: MealType,
         is_participating: bool,
         updated_by: str
 ) -> MealParticipation:
-    data = _load_json(PARTICIPATION_FILE)
-    records = data.get("participation", [])
-
-    found = False
-    for record in records:
-        record_date = record.get("date")
-        if isinstance(record_date, str):
-            record_date = datetime.fromisoformat(record_date).date()
-
-        if (record["user_id"] == user_id and
-            record_date == target_date and
-            record["meal_type"] == meal_type.value):
-            record["is_participating"] = is_participating
-            record["updated_by"] = updated_by
-            record["updated_at"] = datetime.now().isoformat()
-            found = True
-            
-            data["participation"] = records
-            _save_json(PARTICIPATION_FILE, data)
-
-            record["date"] = record_date
-            record["updated_at"] = datetime.fromisoformat(record["updated_at"])
-            return MealParticipation(**record)
-        
-    if not found:
-        new_record = MealParticipation(
+    if record is None:
+        record = MealParticipation(
+            id=participation_id(user_id, target_date, meal_type),
             user_id=user_id,
             meal_type=meal_type,
             date=target_date,
-            is_participating=is_participating,
-            updated_by=updated_by,
-            updated_at=datetime.now()
         )
-        return create_participation(new_record)
-    
-def get_headcount_by_date(target_date: date) -> Dict[str, int]:
-    participation_records = get_participation_by_date(target_date)
-    headcount = {meal_type.value: 0 for meal_type in MealType}
+    record.is_participating = is_participating
+    record.updated_by = updated_by
+    record.updated_at = datetime.now()
+    return record
+
+def update_participation(
+        user_id: str,
+        target_date: date,
+        meal_type: MealType,
+        is_participating: bool,
+        updated_by: str
+) -> MealParticipation:
+    record = get_backend().get_participation(user_id, target_date, meal_type)
+    record = _apply_participation_change(record, user_id, target_date, meal_type, is_participating, updated_by)
+    return create_participation(record)
+
+class ParticipationBatch:
+    """Unit of work for participation changes: stage many, write once.
+
+    ``update`` stages a change and returns the record as it will be stored;
+    nothing reaches the backend until ``commit``, which writes every staged
+    record in a single backend call. Staging the same (user, date, meal)
+    twice keeps the last change. Used as a context manager it commits on a
+    clean exit and discards everything if the block raises.
+    """
 
-    for record in participation_records:
-        if record.is_participating:
-            headcount[record.meal_type.value] += 1
+    def __init__(self) -> None:
+        self._staged: Dict[tuple, MealParticipation] = {}
 
-    return headcount
+    def __len__(self) -> int:
+        return len(self._staged)
+
+    def update(
+        self,
+        user_id: str,
+        target_date: date,
+        meal_type: MealType,
+        is_participating: bool,
+        updated_by: str
+    ) -> MealParticipation:
+        key = (user_id, target_date, meal_type)
+        record = self._staged.get(key) or get_backend().get_participation(user_id, target_date, meal_type)
+        record = _apply_participation_change(record, user_id, target_date, meal_type, is_participating, updated_by)
+        self._staged[key] = record
+        return record
+
+    def discard(self) -> None:
+        self._staged = {}
+
+    def commit(self) -> List[MealParticipation]:
+        records = list(self._staged.values())
+        if records:
+            get_backend().save_participation(records)
+            _notify_headcount_changed(records)
+        self._staged = {}
+        return records
+
+    def __enter__(self) -> "ParticipationBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+def get_headcount_by_date(target_date: date) -> Dict[str, int]:
+    return get_backend().get_headcount(target_date)
 
 
 def get_users_by_team(team: str) -> List[User]:
     """Get all users in a specific team"""
-    all_users = get_all_users()
-    return [u for u in all_users if u.team and u.team.lower() == team.lower()]
+    return get_backend().get_users_by_team(team)
+
+
+def get_headcount_by_date_and_team(target_date: date, team: Optional[str]) -> Dict[str, int]:
+    """Get headcount filtered by team for a specific date
+
+    No team (e.g. a team lead without one) is an empty team, never the company.
+    """
+    return get_backend().get_headcount(target_date, team=team or "")
+
+def get_headcount_range(start: date, end: date, team: Optional[str] = None) -> Dict[date, Dict[str, int]]:
+    """Headcount per date from start to end inclusive, optionally for one team"""
+    return get_backend().get_headcount_range(start, end, team=team)
 
 
-def get_headcount_by_date_and_team(target_date: date, team: str) -> Dict[str, int]:
-    """Get headcount filtered by team for a specific date"""
-    team_users = get_users_by_team(team)
-    team_user_ids = {u.id for u in team_users}
-    participation_records = get_participation_by_date(target_date)
-    headcount = {meal_type.value: 0 for meal_type in MealType}
+def get_team_headcount_range(start: date, end: date) -> Dict[date, Dict[str, Dict[str, int]]]:
+    """Headcount per date from start to end inclusive, broken down by team name"""
+    return get_backend().get_team_headcount_range(start, end)
 
-    for record in participation_records:
-        if record.is_participating and record.user_id in team_user_ids:
-            headcount[record.meal_type.value] += 1
 
-    return headcount
+def get_participants(target_date: date, meal_type: MealType, team: Optional[str] = None) -> List[str]:
+    """Ids of the users eating a meal on a date, optionally within one team"""
+    return get_backend().get_participants(target_date, meal_type, team=team)
 
-def initialize_daily_participation(target_date: date) -> None:
-    """Pre-create default participation records for all active users on the given date.
+class InitializationReport(NamedTuple):
+    date: date
+    created: int
+    elapsed_ms: float
 
-    For each active user, any meal types that do not already have a record for
-    *target_date* will get a new default record (opted-in or opted-out based on
-    DEFAULT_OPTED_IN_MEALS).  Users who already have full records are skipped.
+def initialize_daily_participation(target_date: date) -> InitializationReport:
+    """Pre-create default participation records for every user who gets defaults on the given date.
+
+    Not needed for correct reads or headcounts, which already treat missing
+    records as DEFAULT_OPTED_IN_MEALS; only useful to materialize a day
+    explicitly. Meal types that already have a record are skipped, and all
+    missing records are computed in one pass and written in one call.
     """
-    all_users = get_all_users()
-    all_participation = get_all_participation()
+    started = time.perf_counter()
 
-    # Build a lookup of existing records: { (user_id, meal_type_value) }
+    # Build a lookup of existing records: { (user_id, meal_type) }
     existing_keys = {
-        (p.user_id, p.meal_type.value)
-        for p in all_participation
-        if p.date == target_date
+        (p.user_id, p.meal_type)
+        for p in get_participation_by_date(target_date)
     }
 
-    for user in all_users:
-        if not user.is_active:
-            continue
+    missing = [
+        record
+        for user in get_all_users() if gets_defaults(user, target_date)
+        for record in create_default_participation(user.id, target_date)
+        if (record.user_id, record.meal_type) not in existing_keys
+    ]
+    if missing:
+        get_backend().save_participation(missing)
 
-        defaults = create_default_participation(user.id, target_date)
-        for record in defaults:
-            if (record.user_id, record.meal_type.value) not in existing_keys:
-                create_participation(record)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return InitializationReport(date=target_date, created=len(missing), elapsed_ms=elapsed_ms)
 
 # ===========================
 # Meal Configuration (Admin-controlled meal types)
 # ===========================
 
-def _load_meal_config() -> Dict[str, bool]:
-    """Load meal config. Returns dict of meal_type -> enabled."""
-    if not MEAL_CONFIG_FILE.exists():
+class MealConfig(NamedTuple):
+    """Immutable snapshot of the meal config as of ``version``."""
+    version: Hashable
+    enabled: Mapping[str, bool]
+    enabled_types: Tuple[str, ...]
+
+_meal_config: Optional[MealConfig] = None
+
+def _load_meal_config() -> MealConfig:
+    """Current meal config, reloaded only when the backend's version token changes.
+
+    The config changes a few times a year but is read on every meal request,
+    so checking the version (a stat or a one-row lookup) replaces a full reload.
+    """
+    global _meal_config
+    backend = get_backend()
+    version = backend.meal_config_version()
+    cached = _meal_config
+    if cached is not None and cached.version == version:
+        return cached
+
+    config = backend.load_meal_config()
+    if config is None:
         # By default, admin-controlled meals are disabled
-        default = {}
-        for mt in MealType:
-            default[mt.value] = mt not in ADMIN_CONTROLLED_MEALS
-        return default
-    try:
-        with open(MEAL_CONFIG_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("enabled_meals", {})
-    except json.JSONDecodeError:
-        default = {}
-        for mt in MealType:
-            default[mt.value] = mt not in ADMIN_CONTROLLED_MEALS
-        return default
-
-def _save_meal_config(config: Dict[str, bool]) -> None:
-    _save_json(MEAL_CONFIG_FILE, {"enabled_meals": config})
+        config = default_meal_config()
+    cached = _meal_config = MealConfig(
+        version=version,
+        enabled=MappingProxyType(dict(config)),
+        enabled_types=tuple(mt for mt, enabled in config.items() if enabled),
+    )
+    return cached
 
 def get_enabled_meals() -> Dict[str, bool]:
     """Get which meal types are currently enabled."""
-    return _load_meal_config()
+    return dict(_load_meal_config().enabled)
 
 def set_meal_enabled(meal_type: str, enabled: bool) -> Dict[str, bool]:
     """Enable or disable a meal type. Returns updated config."""
-    config = _load_meal_config()
-    config[meal_type] = enabled
-    _save_meal_config(config)
+    config = get_backend().set_meal_enabled(meal_type, enabled)
+    _notify_headcount_changed(None)
     return config
 
 def get_enabled_meal_types() -> List[str]:
     """Get list of meal type values that are currently enabled."""
-    config = _load_meal_config()
-    return [mt for mt, enabled in config.items() if enabled]
+    return list(_load_meal_config().enabled_types)
+
+# ===========================
+# Change Version
+# ===========================
+
+def get_users_version() -> Hashable:
+    """Token that changes whenever a user is created or updated, in any process."""
+    return get_backend().users_version()
+
+def get_data_version() -> Hashable:
+    """Token that changes whenever users, participation or meal config change (for ETags)."""
+    return get_backend().data_version()
+
+# ===========================
+# Refresh Tokens
+# ===========================
+
+def save_refresh_token(token: RefreshToken) -> None:
+    get_backend().save_refresh_token(token)
+
+def get_refresh_token(token_hash: str) -> Optional[RefreshToken]:
+    return get_backend().get_refresh_token(token_hash)
+
+def rotate_refresh_token(token_hash: str, replacement: RefreshToken) -> bool:
+    """Revoke ``token_hash`` and store ``replacement``; False if it was already revoked."""
+    return get_backend().rotate_refresh_token(token_hash, replacement)
+
+def revoke_refresh_tokens(family_id: Optional[str] = None, user_id: Optional[str] = None) -> int:
+    return get_backend().revoke_refresh_tokens(family_id=family_id, user_id=user_id)
 
 # ===========================
 # Initialization and Seeding
@@ -311,13 +434,20 @@ def seed_initial_data() -> None:
         create_user(user)
         print(f"Created user: {user.email}")
     
-    today = date.today()
-    initialize_daily_participation(today)
-    print(f"Initialized participation for {today}")
-    
     print("Seed data created successfully!")
 
 
 if __name__ == "__main__":
-    # Run seed data when this module is executed directly
-    seed_initial_data()
+    # python -m app.storage                     -> seed data
+    # python -m app.storage init-day [YYYY-MM-DD] -> materialize a day's defaults
+    # python -m app.storage compact               -> fold journal, refresh snapshot
+    if len(sys.argv) > 1 and sys.argv[1] == "compact":
+        compact_participation()
+        print("Participation compacted")
+    elif len(sys.argv) > 1 and sys.argv[1] == "init-day":
+        day = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else date.today()
+        report = initialize_daily_participation(day)
+        print(f"Initialized participation for {report.date}: "
+              f"{report.created} records in {report.elapsed_ms:.1f} ms")
+    else:
+        seed_initial_data()
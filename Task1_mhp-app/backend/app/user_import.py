@@ -0,0 +1,129 @@
+"""
+Parsing and validation for bulk user imports (POST /api/users/import).
+
+An import file is CSV with a header row, or NDJSON with one JSON object per
+line. Either way each row has the ``UserCreate`` fields: name, email,
+password, and optionally role and team. Rows are checked up front, before
+any password is hashed, so a bad file costs no bcrypt time.
+"""
+
+import csv
+import io
+import json
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from pydantic import ValidationError
+
+from app.schemas import UserCreate
+from app.auth import validate_password_strength
+from app import storage
+
+# Hashing runs on all but one bcrypt worker, at a few hundred ms per row,
+# and the request stays open until it is done
+MAX_IMPORT_ROWS = 500
+
+
+class ImportRow(NamedTuple):
+    """One input row: its number in the file, and the parsed user or why it was rejected."""
+    row: int
+    email: Optional[str]
+    user: Optional[UserCreate]
+    error: Optional[str]
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    """``csv`` or ``ndjson`` from the file extension, else from the content type."""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    raise ValueError("Unrecognised import file: upload a .csv or .ndjson file")
+
+
+def _read_csv(text: str) -> List[tuple]:
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise ValueError("CSV import has no header row")
+    rows = []
+    for fields in reader:
+        extra = fields.pop(None, None)
+        data = {key.strip(): (value.strip() if value else None) for key, value in fields.items() if key}
+        rows.append((reader.line_num, data, "Row has more values than the header" if extra else None))
+    return rows
+
+
+def _read_ndjson(text: str) -> List[tuple]:
+    rows = []
+    for line_num, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            rows.append((line_num, {}, f"Invalid JSON: {e.msg}"))
+            continue
+        if not isinstance(data, dict):
+            rows.append((line_num, {}, "Each line must be a JSON object"))
+            continue
+        rows.append((line_num, data, None))
+    return rows
+
+
+def _validate(data: Dict[str, Any]) -> UserCreate:
+    # Empty CSV cells mean "not given" so the model defaults apply
+    try:
+        user = UserCreate(**{key: value for key, value in data.items() if value is not None})
+    except ValidationError as e:
+        problems = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        )
+        raise ValueError(problems)
+    is_valid, error_message = validate_password_strength(user.password)
+    if not is_valid:
+        raise ValueError(error_message)
+    return user
+
+
+def parse_import(content: bytes, fmt: str) -> List[ImportRow]:
+    """Parse and validate every row; raises ValueError only if the file as a whole is unusable."""
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("Import file must be UTF-8 encoded")
+
+    raw_rows = _read_csv(text) if fmt == "csv" else _read_ndjson(text)
+    if not raw_rows:
+        raise ValueError("Import file contains no rows")
+    if len(raw_rows) > MAX_IMPORT_ROWS:
+        raise ValueError(f"Import file has {len(raw_rows)} rows; the limit is {MAX_IMPORT_ROWS}")
+
+    rows = []
+    seen_emails = set()
+    for row_num, data, error in raw_rows:
+        email = data.get("email") if isinstance(data.get("email"), str) else None
+        if error is None:
+            try:
+                user = _validate(data)
+            except ValueError as e:
+                error = str(e)
+            else:
+                key = user.email.casefold()
+                if key in seen_emails:
+                    error = "Email appears more than once in this file"
+                else:
+                    seen_emails.add(key)
+                    rows.append(ImportRow(row_num, user.email, user, None))
+                    continue
+        rows.append(ImportRow(row_num, email, None, error))
+    return rows
+
+
+def registered_emails(emails: List[str]) -> set:
+    """Casefolded emails, of those given, that already belong to a user (index lookups)."""
+    return {email.casefold() for email in emails if storage.get_user_by_email(email) is not None}
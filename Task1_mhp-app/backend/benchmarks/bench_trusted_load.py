@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Per-row cost of loading stored records, before and after the fast paths:
+
+- User: full Pydantic validation versus ``user_from_storage`` (trusted,
+  model_construct plus plain type conversion; skips the EmailStr check).
+- MealParticipation: validated constructor versus the same trusted recipe.
+  Its fields are all cheap to validate, so pydantic-core beats
+  model_construct here and stored participation keeps the validated path;
+  this case is kept to show that.
+
+Run with:
+    cd backend
+    python benchmarks/bench_trusted_load.py            # 1,000,000 rows
+    python benchmarks/bench_trusted_load.py --rows 100000
+"""
+
+import argparse
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models import User, MealParticipation, MealType, UserRole, user_from_storage  # noqa: E402
+
+# Rows are generated in batches of this size and loaded repeatedly
+BATCH = 10_000
+
+
+def make_user_rows() -> list:
+    now = datetime.now()
+    return [
+        User(
+            name=f"User {n}",
+            email=f"user{n}@company.com",
+            password_hash="$2b$12$" + "x" * 53,
+            role=UserRole.EMPLOYEE,
+            team=f"Team {n % 50}",
+            created_at=now,
+        ).model_dump(mode="json")
+        for n in range(BATCH)
+    ]
+
+
+def make_participation_rows() -> list:
+    meal_types = list(MealType)
+    now = datetime.now()
+    return [
+        MealParticipation(
+            user_id=str(uuid.uuid4()),
+            meal_type=meal_types[n % len(meal_types)],
+            date=date(2026, 1, 1) + timedelta(days=n % 365),
+            is_participating=bool(n % 2),
+            updated_by="admin",
+            updated_at=now,
+        ).model_dump(mode="json")
+        for n in range(BATCH)
+    ]
+
+
+def participation_from_storage(row: dict) -> MealParticipation:
+    """What a trusted MealParticipation loader would look like (not used by the app)."""
+    return MealParticipation.model_construct(
+        id=row["id"],
+        user_id=row["user_id"],
+        meal_type=MealType(row["meal_type"]),
+        date=date.fromisoformat(row["date"]),
+        is_participating=row["is_participating"],
+        updated_by=row["updated_by"],
+        updated_at=datetime.fromisoformat(row["updated_at"]),
+    )
+
+
+def bench(label: str, load_batch, rows: int) -> float:
+    """Call ``load_batch`` until ``rows`` rows are loaded; returns microseconds per row."""
+    batches = max(rows // BATCH, 1)
+    started = time.perf_counter()
+    for _ in range(batches):
+        load_batch()
+    per_row = (time.perf_counter() - started) / (batches * BATCH) * 1e6
+    print(f"  {label:<10} {per_row:8.2f} us/row")
+    return per_row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-row load cost of stored records")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows to load per case")
+    args = parser.parse_args()
+    print(f"Loading {max(args.rows // BATCH, 1) * BATCH:,} rows per case")
+
+    users = make_user_rows()
+    print("User (validated constructor -> user_from_storage)")
+    before = bench("before", lambda: [User(**row) for row in users], args.rows)
+    after = bench("after", lambda: [user_from_storage(row) for row in users], args.rows)
+    print(f"  speedup    {before / after:8.1f}x")
+
+    participation = make_participation_rows()
+    print("MealParticipation (validated constructor -> trusted recipe; app keeps validated)")
+    before = bench("validated", lambda: [MealParticipation(**row) for row in participation], args.rows)
+    after = bench("trusted", lambda: [participation_from_storage(row) for row in participation], args.rows)
+    print(f"  speedup    {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Shared fixtures and helpers for the backend tests.
+
+The ``backend`` fixture runs a test once per storage backend; helpers are
+imported explicitly (``from tests.conftest import make_user``).
+"""
+
+import sys
+import os
+
+# Ensure the backend package is importable when running from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import datetime
+
+from app import storage
+from app.backends import create_backend, JSONStorageBackend
+from app.models import User, UserRole
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request, tmp_path):
+    """Run every test against a fresh backend of each kind in a temporary directory."""
+    backend = create_backend(request.param, tmp_path)
+    storage.use_backend(backend)
+    yield backend
+    backend.close()
+    storage.use_backend(None)
+
+
+def backend_name(backend):
+    return "json" if isinstance(backend, JSONStorageBackend) else "sqlite"
+
+
+def make_user(email="jane@test.com", team="Engineering", **kwargs):
+    """An unsaved employee; pass it to ``storage.create_user`` to store it."""
+    # Created before the fixed dates the tests use, so defaults apply on them
+    return User(
+        name=kwargs.pop("name", "Jane"),
+        email=email,
+        password_hash=kwargs.pop("password_hash", "not-a-real-hash"),
+        role=kwargs.pop("role", UserRole.EMPLOYEE),
+        team=team,
+        created_at=kwargs.pop("created_at", datetime(2026, 1, 1)),
+        **kwargs,
+    )
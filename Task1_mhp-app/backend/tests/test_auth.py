@@ -6,9 +6,12 @@ Run with:
     python -m pytest tests/test_auth.py -v
 """
 
+import asyncio
 import sys
 import os
 
+import pytest
+
 # Ensure the backend package is importable when running from the repo root
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
@@ -21,6 +24,11 @@ from app.auth import (
     is_token_expired,
     get_token_expiry,
 )
+from app.password_hashing import PasswordHasher, HashingBusy, HASH_MANY_CHUNK
+from app import auth, storage
+from app.backends import create_backend
+from app.models import User, UserRole
+from tests.conftest import backend_name, make_user
 
 
 # ===========================
@@ -44,6 +52,69 @@ def test_verify_password_incorrect():
     assert not verify_password("wrong_password", hashed)
 
 
+def test_hashing_pool_hashes_and_verifies_in_worker_processes():
+    hasher = PasswordHasher(workers=1, queue_limit=1)
+
+    async def main():
+        hashed = await hasher.hash("test_password_123")
+        return hashed, await hasher.verify("test_password_123", hashed), await hasher.verify("wrong", hashed)
+
+    try:
+        hashed, correct, wrong = asyncio.run(main())
+    finally:
+        hasher.shutdown()
+    assert verify_password("test_password_123", hashed)
+    assert correct and not wrong
+    stats = hasher.stats()
+    assert stats["completed"] == 3
+    assert stats["queue_depth"] == 0
+    assert stats["latency_ms"]["max"] > 0
+
+
+def test_hashing_pool_rejects_work_when_queue_is_full():
+    hasher = PasswordHasher(workers=1, queue_limit=1)
+
+    async def main():
+        return await asyncio.gather(
+            *(hasher.hash("test_password_123") for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        hasher.shutdown()
+    assert [isinstance(r, HashingBusy) for r in results] == [False, False, True]
+    assert hasher.stats()["rejected"] == 1
+
+
+def test_a_hash_batch_lets_single_hashes_run_between_its_chunks():
+    hasher = PasswordHasher(workers=1, queue_limit=1)
+    passwords = [f"password_{n}" for n in range(2 * HASH_MANY_CHUNK)]
+    finished = []
+
+    async def batch():
+        hashed = await hasher.hash_many(passwords)
+        finished.append("batch")
+        return hashed
+
+    async def single():
+        await asyncio.sleep(0)  # after the batch's first chunk is submitted
+        await hasher.hash("test_password_123")
+        finished.append("single")
+
+    async def main():
+        return (await asyncio.gather(batch(), single()))[0]
+
+    try:
+        hashed = asyncio.run(main())
+    finally:
+        hasher.shutdown()
+    assert finished == ["single", "batch"]
+    assert len(hashed) == len(passwords) and verify_password(passwords[-1], hashed[-1])
+    assert hasher.stats()["completed"] == len(passwords) + 1
+
+
 # ===========================
 # JWT Token Tests
 # ===========================
@@ -69,6 +140,90 @@ def test_verify_token_invalid():
     assert payload is None
 
 
+# ===========================
+# Token and User Cache Tests
+# ===========================
+
+def test_verified_tokens_are_cached(monkeypatch):
+    token = create_access_token({"sub": "test@test.com", "user_id": "cached-1"})
+    decodes = []
+    decode = auth.verify_token
+    monkeypatch.setattr(auth, "verify_token", lambda t: decodes.append(t) or decode(t))
+
+    assert auth.verify_token_cached(token)["user_id"] == "cached-1"
+    assert auth.verify_token_cached(token)["user_id"] == "cached-1"
+    assert len(decodes) == 1
+    assert auth.verify_token_cached("bad.token.value") is None
+
+
+def test_current_user_cache_is_dropped_when_the_user_changes(tmp_path):
+    from fastapi import HTTPException
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    storage.use_backend(create_backend("json", tmp_path))
+    try:
+        user = storage.create_user(User(
+            name="Jane", email="jane@test.com", password_hash="x",
+            role=UserRole.EMPLOYEE, team="Engineering",
+        ))
+        token = auth.create_token_response(user)["access_token"]
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        assert asyncio.run(auth.get_current_user(credentials)).team == "Engineering"
+
+        user.team = "Operations"
+        storage.update_user(user)
+        assert asyncio.run(auth.get_current_user(credentials)).team == "Operations"
+
+        user.is_active = False
+        storage.update_user(user)
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(auth.get_current_user(credentials))
+        assert exc.value.status_code == 403
+    finally:
+        storage.use_backend(None)
+
+
+def test_current_user_cache_sees_a_user_deactivated_by_another_worker(backend, tmp_path):
+    from fastapi import HTTPException
+
+    user = storage.create_user(make_user())
+    token = auth.create_token_response(user)["access_token"]
+    assert asyncio.run(auth.authenticate_token(token)).is_active
+
+    # Another process writes straight to the shared data; no listener fires here
+    other_worker = create_backend(backend_name(backend), tmp_path)
+    try:
+        user.is_active = False
+        other_worker.update_user(user)
+    finally:
+        other_worker.close()
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(auth.authenticate_token(token))
+    assert exc.value.status_code == 403
+
+
+def test_refresh_tokens_rotate_and_reuse_revokes_the_family(tmp_path):
+    storage.use_backend(create_backend("json", tmp_path))
+    try:
+        user = storage.create_user(User(
+            name="Jane", email="jane@test.com", password_hash="x",
+            role=UserRole.EMPLOYEE, team="Engineering",
+        ))
+        first = asyncio.run(auth.issue_refresh_token(user))
+
+        refreshed_user, second = asyncio.run(auth.refresh_session(first))
+        assert refreshed_user.id == user.id
+        assert second != first
+
+        # Replaying the rotated token kills the family, including its successor
+        assert asyncio.run(auth.refresh_session(first)) is None
+        assert asyncio.run(auth.refresh_session(second)) is None
+    finally:
+        storage.use_backend(None)
+
+
 # ===========================
 # Password Strength Validation Tests
 # ===========================
@@ -0,0 +1,106 @@
+"""
+Tests for the live headcount stream broker (app.headcount_stream).
+
+Run with:
+    cd backend
+    python -m pytest tests/test_headcount_stream.py -v
+"""
+
+import asyncio
+import sys
+import os
+
+# Ensure the backend package is importable when running from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import date
+
+from app import storage, async_storage
+from app.backends import create_backend
+from app.headcount_stream import HeadcountBroker
+from app.models import MealType, MealParticipation, participation_id
+from tests.conftest import backend_name, make_user
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    """A fast broker that is the only storage headcount listener."""
+    broker = HeadcountBroker(coalesce_seconds=0.05, poll_seconds=0.1)
+    monkeypatch.setattr(storage, "_headcount_listeners", [broker.notify])
+    return broker
+
+
+# ===========================
+# Push and Coalescing Tests
+# ===========================
+
+def test_a_burst_of_changes_is_one_update_on_that_teams_channels(backend, broker):
+    engineer = storage.create_user(make_user("eng@test.com", "Engineering"))
+    storage.create_user(make_user("ops@test.com", "Operations"))
+    today = date.today()
+
+    async def main():
+        company = await broker.subscribe(None, today)
+        engineering = await broker.subscribe("engineering", today)
+        operations = await broker.subscribe("Operations", today)
+        primed = [await sub.next(1) for sub in (company, engineering, operations)]
+
+        for i in range(10):
+            await asyncio.to_thread(
+                storage.update_participation, engineer.id, today, MealType.LUNCH, i % 2 == 0, engineer.id
+            )
+        updates = [await sub.next(1) for sub in (company, engineering, operations)]
+        extra = await company.next(0.3)
+        for sub in (company, engineering, operations):
+            broker.unsubscribe(sub)
+        return primed, updates, extra
+
+    primed, (company, engineering, operations), extra = asyncio.run(main())
+    assert [counts["headcount"]["lunch"] for counts in primed] == [2, 1, 1]
+    assert not any("changes" in counts for counts in primed)
+    assert company["headcount"]["lunch"] == 1
+    assert company["changes"] == {"lunch": -1}
+    assert engineering["headcount"]["lunch"] == 0
+    assert engineering["changes"] == {"lunch": -1}
+    assert engineering["total_employees"] == 1
+    # Operations was not touched, and the burst produced no second update
+    assert operations is None
+    assert extra is None
+    assert broker.stats() == {"clients": 0, "channels": 0}
+
+
+def test_changes_from_another_process_are_picked_up(backend, broker, tmp_path):
+    user = storage.create_user(make_user("eng@test.com", "Engineering"))
+    today = date.today()
+
+    async def main():
+        subscription = await broker.subscribe(None, today)
+        await subscription.next(1)
+
+        # Written behind this process's back: no listener fires
+        other = create_backend(backend_name(backend), tmp_path)
+        other.save_participation([MealParticipation(
+            id=participation_id(user.id, today, MealType.LUNCH),
+            user_id=user.id, meal_type=MealType.LUNCH, date=today, is_participating=False,
+        )])
+        other.close()
+
+        counts = await subscription.next(2)
+        broker.unsubscribe(subscription)
+        return counts
+
+    assert asyncio.run(main())["headcount"]["lunch"] == 0
+
+
+def test_a_subscription_that_fails_while_priming_is_not_kept(backend, broker, monkeypatch):
+    async def failing():
+        raise RuntimeError("storage down")
+    monkeypatch.setattr(async_storage, "get_enabled_meal_types", failing)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await broker.subscribe("Engineering", date.today())
+
+    asyncio.run(main())
+    assert broker.stats() == {"clients": 0, "channels": 0}
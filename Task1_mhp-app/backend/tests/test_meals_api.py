@@ -0,0 +1,99 @@
+"""
+Tests for the meals HTTP endpoints (app.routers.meals), through a TestClient.
+
+Run with:
+    cd backend
+    python -m pytest tests/test_meals_api.py -v
+"""
+
+import sys
+import os
+
+# Ensure the backend package is importable when running from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import date
+from fastapi.testclient import TestClient
+
+from app import auth, storage
+from app.main import app
+from app.models import UserRole, MealType
+from tests.conftest import make_user
+
+
+@pytest.fixture
+def client(backend):
+    """A client for the app on the test backend, without the startup seeding."""
+    auth._forget_user(None)
+    yield TestClient(app)
+    auth._forget_user(None)
+
+
+def headers_for(user):
+    token = auth.create_access_token({"sub": user.email, "user_id": user.id})
+    return {"Authorization": f"Bearer {token}"}
+
+
+# ===========================
+# Headcount Range Tests
+# ===========================
+
+RANGE_URL = "/api/meals/headcount/range?start=2026-03-01&end=2026-03-02"
+
+
+def test_headcount_range_limits_team_leads_to_their_own_team(client):
+    lead = storage.create_user(make_user("lead@test.com", role=UserRole.TEAM_LEAD))
+    admin = storage.create_user(make_user("admin@test.com", team=None, role=UserRole.ADMIN))
+    storage.create_user(make_user("eng@test.com"))
+    storage.create_user(make_user("ops@test.com", team="Operations"))
+
+    own = client.get(RANGE_URL, headers=headers_for(lead))
+    assert own.status_code == 200
+    assert own.json()["team"] == "Engineering"
+    assert [day["headcount"]["lunch"] for day in own.json()["days"]] == [2, 2]
+    assert client.get(RANGE_URL + "&team=engineering", headers=headers_for(lead)).status_code == 200
+    assert client.get(RANGE_URL + "&team=Operations", headers=headers_for(lead)).status_code == 403
+    assert client.get(RANGE_URL + "&group_by_team=true", headers=headers_for(lead)).status_code == 403
+
+    company = client.get(RANGE_URL + "&group_by_team=true", headers=headers_for(admin))
+    assert company.status_code == 200
+    assert company.json()["days"][0]["headcount"]["lunch"] == 4
+    assert set(company.json()["days"][0]["teams"]) == {"Engineering", "Operations"}
+
+
+# ===========================
+# Conditional GET Tests
+# ===========================
+
+def test_unchanged_headcount_is_answered_with_304(client):
+    lead = storage.create_user(make_user("lead@test.com", role=UserRole.TEAM_LEAD))
+    other_lead = storage.create_user(make_user("lead2@test.com", role=UserRole.TEAM_LEAD))
+    employee = storage.create_user(make_user("eng@test.com"))
+    url = "/api/meals/headcount/team/2026-03-01"
+
+    first = client.get(url, headers=headers_for(lead))
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag
+
+    repeat = client.get(url, headers={**headers_for(lead), "If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+    assert repeat.headers["ETag"] == etag
+
+    # Same data, another user: that user's tag differs, so no 304
+    other = client.get(url, headers={**headers_for(other_lead), "If-None-Match": etag})
+    assert other.status_code == 200
+    assert other.headers["ETag"] != etag
+
+    storage.update_participation(employee.id, date(2026, 3, 1), MealType.LUNCH, False, employee.id)
+    changed = client.get(url, headers={**headers_for(lead), "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["headcount"]["lunch"] == 2
+
+    # Authorization is checked before the ETag
+    forbidden = client.get(
+        "/api/meals/headcount/2026-03-01", headers={**headers_for(employee), "If-None-Match": "*"}
+    )
+    assert forbidden.status_code == 403
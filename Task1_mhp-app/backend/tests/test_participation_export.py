@@ -0,0 +1,120 @@
+"""
+Tests for the participation history export (app.participation_export).
+
+Run with:
+    cd backend
+    python -m pytest tests/test_participation_export.py -v
+"""
+
+import csv
+import io
+import json
+import sys
+import os
+
+# Ensure the backend package is importable when running from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import date, datetime
+
+from app import storage
+from app.backends import JSONStorageBackend
+from app.models import MealType
+from app.participation_export import iter_rows, export_chunks, EXPORT_FIELDS
+from tests.conftest import make_user
+
+
+# ===========================
+# Row Tests
+# ===========================
+
+def test_rows_add_up_to_the_headcounts(backend):
+    jane = storage.create_user(make_user("jane@test.com"))
+    storage.create_user(make_user("ops@test.com", team="Operations"))
+    storage.create_user(make_user("away@test.com", is_active=False))
+    storage.update_participation(jane.id, date(2026, 3, 2), MealType.LUNCH, False, jane.id)
+    storage.update_participation(jane.id, date(2026, 3, 2), MealType.IFTAR, True, "admin")
+
+    rows = list(iter_rows(date(2026, 3, 1), date(2026, 3, 3)))
+    assert len(rows) == 3 * 3 * len(MealType)
+    for day in (date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 3)):
+        counts = dict.fromkeys((mt.value for mt in MealType), 0)
+        for row in rows:
+            if row["date"] == day.isoformat() and row["is_participating"]:
+                counts[row["meal_type"]] += 1
+        assert counts == storage.get_headcount_by_date(day)
+
+    stored = [row for row in rows if row["updated_by"] is not None]
+    assert {(row["meal_type"], row["is_participating"]) for row in stored} == {("lunch", False), ("iftar", True)}
+
+
+def test_rows_follow_when_users_were_created_and_deactivated(backend):
+    storage.create_user(make_user("jane@test.com"))
+    storage.create_user(make_user("new@test.com", created_at=datetime(2026, 3, 2, 9, 0)))
+    storage.create_user(make_user(
+        "gone@test.com", is_active=False, deactivated_at=datetime(2026, 3, 3, 17, 0),
+    ))
+
+    rows = list(iter_rows(date(2026, 3, 1), date(2026, 3, 3), meal_types=[MealType.LUNCH]))
+    eating = {(row["date"], row["email"]) for row in rows if row["is_participating"]}
+    assert eating == {
+        ("2026-03-01", "jane@test.com"), ("2026-03-01", "gone@test.com"),
+        ("2026-03-02", "jane@test.com"), ("2026-03-02", "new@test.com"), ("2026-03-02", "gone@test.com"),
+        ("2026-03-03", "jane@test.com"), ("2026-03-03", "new@test.com"),
+    }
+    # The rows still add up to the headcounts of every day
+    for day in ("2026-03-01", "2026-03-02", "2026-03-03"):
+        count = sum(1 for d, _ in eating if d == day)
+        assert count == storage.get_headcount_by_date(date.fromisoformat(day))["lunch"]
+
+
+def test_rows_filter_by_team_and_meal_type(backend):
+    storage.create_user(make_user("jane@test.com"))
+    storage.create_user(make_user("ops@test.com", team="Operations"))
+
+    rows = list(iter_rows(date(2026, 3, 1), date(2026, 3, 2), team="operations", meal_types=[MealType.SNACKS]))
+    assert [(row["date"], row["email"], row["meal_type"]) for row in rows] == [
+        ("2026-03-01", "ops@test.com", "snacks"),
+        ("2026-03-02", "ops@test.com", "snacks"),
+    ]
+    with pytest.raises(ValueError):
+        iter_rows(date(2026, 3, 2), date(2026, 3, 1))
+
+
+def test_export_does_not_cache_the_days_it_reads(tmp_path):
+    backend = JSONStorageBackend(tmp_path)
+    storage.use_backend(backend)
+    try:
+        jane = storage.create_user(make_user("jane@test.com"))
+        storage.update_participation(jane.id, date(2026, 3, 2), MealType.LUNCH, False, jane.id)
+        backend.invalidate()
+
+        rows = list(iter_rows(date(2026, 1, 1), date(2026, 12, 31)))
+        assert len(rows) == 365 * len(MealType)
+        assert [row["is_participating"] for row in rows if row["updated_by"]] == [False]
+        assert backend._participation._by_date == {}
+    finally:
+        storage.use_backend(None)
+
+
+# ===========================
+# Output Format Tests
+# ===========================
+
+def test_csv_and_ndjson_output_carry_the_same_rows(backend):
+    storage.create_user(make_user("jane@test.com"))
+    rows = list(iter_rows(date(2026, 3, 1), date(2026, 3, 2)))
+
+    text = "".join(export_chunks(iter(rows), "csv"))
+    parsed = list(csv.DictReader(io.StringIO(text)))
+    assert text.splitlines()[0] == ",".join(EXPORT_FIELDS)
+    assert [(r["date"], r["meal_type"], r["is_participating"]) for r in parsed] == [
+        (r["date"], r["meal_type"], str(r["is_participating"])) for r in rows
+    ]
+
+    lines = "".join(export_chunks(iter(rows), "ndjson")).splitlines()
+    assert [json.loads(line) for line in lines] == rows
+
+    with pytest.raises(ValueError):
+        export_chunks(iter(rows), "xml")
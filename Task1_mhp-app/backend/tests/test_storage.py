@@ -0,0 +1,769 @@
+"""
+Tests for the JSON storage layer (app.storage).
+
+Run with:
+    cd backend
+    python -m pytest tests/test_storage.py -v
+"""
+
+import json
+import sqlite3
+import sys
+import os
+
+# Ensure the backend package is importable when running from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import date, datetime
+
+from app import storage
+from app.backends import create_backend, JSONStorageBackend, StorageError
+from app.models import UserRole, MealType, MealParticipation, RefreshToken, set_active
+from tests.conftest import backend_name, make_user
+
+
+@pytest.fixture
+def journal_backend(tmp_path):
+    """JSON backend in journal mode (journal tests do not apply to SQLite)."""
+    backend = JSONStorageBackend(tmp_path, journal=True)
+    storage.use_backend(backend)
+    yield backend
+    storage.use_backend(None)
+
+
+# ===========================
+# User Repository Tests
+# ===========================
+
+def test_user_lookups_by_id_email_and_team(backend):
+    user = storage.create_user(make_user())
+
+    assert storage.get_user_by_id(user.id).email == "jane@test.com"
+    assert storage.get_user_by_email("JANE@test.com").id == user.id
+    assert [u.id for u in storage.get_users_by_team(" engineering")] == [user.id]
+    assert storage.get_users_by_team(None) == []
+
+
+def test_create_user_rejects_duplicate_email(backend):
+    storage.create_user(make_user())
+    with pytest.raises(ValueError):
+        storage.create_user(make_user(email="Jane@Test.com"))
+
+
+def test_update_user_rejects_an_email_taken_by_another_user(backend):
+    jane = storage.create_user(make_user())
+    bob = storage.create_user(make_user(email="bob@test.com"))
+    bob.email = "JANE@test.com"
+    with pytest.raises(ValueError):
+        storage.update_user(bob)
+    assert storage.get_user_by_email("jane@test.com").id == jane.id
+    assert storage.get_user_by_id(bob.id).email == "bob@test.com"
+
+
+def test_create_users_writes_once_and_is_all_or_nothing(backend):
+    storage.create_user(make_user())
+
+    with pytest.raises(ValueError):
+        storage.create_users([make_user(email="a@test.com"), make_user(email="JANE@test.com")])
+    with pytest.raises(ValueError):
+        storage.create_users([make_user(email="b@test.com"), make_user(email="B@test.com")])
+    assert [u.email for u in storage.get_all_users()] == ["jane@test.com"]
+
+    storage.create_users([make_user(email="a@test.com"), make_user(email="b@test.com", team="Ops")])
+    assert [u.email for u in storage.get_all_users()] == ["jane@test.com", "a@test.com", "b@test.com"]
+    assert storage.get_users_by_team("ops")[0].email == "b@test.com"
+
+
+def test_update_user_moves_team_index(backend):
+    user = storage.create_user(make_user())
+    user.team = "Operations"
+    storage.update_user(user)
+
+    assert storage.get_users_by_team("Engineering") == []
+    assert [u.id for u in storage.get_users_by_team("operations")] == [user.id]
+
+
+def test_returned_users_are_copies(backend):
+    user = storage.create_user(make_user())
+    fetched = storage.get_user_by_id(user.id)
+    fetched.team = "Elsewhere"
+
+    assert storage.get_user_by_id(user.id).team == "Engineering"
+
+
+def test_users_survive_reload_from_disk(backend, tmp_path):
+    user = storage.create_user(make_user())
+    storage.use_backend(create_backend(backend_name(backend), tmp_path))
+
+    # Loaded through the trusted path, yet identical to the validated original
+    assert storage.get_user_by_email("jane@test.com") == user
+
+
+# ===========================
+# Participation Index Tests
+# ===========================
+
+def test_update_participation_replaces_single_record(backend):
+    day = date(2026, 3, 1)
+    first = storage.update_participation("u1", day, MealType.LUNCH, True, "u1")
+    second = storage.update_participation("u1", day, MealType.LUNCH, False, "admin")
+
+    assert second.id == first.id
+    records = storage.get_participation_by_date(day)
+    assert len(records) == 1
+    assert records[0].is_participating is False
+    assert records[0].updated_by == "admin"
+
+
+def test_participation_is_partitioned_by_date_and_user(backend):
+    storage.update_participation("u1", date(2026, 3, 1), MealType.LUNCH, True, "u1")
+    storage.update_participation("u2", date(2026, 3, 1), MealType.SNACKS, True, "u2")
+    storage.update_participation("u1", date(2026, 3, 2), MealType.LUNCH, False, "u1")
+
+    assert len(storage.get_participation_by_date(date(2026, 3, 1))) == 2
+    assert [r.meal_type for r in backend.get_user_participation("u1", date(2026, 3, 2))] == [MealType.LUNCH]
+    assert storage.get_headcount_by_date(date(2026, 3, 1))["snacks"] == 1
+
+
+def test_participation_survives_reload_from_disk(backend, tmp_path):
+    day = date(2026, 3, 1)
+    storage.update_participation("u1", day, MealType.LUNCH, False, "u1")
+    storage.use_backend(create_backend(backend_name(backend), tmp_path))
+
+    records = storage.get_backend().get_user_participation("u1", day)
+    assert len(records) == 1
+    assert records[0].is_participating is False
+
+
+def test_headcount_follows_toggles_and_team_changes(backend):
+    day = date(2026, 3, 1)
+    user = storage.create_user(make_user(team="Engineering"))
+    storage.update_participation(user.id, day, MealType.LUNCH, True, user.id)
+    assert storage.get_headcount_by_date_and_team(day, "Engineering")["lunch"] == 1
+
+    storage.update_participation(user.id, day, MealType.LUNCH, False, user.id)
+    storage.update_participation(user.id, day, MealType.SNACKS, True, user.id)
+    assert storage.get_headcount_by_date(day) == {
+        "lunch": 0, "snacks": 1, "iftar": 0, "event_dinner": 0, "optional_dinner": 1
+    }
+
+    user.team = "Operations"
+    storage.update_user(user)
+    assert storage.get_headcount_by_date_and_team(day, "Engineering")["snacks"] == 0
+    assert storage.get_headcount_by_date_and_team(day, "Operations")["snacks"] == 1
+
+
+def test_defaults_are_resolved_without_writing(backend):
+    day = date(2026, 3, 1)
+    user = storage.create_user(make_user())
+
+    records = storage.get_user_participation(user.id, day)
+    assert [r.meal_type for r in records] == list(MealType)
+    assert {r.meal_type for r in records if r.is_participating} == {
+        MealType.LUNCH, MealType.SNACKS, MealType.OPTIONAL_DINNER
+    }
+    assert storage.get_participation_by_date(day) == []
+
+    changed = storage.update_participation(user.id, day, MealType.LUNCH, False, user.id)
+    assert changed.id == records[0].id
+    assert len(storage.get_participation_by_date(day)) == 1
+    assert [r.is_participating for r in storage.get_user_participation(user.id, day)][:2] == [False, True]
+
+
+def test_headcount_counts_defaults_of_active_users_only(backend):
+    day = date(2026, 3, 1)
+    eng = storage.create_user(make_user(email="eng@test.com", team="Engineering"))
+    storage.create_user(make_user(email="ops@test.com", team="Operations"))
+    storage.update_participation(eng.id, day, MealType.LUNCH, False, eng.id)
+    storage.update_participation(eng.id, day, MealType.IFTAR, True, eng.id)
+
+    assert storage.get_headcount_by_date(day) == {
+        "lunch": 1, "snacks": 2, "iftar": 1, "event_dinner": 0, "optional_dinner": 2
+    }
+    assert storage.get_headcount_by_date_and_team(day, "Engineering")["lunch"] == 0
+    assert storage.get_headcount_by_date_and_team(day, "Operations")["lunch"] == 1
+
+    eng.is_active = False
+    storage.update_user(eng)
+    # Stored opt-ins still count; the inactive user's defaults no longer do
+    assert storage.get_headcount_by_date(day) == {
+        "lunch": 1, "snacks": 1, "iftar": 1, "event_dinner": 0, "optional_dinner": 1
+    }
+    assert storage.get_headcount_by_date_and_team(day, "Engineering")["snacks"] == 0
+
+
+def test_defaults_start_on_the_day_a_user_was_created(backend):
+    storage.create_user(make_user(email="old@test.com"))
+    new = storage.create_user(make_user(email="new@test.com", created_at=datetime(2026, 3, 2, 15, 30)))
+    before, day = date(2026, 3, 1), date(2026, 3, 2)
+
+    assert storage.get_headcount_by_date(before)["lunch"] == 1
+    assert storage.get_headcount_by_date(day)["lunch"] == 2
+    team_range = storage.get_headcount_range(before, day, team="Engineering")
+    assert [counts["lunch"] for counts in team_range.values()] == [1, 2]
+    assert storage.get_team_headcount_range(before, day)[before]["Engineering"]["lunch"] == 1
+    assert new.id not in storage.get_participants(before, MealType.LUNCH)
+    assert not any(r.is_participating for r in storage.get_user_participation(new.id, before))
+    assert not any(r.is_participating for r in storage.get_roster_participation(before, [new])[new.id])
+    assert storage.get_user_participation(new.id, day)[0].is_participating
+
+    # A stored change before that day still counts
+    storage.update_participation(new.id, before, MealType.LUNCH, True, "admin")
+    assert storage.get_headcount_by_date(before)["lunch"] == 2
+
+
+def test_deactivation_only_removes_defaults_from_that_day_on(backend, tmp_path):
+    jane = storage.create_user(make_user())
+    storage.create_user(make_user(email="bob@test.com"))
+    past, today = date(2026, 3, 1), date.today()
+    storage.update_participation(jane.id, past, MealType.SNACKS, False, jane.id)
+    expected = storage.get_headcount_range(past, today)
+
+    set_active(jane, False)
+    storage.update_user(jane)
+    assert jane.deactivated_at.date() == today
+
+    after = storage.get_headcount_range(past, today)
+    assert after[past] == expected[past] == {
+        "lunch": 2, "snacks": 1, "iftar": 0, "event_dinner": 0, "optional_dinner": 2
+    }
+    assert after[today]["lunch"] == expected[today]["lunch"] - 1
+    assert storage.get_headcount_by_date_and_team(past, "Engineering")["lunch"] == 2
+    assert storage.get_team_headcount_range(past, past)[past]["Engineering"] == after[past]
+    assert jane.id in storage.get_participants(past, MealType.LUNCH)
+    assert jane.id not in storage.get_participants(today, MealType.LUNCH)
+    assert storage.get_user_participation(jane.id, past)[0].is_participating
+
+    # The deactivation date is stored, and reactivating clears it
+    reloaded = create_backend(backend_name(backend), tmp_path)
+    assert reloaded.get_headcount(past)["lunch"] == 2
+    assert reloaded.get_user_by_id(jane.id).deactivated_at == jane.deactivated_at
+    reloaded.close()
+    set_active(jane, True)
+    storage.update_user(jane)
+    assert storage.get_user_by_id(jane.id).deactivated_at is None
+    assert storage.get_headcount_range(past, today) == expected
+
+
+def test_sqlite_database_without_deactivation_dates_is_upgraded(tmp_path):
+    backend = create_backend("sqlite", tmp_path)
+    user = backend.create_user(make_user())
+    backend.close()
+    conn = sqlite3.connect(backend.database_path)
+    conn.execute("ALTER TABLE users DROP COLUMN deactivated_at")
+    conn.commit()
+    conn.close()
+
+    backend = create_backend("sqlite", tmp_path)
+    assert backend.get_user_by_id(user.id).deactivated_at is None
+    set_active(user, False)
+    backend.update_user(user)
+    assert backend.get_user_by_id(user.id).deactivated_at == user.deactivated_at
+    backend.close()
+
+
+def test_team_headcount_of_no_team_is_empty_not_the_company(backend):
+    storage.create_user(make_user())
+    day = date(2026, 3, 1)
+    assert storage.get_headcount_by_date(day)["lunch"] == 1
+    for team in (None, ""):
+        assert set(storage.get_headcount_by_date_and_team(day, team).values()) == {0}
+
+
+def test_participants_combine_stored_records_and_defaults(backend):
+    day = date(2026, 3, 1)
+    eng = storage.create_user(make_user(email="eng@test.com", team="Engineering"))
+    ops = storage.create_user(make_user(email="ops@test.com", team="Operations"))
+    away = storage.create_user(make_user(email="away@test.com", team="Engineering", is_active=False))
+    storage.update_participation(eng.id, day, MealType.LUNCH, False, eng.id)
+    storage.update_participation(away.id, day, MealType.IFTAR, True, "admin")
+
+    assert storage.get_participants(day, MealType.LUNCH) == [ops.id]
+    assert sorted(storage.get_participants(day, MealType.SNACKS)) == sorted([eng.id, ops.id])
+    assert storage.get_participants(day, MealType.IFTAR, team="engineering") == [away.id]
+    assert storage.get_participants(day, MealType.SNACKS, team="Operations") == [ops.id]
+    assert storage.get_participants(day, MealType.EVENT_DINNER) == []
+
+
+def test_roster_participation_matches_per_user_lookups_in_one_read(backend, monkeypatch):
+    day = date(2026, 3, 1)
+    jane = storage.create_user(make_user())
+    bob = storage.create_user(make_user(email="bob@test.com"))
+    storage.update_participation(jane.id, day, MealType.LUNCH, False, jane.id)
+    storage.update_participation(bob.id, date(2026, 3, 2), MealType.SNACKS, False, bob.id)
+
+    expected = {
+        user.id: [(r.meal_type, r.is_participating) for r in storage.get_user_participation(user.id, day)]
+        for user in (jane, bob)
+    }
+    reads = []
+    by_date = backend.get_participation_by_date
+    monkeypatch.setattr(backend, "get_participation_by_date", lambda d: reads.append(d) or by_date(d))
+    monkeypatch.setattr(backend, "get_user_participation", None)
+
+    roster = storage.get_roster_participation(day, [jane, bob])
+    assert {uid: [(r.meal_type, r.is_participating) for r in records] for uid, records in roster.items()} == expected
+    assert reads == [day]
+
+
+def test_headcount_range_covers_every_day(backend):
+    user = storage.create_user(make_user())
+    storage.update_participation(user.id, date(2026, 3, 2), MealType.LUNCH, False, user.id)
+
+    counts = storage.get_headcount_range(date(2026, 3, 1), date(2026, 3, 3), team="Engineering")
+    assert [(d.day, c["lunch"]) for d, c in counts.items()] == [(1, 1), (2, 0), (3, 1)]
+    assert storage.get_headcount_range(date(2026, 3, 3), date(2026, 3, 1)) == {}
+
+
+def test_team_headcount_range_matches_per_team_headcounts(backend):
+    jane = storage.create_user(make_user())
+    storage.create_user(make_user(email="bob@test.com", team=" engineering "))
+    ops = storage.create_user(make_user(email="oz@test.com", team="Ops"))
+    storage.create_user(make_user(email="nobody@test.com", team=None))
+    storage.update_participation(jane.id, date(2026, 3, 2), MealType.LUNCH, False, jane.id)
+    storage.update_participation(ops.id, date(2026, 3, 2), MealType.IFTAR, True, ops.id)
+
+    by_team = storage.get_team_headcount_range(date(2026, 3, 1), date(2026, 3, 2))
+
+    assert list(by_team) == [date(2026, 3, 1), date(2026, 3, 2)]
+    for day, teams in by_team.items():
+        assert set(teams) == {"Engineering", "Ops"}
+        for name, counts in teams.items():
+            assert counts == storage.get_headcount_by_date_and_team(day, name)
+    assert by_team[date(2026, 3, 2)]["Engineering"]["lunch"] == 1
+    assert by_team[date(2026, 3, 2)]["Ops"]["iftar"] == 1
+
+
+def test_initialize_daily_participation_writes_missing_records_once(backend, monkeypatch):
+    day = date(2026, 3, 1)
+    users = [storage.create_user(make_user(email=f"u{n}@test.com")) for n in range(10)]
+    users[0].is_active = False
+    storage.update_user(users[0])
+    storage.update_participation(users[1].id, day, MealType.LUNCH, False, users[1].id)
+
+    calls = []
+    save = backend.save_participation
+    monkeypatch.setattr(backend, "save_participation", lambda records: calls.append(len(records)) or save(records))
+    report = storage.initialize_daily_participation(day)
+
+    assert calls == [9 * len(MealType) - 1]
+    assert report.created == 9 * len(MealType) - 1
+    assert report.date == day and report.elapsed_ms >= 0
+    assert backend.get_participation(users[1].id, day, MealType.LUNCH).is_participating is False
+    assert storage.initialize_daily_participation(day).created == 0
+
+
+def test_batch_commits_all_changes_in_one_write(backend, monkeypatch):
+    day = date(2026, 3, 1)
+    calls = []
+    save = backend.save_participation
+    monkeypatch.setattr(backend, "save_participation", lambda records: calls.append(len(records)) or save(records))
+
+    with storage.ParticipationBatch() as batch:
+        for n in range(20):
+            batch.update(f"u{n}", day, MealType.LUNCH, True, "admin")
+        batch.update("u0", day, MealType.LUNCH, False, "admin")
+        assert storage.get_participation_by_date(day) == []
+
+    assert calls == [20]
+    assert storage.get_headcount_by_date(day)["lunch"] == 19
+
+
+def test_batch_discards_everything_when_the_block_raises(backend):
+    day = date(2026, 3, 1)
+    with pytest.raises(RuntimeError):
+        with storage.ParticipationBatch() as batch:
+            batch.update("u1", day, MealType.LUNCH, True, "admin")
+            raise RuntimeError("validation failed")
+
+    assert storage.get_participation_by_date(day) == []
+
+
+# ===========================
+# Participation Shard Tests
+# ===========================
+
+@pytest.fixture
+def json_backend(tmp_path):
+    backend = JSONStorageBackend(tmp_path)
+    storage.use_backend(backend)
+    yield backend
+    storage.use_backend(None)
+
+
+def test_writes_only_touch_the_shard_for_their_date(json_backend):
+    storage.update_participation("u1", date(2026, 3, 1), MealType.LUNCH, True, "u1")
+    old_shard = json_backend.participation_dir / "2026-03-01.json"
+    before = old_shard.read_text()
+    storage.update_participation("u1", date(2026, 3, 2), MealType.LUNCH, False, "u1")
+
+    assert sorted(p.name for p in json_backend.participation_dir.glob("*.json")) == [
+        "2026-03-01.json", "2026-03-02.json"
+    ]
+    assert old_shard.read_text() == before
+
+
+def test_legacy_participation_file_is_split_into_shards(tmp_path):
+    legacy = tmp_path / "meal_participation.json"
+    legacy.write_text(json.dumps({"participation": [
+        {"user_id": "u1", "meal_type": "lunch", "date": "2026-03-01", "is_participating": False},
+        {"user_id": "u1", "meal_type": "lunch", "date": "2026-03-02", "is_participating": True},
+    ]}))
+    backend = JSONStorageBackend(tmp_path)
+    storage.use_backend(backend)
+
+    assert storage.get_headcount_by_date(date(2026, 3, 2))["lunch"] == 1
+    assert not legacy.exists()
+    assert (backend.participation_dir / "2026-03-01.json").exists()
+    assert len(storage.get_all_participation()) == 2
+    storage.use_backend(None)
+
+
+def test_cold_headcounts_come_from_the_snapshot(tmp_path, monkeypatch):
+    writer = JSONStorageBackend(tmp_path)
+    users = [writer.create_user(make_user(email=f"u{n}@test.com")) for n in range(3)]
+    for n, user in enumerate(users):
+        writer.save_participation([MealParticipation(
+            user_id=user.id, meal_type=MealType.LUNCH, date=date(2026, 3, 1 + n), is_participating=False
+        )])
+    expected = {n: writer.get_headcount(date(2026, 3, 1 + n)) for n in range(4)}
+    writer.compact()
+    assert writer.participation_snapshot_file.exists()
+
+    reader = JSONStorageBackend(tmp_path)
+    monkeypatch.setattr(type(reader._participation), "_read_shard", lambda self, d: pytest.fail("shard parsed"))
+    assert {n: reader.get_headcount(date(2026, 3, 1 + n)) for n in range(4)} == expected
+    assert expected[0]["lunch"] == 2
+
+
+def test_snapshot_is_used_by_a_process_that_numbered_users_differently(tmp_path, monkeypatch):
+    writer = JSONStorageBackend(tmp_path)
+    users = [writer.create_user(make_user(email=f"u{n}@test.com")) for n in range(3)]
+    for n, user in enumerate(users):
+        writer.save_participation([MealParticipation(
+            user_id=user.id, meal_type=MealType.LUNCH, date=date(2026, 3, 1 + n), is_participating=False
+        )])
+    writer.save_participation([MealParticipation(
+        user_id=users[2].id, meal_type=MealType.IFTAR, date=date(2026, 3, 10), is_participating=True
+    )])
+
+    # A long-running worker that met the last user first, before any snapshot
+    reader = JSONStorageBackend(tmp_path)
+    assert reader.get_headcount(date(2026, 3, 10))["iftar"] == 1
+    assert reader._participation._columns.all_user_ids()[0] == users[2].id
+
+    expected = {n: writer.get_headcount(date(2026, 3, 1 + n)) for n in range(4)}
+    writer.compact()
+    monkeypatch.setattr(type(reader._participation), "_read_shard", lambda self, d: pytest.fail("shard parsed"))
+    assert {n: reader.get_headcount(date(2026, 3, 1 + n)) for n in range(4)} == expected
+    assert reader.get_participants(date(2026, 3, 3), MealType.LUNCH) == [users[0].id, users[1].id]
+
+
+def test_snapshot_is_ignored_for_days_changed_since(tmp_path):
+    writer = JSONStorageBackend(tmp_path)
+    user = writer.create_user(make_user())
+    day = date(2026, 3, 1)
+    writer.save_participation([MealParticipation(user_id=user.id, meal_type=MealType.LUNCH, date=day)])
+    writer.compact()
+    writer.save_participation([
+        MealParticipation(user_id=user.id, meal_type=MealType.LUNCH, date=day, is_participating=False)
+    ])
+
+    reader = JSONStorageBackend(tmp_path)
+    assert reader.get_headcount(day)["lunch"] == 0
+    reader.save_participation([MealParticipation(user_id=user.id, meal_type=MealType.SNACKS, date=day,
+                                                 is_participating=False)])
+    assert reader.get_headcount(day) == writer.get_headcount(day) | {"snacks": 0}
+
+
+# ===========================
+# Multi-process Safety Tests
+# ===========================
+
+def test_writes_merge_with_changes_from_another_process(tmp_path):
+    # Two backends on one directory stand in for two worker processes
+    worker_a = JSONStorageBackend(tmp_path)
+    worker_b = JSONStorageBackend(tmp_path)
+    day = date(2026, 3, 1)
+    worker_a.get_participation_by_date(day)
+    worker_a.get_all_users()
+
+    worker_b.create_user(make_user(email="b@test.com"))
+    worker_b.save_participation([MealParticipation(user_id="u2", meal_type=MealType.LUNCH, date=day)])
+    worker_a.create_user(make_user(email="a@test.com"))
+    worker_a.save_participation([MealParticipation(user_id="u1", meal_type=MealType.LUNCH, date=day)])
+
+    fresh = JSONStorageBackend(tmp_path)
+    assert {u.email for u in fresh.get_all_users()} == {"a@test.com", "b@test.com"}
+    assert {r.user_id for r in fresh.get_participation_by_date(day)} == {"u1", "u2"}
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_reads_see_writes_from_another_process(tmp_path, journal):
+    worker_a = JSONStorageBackend(tmp_path, journal=journal)
+    worker_b = JSONStorageBackend(tmp_path, journal=journal)
+    day = date(2026, 3, 1)
+    user = worker_a.create_user(make_user())
+    assert worker_a.get_headcount(day)["lunch"] == 1
+    assert worker_b.get_user_by_id(user.id).team == "Engineering"
+
+    worker_b.save_participation([
+        MealParticipation(user_id=user.id, meal_type=MealType.LUNCH, date=day, is_participating=False)
+    ])
+    user.team = "Operations"
+    worker_b.update_user(user)
+
+    assert worker_a.get_headcount(day)["lunch"] == 0
+    assert worker_a.get_user_by_id(user.id).team == "Operations"
+    assert worker_a.get_headcount(day, team="Operations")["snacks"] == 1
+
+
+def test_headcounts_see_a_deactivation_from_another_process(backend, tmp_path):
+    user = storage.create_user(make_user())
+    storage.create_user(make_user(email="bob@test.com"))
+    day = date.today()
+    assert storage.get_headcount_by_date(day)["lunch"] == 2
+    assert len(backend.get_participants(day, MealType.LUNCH)) == 2
+
+    # Only participation is read from here on, so nothing else reloads users
+    other = create_backend(backend_name(backend), tmp_path)
+    user.is_active = False
+    other.update_user(user)
+    other.close()
+
+    assert backend.get_headcount(day)["lunch"] == 1
+    assert backend.get_headcount(day, team="Engineering")["lunch"] == 1
+    assert backend.get_headcount_range(day, day)[day]["lunch"] == 1
+    assert backend.get_participants(day, MealType.LUNCH) == [storage.get_user_by_email("bob@test.com").id]
+
+
+def test_corrupted_file_is_an_error_not_an_empty_dataset(json_backend):
+    json_backend.users_file.write_text('{"users": [{"id": ')
+
+    with pytest.raises(StorageError):
+        storage.get_all_users()
+
+
+def test_no_temp_files_left_behind(json_backend):
+    storage.create_user(make_user())
+    storage.update_participation("u1", date(2026, 3, 1), MealType.LUNCH, True, "u1")
+
+    assert not list(json_backend.data_dir.rglob("*.tmp"))
+
+
+# ===========================
+# Participation Journal Tests
+# ===========================
+
+def test_journal_mode_appends_instead_of_rewriting(journal_backend):
+    day = date(2026, 3, 1)
+    storage.update_participation("u1", day, MealType.LUNCH, True, "u1")
+    storage.update_participation("u1", day, MealType.LUNCH, False, "u1")
+
+    assert not journal_backend.participation_dir.joinpath("2026-03-01.json").exists()
+    assert len(journal_backend.participation_journal_file.read_text().splitlines()) == 2
+
+    journal_backend.invalidate()
+    assert storage.get_participation_by_date(day)[0].is_participating is False
+
+
+def test_journal_ignores_torn_last_line(journal_backend):
+    day = date(2026, 3, 1)
+    storage.update_participation("u1", day, MealType.LUNCH, False, "u1")
+    with open(journal_backend.participation_journal_file, "a") as f:
+        f.write('{"user_id": "u2", "meal_ty')
+
+    journal_backend.invalidate()
+    assert len(storage.get_participation_by_date(day)) == 1
+
+
+def test_append_after_a_torn_last_line_survives_reload(journal_backend, monkeypatch):
+    day = date(2026, 3, 1)
+    storage.update_participation("u1", day, MealType.LUNCH, False, "u1")
+    with open(journal_backend.participation_journal_file, "a") as f:
+        f.write('{"id": "torn')
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or real_fsync(fd))
+
+    storage.update_participation("u2", day, MealType.SNACKS, False, "u2")
+    assert synced
+
+    journal_backend.invalidate()
+    assert {r.user_id for r in storage.get_participation_by_date(day)} == {"u1", "u2"}
+    assert journal_backend.participation_journal_file.read_text().endswith("\n")
+
+
+def test_compaction_folds_journal_into_snapshot(journal_backend):
+    day = date(2026, 3, 1)
+    storage.update_participation("u1", day, MealType.LUNCH, False, "u1")
+    storage.compact_participation()
+
+    assert not journal_backend.participation_journal_file.exists()
+    assert journal_backend.participation_dir.joinpath("2026-03-01.json").exists()
+
+    journal_backend.invalidate()
+    assert storage.get_participation_by_date(day)[0].is_participating is False
+
+
+def test_team_headcount_only_counts_team_members(backend):
+    day = date(2026, 3, 1)
+    eng = storage.create_user(make_user(email="eng@test.com", team="Engineering"))
+    ops = storage.create_user(make_user(email="ops@test.com", team="Operations"))
+    storage.update_participation(eng.id, day, MealType.LUNCH, True, eng.id)
+    storage.update_participation(ops.id, day, MealType.LUNCH, True, ops.id)
+
+    assert storage.get_headcount_by_date(day)["lunch"] == 2
+    assert storage.get_headcount_by_date_and_team(day, "engineering")["lunch"] == 1
+
+
+# ===========================
+# Meal Configuration Tests
+# ===========================
+
+def test_meal_config_is_cached_until_it_changes(backend, monkeypatch):
+    assert storage.get_enabled_meal_types() == ["lunch", "snacks", "optional_dinner"]
+
+    loads = []
+    load = backend.load_meal_config
+    monkeypatch.setattr(backend, "load_meal_config", lambda: loads.append(1) or load())
+    storage.get_enabled_meal_types()
+    storage.get_enabled_meals()
+    assert loads == []
+
+    storage.set_meal_enabled("iftar", True)
+    loads.clear()
+    assert "iftar" in storage.get_enabled_meal_types()
+    assert storage.get_enabled_meals()["iftar"] is True
+    assert loads == [1]
+
+
+def test_meal_config_change_from_another_process_is_seen(backend, tmp_path):
+    assert storage.get_enabled_meals()["event_dinner"] is False
+
+    other = create_backend(backend_name(backend), tmp_path)
+    other.set_meal_enabled("event_dinner", True)
+    other.close()
+
+    assert storage.get_enabled_meals()["event_dinner"] is True
+
+
+# ===========================
+# Change Version Tests
+# ===========================
+
+def test_data_version_changes_with_every_kind_of_write(backend):
+    user = storage.create_user(make_user())
+    seen = [storage.get_data_version()]
+    assert storage.get_data_version() == seen[-1]
+
+    writes = [
+        lambda: storage.create_users([make_user(email="bob@test.com")]),
+        lambda: storage.update_user(user),
+        lambda: storage.update_participation(user.id, date(2026, 3, 1), MealType.LUNCH, False, user.id),
+        lambda: storage.set_meal_enabled("iftar", True),
+    ]
+    for write in writes:
+        write()
+        version = storage.get_data_version()
+        assert version not in seen
+        seen.append(version)
+
+    storage.get_headcount_by_date(date(2026, 3, 1))
+    assert storage.get_data_version() == seen[-1]
+
+
+def test_data_version_sees_writes_from_another_process(backend, tmp_path):
+    before = storage.get_data_version()
+
+    other = create_backend(backend_name(backend), tmp_path)
+    other.create_user(make_user())
+    other.close()
+
+    assert storage.get_data_version() != before
+
+
+# ===========================
+# Refresh Token Tests
+# ===========================
+
+def make_refresh_token(token_hash, family_id="family-1", user_id="user-1", days=1):
+    from datetime import datetime, timedelta
+    return RefreshToken(
+        token_hash=token_hash, user_id=user_id, family_id=family_id,
+        expires_at=datetime.now() + timedelta(days=days),
+    )
+
+
+def test_refresh_token_rotates_only_once(backend):
+    storage.save_refresh_token(make_refresh_token("a"))
+
+    assert storage.rotate_refresh_token("a", make_refresh_token("b"))
+    assert storage.get_refresh_token("a").revoked_at is not None
+    assert storage.get_refresh_token("b").revoked_at is None
+
+    assert not storage.rotate_refresh_token("a", make_refresh_token("c"))
+    assert storage.get_refresh_token("c") is None
+    assert not storage.rotate_refresh_token("unknown", make_refresh_token("d"))
+
+
+def test_revoking_a_family_leaves_other_families_alone(backend):
+    storage.save_refresh_token(make_refresh_token("a"))
+    storage.rotate_refresh_token("a", make_refresh_token("b"))
+    storage.save_refresh_token(make_refresh_token("x", family_id="family-2"))
+
+    assert storage.revoke_refresh_tokens(family_id="family-1") == 1
+    assert storage.get_refresh_token("b").revoked_at is not None
+    assert storage.get_refresh_token("x").revoked_at is None
+    assert storage.revoke_refresh_tokens(user_id="user-1") == 1
+
+
+def test_expired_refresh_tokens_are_purged(backend):
+    storage.save_refresh_token(make_refresh_token("old", days=-1))
+    storage.save_refresh_token(make_refresh_token("new"))
+
+    assert storage.get_refresh_token("old") is None
+    assert storage.get_refresh_token("new") is not None
+
+
+# ===========================
+# Async Access Tests
+# ===========================
+
+def test_async_storage_runs_calls_off_the_event_loop(backend, monkeypatch):
+    import asyncio
+    import threading
+    import time
+    from app import async_storage
+
+    user = storage.create_user(make_user())
+    threads = []
+    lookup = storage.get_user_by_id
+
+    def slow_lookup(user_id):
+        threads.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return lookup(user_id)
+
+    monkeypatch.setattr(storage, "get_user_by_id", slow_lookup)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        found = await asyncio.gather(*(async_storage.get_user_by_id(user.id) for _ in range(4)))
+        task.cancel()
+        return found, ticks
+
+    found, ticks = asyncio.run(main())
+    assert [u.id for u in found] == [user.id] * 4
+    assert all(name.startswith("storage") for name in threads)
+    # The loop kept running while the lookups slept in the pool
+    assert ticks >= 5
@@ -0,0 +1,75 @@
+"""
+Tests for bulk user import parsing (app.user_import).
+
+Run with:
+    cd backend
+    python -m pytest tests/test_user_import.py -v
+"""
+
+import json
+import sys
+import os
+
+# Ensure the backend package is importable when running from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+from app.models import UserRole
+from app.user_import import detect_format, parse_import
+
+
+# ===========================
+# Format Detection Tests
+# ===========================
+
+def test_format_comes_from_extension_then_content_type():
+    assert detect_format("staff.CSV", "application/octet-stream") == "csv"
+    assert detect_format("staff.jsonl", None) == "ndjson"
+    assert detect_format(None, "application/x-ndjson") == "ndjson"
+    with pytest.raises(ValueError):
+        detect_format("staff.xlsx", "application/vnd.ms-excel")
+
+
+# ===========================
+# Row Validation Tests
+# ===========================
+
+def test_csv_rows_are_validated_individually():
+    content = (
+        "name,email,password,role,team\n"
+        "Ann,ann@test.com,secret1,team_lead,Ops\n"
+        "Bob,not-an-email,secret1,,\n"
+        "Cid,cid@test.com,short,,\n"
+        "Ann Again,ANN@test.com,secret1,,\n"
+        "Dee,dee@test.com,secret1,,\n"
+    ).encode()
+
+    rows = parse_import(content, "csv")
+
+    assert [r.row for r in rows] == [2, 3, 4, 5, 6]
+    assert [r.error is None for r in rows] == [True, False, False, False, True]
+    assert rows[0].user.role == UserRole.TEAM_LEAD
+    assert rows[4].user.role == UserRole.EMPLOYEE and rows[4].user.team is None
+    assert "email" in rows[1].error
+    assert "more than once" in rows[3].error
+
+
+def test_ndjson_reports_bad_lines_and_skips_blank_ones():
+    content = "\n".join([
+        json.dumps({"name": "Ann", "email": "ann@test.com", "password": "secret1"}),
+        "",
+        "{not json",
+        json.dumps(["a", "list"]),
+    ]).encode()
+
+    rows = parse_import(content, "ndjson")
+
+    assert [(r.row, r.error is None) for r in rows] == [(1, True), (3, False), (4, False)]
+
+
+def test_unusable_files_are_rejected_as_a_whole():
+    with pytest.raises(ValueError):
+        parse_import(b"", "csv")
+    with pytest.raises(ValueError):
+        parse_import(b"\xff\xfe\x00", "ndjson")
@@ -16,6 +16,7 @@ export function AuthProvider({ children }) {
         .then((res) => setUser(res.data))
         .catch(() => {
           localStorage.removeItem('access_token');
+          localStorage.removeItem('refresh_token');
           setUser(null);
         })
         .finally(() => setLoading(false));
@@ -26,22 +27,28 @@ export function AuthProvider({ children }) {
 
   const login = async (email, password) => {
     const res = await authAPI.login(email, password);
-    const { access_token, user: userData } = res.data;
+    const { access_token, refresh_token, user: userData } = res.data;
     localStorage.setItem('access_token', access_token);
+    localStorage.setItem('refresh_token', refresh_token);
     setUser(userData);
     return userData;
   };
 
   const register = async (name, email, password, team) => {
     const res = await authAPI.register(name, email, password, team);
-    const { access_token, user: userData } = res.data;
+    const { access_token, refresh_token, user: userData } = res.data;
     localStorage.setItem('access_token', access_token);
+    localStorage.setItem('refresh_token', refresh_token);
     setUser(userData);
     return userData;
   };
 
   const logout = () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    // Revoke server-side without waiting; the local session ends either way
+    authAPI.logout(refreshToken).catch(() => {});
     localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
     setUser(null);
   };
 
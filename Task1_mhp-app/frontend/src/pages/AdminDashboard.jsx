@@ -14,6 +14,9 @@ const TEAMS = [
   'Operations',
 ];
 
+// Users per request when loading everyone's meals (the server's maximum)
+const ROSTER_PAGE_SIZE = 500;
+
 const MEAL_TYPES = [
   { value: 'lunch', label: 'Lunch' },
   { value: 'snacks', label: 'Snacks' },
@@ -26,6 +29,8 @@ export default function AdminDashboard() {
   const [headcount, setHeadcount] = useState(null);
   const [users, setUsers] = useState([]);
   const [totalUsers, setTotalUsers] = useState(0);
+  // Each user's meals for the selected date, keyed by user id
+  const [rosterMeals, setRosterMeals] = useState({});
   const [selectedDate, setSelectedDate] = useState(
     new Date().toISOString().split('T')[0]
   );
@@ -71,6 +76,13 @@ export default function AdminDashboard() {
     fetchMealConfig();
   }, [selectedDate]);
 
+  // Live counts for the selected day instead of re-fetching after changes
+  useEffect(() => {
+    return mealsAPI.streamHeadcount({ date: selectedDate }, (data) =>
+      setHeadcount(data.headcount)
+    );
+  }, [selectedDate]);
+
   const fetchMealConfig = async () => {
     try {
       const res = await mealsAPI.getMealConfig();
@@ -87,8 +99,7 @@ export default function AdminDashboard() {
       await mealsAPI.updateMealConfig(mealType, !currentEnabled);
       setMealConfig((prev) => ({ ...prev, [mealType]: !currentEnabled }));
       setSuccess(`${mealType.replace('_', ' ')} has been ${!currentEnabled ? 'enabled' : 'disabled'}.`);
-      // Refresh headcount since enabled meals changed
-      fetchData();
+      // The headcount stream pushes counts for the new set of enabled meals
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to update meal configuration.');
     } finally {
@@ -96,6 +107,22 @@ export default function AdminDashboard() {
     }
   };
 
+  // Every user's meals for a date, a page at a time
+  const fetchRosterMeals = async (targetDate) => {
+    const meals = {};
+    let offset = 0;
+    let total = 0;
+    do {
+      const res = await mealsAPI.getAllUserMeals(targetDate, { offset, limit: ROSTER_PAGE_SIZE });
+      res.data.members.forEach((m) => {
+        meals[m.user.id] = m.meals;
+      });
+      total = res.data.total;
+      offset += ROSTER_PAGE_SIZE;
+    } while (offset < total);
+    return meals;
+  };
+
   const fetchData = async () => {
     setLoading(true);
     try {
@@ -105,12 +132,14 @@ export default function AdminDashboard() {
           ? mealsAPI.getTodayHeadcount()
           : mealsAPI.getHeadcount(selectedDate);
 
-      const [headcountRes, usersRes] = await Promise.all([
+      const [headcountRes, usersRes, meals] = await Promise.all([
         headcountPromise,
         usersAPI.getAllUsers(),
+        fetchRosterMeals(selectedDate),
       ]);
 
       setHeadcount(headcountRes.data.headcount);
+      setRosterMeals(meals);
       setUsers(usersRes.data.users);
       setTotalUsers(usersRes.data.total);
       setError('');
@@ -187,6 +216,11 @@ export default function AdminDashboard() {
     setShowParticipationModal(true);
     try {
       const today = new Date().toISOString().split('T')[0];
+      // Today's roster is already loaded; only other days need a request
+      if (selectedDate === today && rosterMeals[user.id]) {
+        setParticipationMeals(rosterMeals[user.id]);
+        return;
+      }
       const res = await mealsAPI.getUserMeals(user.id, today);
       setParticipationMeals(res.data.meals);
     } catch (err) {
@@ -210,20 +244,21 @@ export default function AdminDashboard() {
         setError(failedItems.map((f) => f.message).join(', '));
         return;
       }
-      setParticipationMeals((prev) =>
-        prev.map((m) =>
+      const toggle = (meals) =>
+        meals.map((m) =>
           m.meal_type === meal.meal_type
             ? { ...m, is_participating: newValue }
             : m
-        )
-      );
-      setSuccess(`Participation updated for ${participationUser.name}.`);
-      // Refresh headcount
-      const today = new Date().toISOString().split('T')[0];
-      if (selectedDate === today) {
-        const hcRes = await mealsAPI.getTodayHeadcount();
-        setHeadcount(hcRes.data.headcount);
+        );
+      setParticipationMeals(toggle);
+      if (selectedDate === new Date().toISOString().split('T')[0]) {
+        setRosterMeals((prev) => ({
+          ...prev,
+          [participationUser.id]: toggle(prev[participationUser.id] || []),
+        }));
       }
+      setSuccess(`Participation updated for ${participationUser.name}.`);
+      // The headcount stream pushes the new counts
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to update participation.');
     }
@@ -421,6 +456,7 @@ export default function AdminDashboard() {
                   <th className="px-6 py-4 font-semibold">Role</th>
                   <th className="px-6 py-4 font-semibold">Team</th>
                   <th className="px-6 py-4 font-semibold">Status</th>
+                  <th className="px-6 py-4 font-semibold">Meals</th>
                   <th className="px-6 py-4 font-semibold text-right">Actions</th>
                 </tr>
               </thead>
@@ -453,6 +489,20 @@ export default function AdminDashboard() {
                         </span>
                       )}
                     </td>
+                    <td className="px-6 py-4">
+                      <div className="flex flex-wrap gap-1">
+                        {(rosterMeals[u.id] || [])
+                          .filter((m) => m.is_participating)
+                          .map((m) => (
+                            <span
+                              key={m.meal_type}
+                              className="inline-flex items-center px-2 py-0.5 rounded text-xs font-medium bg-primary/10 text-primary"
+                            >
+                              {MEAL_TYPES.find((t) => t.value === m.meal_type)?.label || m.meal_type}
+                            </span>
+                          ))}
+                      </div>
+                    </td>
                     <td className="px-6 py-4 text-right">
                       <div className="flex items-center justify-end gap-1">
                         <button
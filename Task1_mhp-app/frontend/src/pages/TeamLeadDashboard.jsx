@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import { mealsAPI, usersAPI } from '../services/api';
+import { mealsAPI } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import Navbar from '../components/Navbar';
 import HeadcountTable from '../components/HeadcountTable';
@@ -19,6 +19,8 @@ export default function TeamLeadDashboard() {
   const [headcount, setHeadcount] = useState(null);
   const [users, setUsers] = useState([]);
   const [totalUsers, setTotalUsers] = useState(0);
+  // Each member's meals for the selected date, keyed by user id
+  const [rosterMeals, setRosterMeals] = useState({});
   const [selectedDate, setSelectedDate] = useState(
     new Date().toISOString().split('T')[0]
   );
@@ -39,6 +41,13 @@ export default function TeamLeadDashboard() {
     fetchData();
   }, [selectedDate]);
 
+  // Live team counts for the selected day instead of re-fetching after changes
+  useEffect(() => {
+    return mealsAPI.streamHeadcount({ date: selectedDate }, (data) =>
+      setHeadcount(data.headcount)
+    );
+  }, [selectedDate]);
+
   const fetchData = async () => {
     setLoading(true);
     try {
@@ -48,14 +57,17 @@ export default function TeamLeadDashboard() {
           ? mealsAPI.getTeamHeadcountToday()
           : mealsAPI.getTeamHeadcount(selectedDate);
 
-      const [headcountRes, usersRes] = await Promise.all([
+      const [headcountRes, rosterRes] = await Promise.all([
         headcountPromise,
-        usersAPI.getTeamUsers(),
+        mealsAPI.getTeamMeals(selectedDate),
       ]);
 
       setHeadcount(headcountRes.data.headcount);
-      setUsers(usersRes.data.users);
-      setTotalUsers(usersRes.data.total);
+      setUsers(rosterRes.data.members.map((m) => m.user));
+      setTotalUsers(rosterRes.data.total);
+      setRosterMeals(
+        Object.fromEntries(rosterRes.data.members.map((m) => [m.user.id, m.meals]))
+      );
       setError('');
     } catch (err) {
       setError('Failed to load dashboard data.');
@@ -73,6 +85,11 @@ export default function TeamLeadDashboard() {
     setShowParticipationModal(true);
     try {
       const today = new Date().toISOString().split('T')[0];
+      // Today's roster is already loaded; only other days need a request
+      if (selectedDate === today && rosterMeals[targetUser.id]) {
+        setParticipationMeals(rosterMeals[targetUser.id]);
+        return;
+      }
       const res = await mealsAPI.getUserMeals(targetUser.id, today);
       setParticipationMeals(res.data.meals);
     } catch (err) {
@@ -96,20 +113,21 @@ export default function TeamLeadDashboard() {
         setError(failedItems.map((f) => f.message).join(', '));
         return;
       }
-      setParticipationMeals((prev) =>
-        prev.map((m) =>
+      const toggle = (meals) =>
+        meals.map((m) =>
           m.meal_type === meal.meal_type
             ? { ...m, is_participating: newValue }
             : m
-        )
-      );
-      setSuccess(`Participation updated for ${participationUser.name}.`);
-      // Refresh headcount
-      const today = new Date().toISOString().split('T')[0];
-      if (selectedDate === today) {
-        const hcRes = await mealsAPI.getTeamHeadcountToday();
-        setHeadcount(hcRes.data.headcount);
+        );
+      setParticipationMeals(toggle);
+      if (selectedDate === new Date().toISOString().split('T')[0]) {
+        setRosterMeals((prev) => ({
+          ...prev,
+          [participationUser.id]: toggle(prev[participationUser.id] || []),
+        }));
       }
+      setSuccess(`Participation updated for ${participationUser.name}.`);
+      // The headcount stream pushes the new counts
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to update participation.');
     }
@@ -254,6 +272,7 @@ export default function TeamLeadDashboard() {
                   <th className="px-6 py-4 font-semibold">Email</th>
                   <th className="px-6 py-4 font-semibold">Role</th>
                   <th className="px-6 py-4 font-semibold">Status</th>
+                  <th className="px-6 py-4 font-semibold">Meals</th>
                   <th className="px-6 py-4 font-semibold text-right">Actions</th>
                 </tr>
               </thead>
@@ -285,6 +304,20 @@ export default function TeamLeadDashboard() {
                         </span>
                       )}
                     </td>
+                    <td className="px-6 py-4">
+                      <div className="flex flex-wrap gap-1">
+                        {(rosterMeals[u.id] || [])
+                          .filter((m) => m.is_participating)
+                          .map((m) => (
+                            <span
+                              key={m.meal_type}
+                              className="inline-flex items-center px-2 py-0.5 rounded text-xs font-medium bg-primary/10 text-primary"
+                            >
+                              {MEAL_TYPES.find((t) => t.value === m.meal_type)?.label || m.meal_type}
+                            </span>
+                          ))}
+                      </div>
+                    </td>
                     <td className="px-6 py-4 text-right">
                       <button
                         onClick={() => openParticipationModal(u)}
@@ -18,12 +18,51 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
-// Handle 401 responses globally
+// Exchange the stored refresh token for a new token pair. Concurrent 401s
+// share one request: the server rotates refresh tokens and treats a second
+// use of the same token as theft.
+let refreshPromise = null;
+
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshPromise = (refreshToken
+      ? axios.post(`${API_BASE_URL}/api/auth/refresh`, { refresh_token: refreshToken })
+      : Promise.reject(new Error('No refresh token'))
+    )
+      .then((res) => {
+        localStorage.setItem('access_token', res.data.access_token);
+        localStorage.setItem('refresh_token', res.data.refresh_token);
+        return res.data.access_token;
+      })
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
+// Handle 401 responses globally: refresh once and retry, else back to login
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
-    if (error.response?.status === 401) {
+  async (error) => {
+    const original = error.config;
+    const isAuthCall = original?.url?.startsWith('/api/auth/');
+
+    if (error.response?.status === 401 && original && !original._retried && !isAuthCall) {
+      original._retried = true;
+      try {
+        const token = await refreshAccessToken();
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch {
+        // Fall through to the logout below
+      }
+    }
+
+    if (error.response?.status === 401 && !isAuthCall) {
       localStorage.removeItem('access_token');
+      localStorage.removeItem('refresh_token');
       // Only redirect if not already on login/register
       if (
         !window.location.pathname.includes('/login') &&
@@ -47,6 +86,9 @@ export const authAPI = {
   register: (name, email, password, team) =>
     api.post('/api/auth/register', { name, email, password, team }),
 
+  logout: (refreshToken) =>
+    api.post('/api/auth/logout', refreshToken ? { refresh_token: refreshToken } : undefined),
+
   // Kept for backwards compat but prefer usersAPI.getMe
   getMe: () => api.get('/api/users/me'),
 };
@@ -55,6 +97,39 @@ export const authAPI = {
 // Meals API
 // ===========================
 
+// Live headcount over Server-Sent Events. EventSource cannot send headers,
+// so the access token goes in the query string. The server ends the stream
+// when that token expires; the reconnect is then refused, so refresh the
+// token and open a new stream. Returns a function that closes it.
+const openHeadcountStream = ({ date, team } = {}, onHeadcount) => {
+  let source = null;
+  let closed = false;
+
+  const connect = () => {
+    const params = new URLSearchParams({ token: localStorage.getItem('access_token') || '' });
+    if (date) params.set('date', date);
+    if (team) params.set('team', team);
+    source = new EventSource(`${API_BASE_URL}/api/meals/headcount/stream?${params}`);
+    source.addEventListener('headcount', (event) => onHeadcount(JSON.parse(event.data)));
+    source.onerror = () => {
+      // While CONNECTING the browser is retrying by itself
+      if (source.readyState === EventSource.CLOSED && !closed) {
+        refreshAccessToken()
+          .then(() => {
+            if (!closed) connect();
+          })
+          .catch(() => {});
+      }
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    source?.close();
+  };
+};
+
 export const mealsAPI = {
   getTodayMeals: () => api.get('/api/meals/today'),
 
@@ -63,6 +138,15 @@ export const mealsAPI = {
       params: { target_date: targetDate },
     }),
 
+  // Every member of a team with their meals for a date, in one request
+  // (team defaults to the caller's own; only admins may name another)
+  getTeamMeals: (targetDate, team) =>
+    api.get(`/api/meals/team/${targetDate}`, { params: { team } }),
+
+  // One page of every user with their meals for a date (Admin)
+  getAllUserMeals: (targetDate, { offset = 0, limit = 100 } = {}) =>
+    api.get(`/api/meals/users/${targetDate}`, { params: { offset, limit } }),
+
   updateParticipation: (userId, targetDate, mealType, isParticipating) =>
     api.put(`/api/meals/${userId}/${targetDate}/${mealType}`, {
       is_participating: isParticipating,
@@ -84,6 +168,15 @@ export const mealsAPI = {
   getHeadcount: (targetDate) =>
     api.get(`/api/meals/headcount/${targetDate}`),
 
+  // Per-day counts for a whole span in one request (e.g. a weekly catering plan)
+  getHeadcountRange: (start, end, { team, groupByTeam } = {}) =>
+    api.get('/api/meals/headcount/range', {
+      params: { start, end, team, group_by_team: groupByTeam },
+    }),
+
+  // Pushes { date, team, headcount, total_employees } whenever counts change
+  streamHeadcount: openHeadcountStream,
+
   getTeamHeadcountToday: () =>
     api.get('/api/meals/headcount/team/today'),
 